@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+ALIGN_MODES = ('inner', 'ffill', 'asof')
+
+
+def to_int64(index, unit: str = 'ns') -> np.ndarray:
+    """Index (DatetimeIndex or numeric) -> int64 array (datetimes as UTC `unit` ticks)."""
+    if isinstance(index, pd.DatetimeIndex):
+        if index.tz is not None:
+            # the instant in UTC, not the local wall clock, so sources in different zones line up
+            index = index.tz_convert('UTC').tz_localize(None)
+        if getattr(index, 'unit', 'ns') != unit:
+            index = index.as_unit(unit)
+        return index.asi8
+    return np.asarray(index, dtype=np.int64)
+
+
+def _sorted_unique(ts: np.ndarray):
+    """
+    Returns (sorted unique timestamps, source row of each), keeping the first
+    occurrence of duplicated timestamps like the old `~index.duplicated()` filter.
+    """
+    rows = np.arange(len(ts))
+    if len(ts) > 1 and not (ts[1:] >= ts[:-1]).all():
+        rows = np.argsort(ts, kind='stable')
+        ts = ts[rows]
+    if len(ts) > 1:
+        keep = np.empty(len(ts), dtype=bool)
+        keep[0] = True
+        np.not_equal(ts[1:], ts[:-1], out=keep[1:])
+        ts, rows = ts[keep], rows[keep]
+    return ts, rows
+
+
+def last_at_or_before(timeline: np.ndarray, ts: np.ndarray) -> np.ndarray:
+    """
+    For every timeline entry, the position of the last ts <= it (-1 if none);
+    ts must be sorted. One vectorized binary search per entry, O(m log n).
+    """
+    return np.searchsorted(ts, timeline, side='right') - 1
+
+
+def align_indexers(indexes: list, how: str = 'inner', base: int = 0, tolerance: int = None, unit: str = 'ns'):
+    """
+    Aligns several sorted timestamp indexes onto one timeline.
+
+    how:
+      'inner' - timestamps present in every index (exact match).
+      'ffill' - union of all timestamps; each input contributes its last bar at or before.
+      'asof'  - the timeline of indexes[base]; others contribute their last bar at or
+                before (backward as-of), optionally no older than `tolerance` (same units).
+
+    Returns (timeline int64, [row positions per input, -1 where missing]).
+    """
+    if how not in ALIGN_MODES:
+        raise ValueError(f"Unknown alignment mode '{how}'. Use one of {ALIGN_MODES}.")
+
+    prepared = [_sorted_unique(to_int64(idx, unit)) for idx in indexes]
+
+    if how == 'inner':
+        # Shrink the timeline one input at a time, carrying every input's matched rows along
+        timeline = prepared[0][0]
+        matched = [np.arange(len(timeline))]
+        for ts, _ in prepared[1:]:
+            pos = last_at_or_before(timeline, ts)
+            hit = pos >= 0
+            hit[hit] = ts[pos[hit]] == timeline[hit]
+            timeline = timeline[hit]
+            matched = [m[hit] for m in matched] + [pos[hit]]
+        return timeline, [rows[m] for (_, rows), m in zip(prepared, matched)]
+    elif how == 'ffill':
+        merged = np.sort(np.concatenate([ts for ts, _ in prepared]), kind='stable')
+        timeline, _ = _sorted_unique(merged)
+    else:
+        timeline = prepared[base][0]
+
+    positions = []
+    for ts, rows in prepared:
+        if len(ts) == 0:
+            positions.append(np.full(len(timeline), -1, dtype=np.int64))
+            continue
+        pos = last_at_or_before(timeline, ts)
+        missing = pos < 0
+        if tolerance is not None and how == 'asof':
+            missing |= (timeline - ts[np.maximum(pos, 0)]) > tolerance
+        out = rows[np.maximum(pos, 0)]
+        out[missing] = -1
+        positions.append(out)
+
+    return timeline, positions
+
+
+def align_frames(data_map: dict, how: str = 'inner', base: str = None, tolerance=None) -> dict:
+    """
+    Aligns a {key: DataFrame} map (datetime-indexed) onto a common index.
+    Numeric columns are gathered by position in one take per frame (as float64),
+    other columns one take each; missing rows become NaN.
+    """
+    keys = list(data_map.keys())
+    base_pos = keys.index(base) if base in keys else 0
+    first_index = data_map[keys[0]].index
+    # Work in the first frame's resolution so matching indexes need no conversion
+    unit = getattr(first_index, 'unit', 'ns')
+    if tolerance is not None and not isinstance(tolerance, (int, np.integer)):
+        tolerance = int(pd.Timedelta(tolerance) / pd.Timedelta(1, unit=unit))
+
+    timeline, positions = align_indexers([data_map[k].index for k in keys], how=how, base=base_pos, tolerance=tolerance, unit=unit)
+    if isinstance(first_index, pd.DatetimeIndex):
+        index = pd.DatetimeIndex(timeline.view(f'datetime64[{unit}]'), name=first_index.name)
+    else:
+        index = pd.Index(timeline, name=first_index.name)
+
+    result = {}
+    for key, pos in zip(keys, positions):
+        df = data_map[key]
+        take, missing = np.maximum(pos, 0), pos < 0
+        numeric = df.select_dtypes(include=['number', 'bool']).columns
+        columns = {}
+        if len(numeric):
+            block = df[numeric].to_numpy(dtype='float64', na_value=np.nan)[take]
+            block[missing] = np.nan
+            columns.update(zip(numeric, block.T))
+        for col in df.columns.difference(numeric, sort=False):
+            values = df[col].to_numpy(dtype=object)[take]
+            values[missing] = np.nan
+            columns[col] = values
+        result[key] = pd.DataFrame({col: columns[col] for col in df.columns}, index=index)
+    return result
@@ -1,9 +1,14 @@
 import pandas as pd
 
+import mtf
+from macro_regime import REGIMES
+
 class Backtester:
-    def __init__(self, df: pd.DataFrame, initial_balance: float = 10000.0):
+    def __init__(self, df: pd.DataFrame, initial_balance: float = 10000.0, macro_regime=None):
         self.df = df
         self.initial_balance = initial_balance
+        # MacroRegime used to fill Tier1_Signal when the frame has no such column
+        self.macro_regime = macro_regime
         self.balance = initial_balance # Cash
         self.equity_curve = [] 
         self.trades = []
@@ -48,6 +53,9 @@ class Backtester:
         """
         Runs the portfolio backtest with Pyramiding and QT Risk Control.
         """
+        if 'Tier1_Signal' not in self.df.columns and self.macro_regime is not None:
+            self.join_macro_regime()
+
         # Ensure necessary columns exist
         required = ['Tier1_Signal', 'Signal_MVRV', 'Signal_BTCM2', 'Signal_GLF_Liquidity']
         missing = [c for c in required if c not in self.df.columns]
@@ -138,9 +146,22 @@ class Backtester:
                 self.positions[name] = 0
                 self.trades.append({'type': 'sell', 'strat': name, 'price': price, 'time': ts, 'qty': 0})
 
+    def join_macro_regime(self):
+        """
+        Tier1_Signal ('QE'/'QT'/'Neutral') of the last day closed by each bar's close,
+        one vectorized lookup on the daily regime.
+        """
+        self.macro_regime.ensure_fresh()
+        if 'time' in self.df.columns:
+            times = pd.to_numeric(self.df['time']).to_numpy(dtype='int64') * 10**9
+        else:
+            times = pd.DatetimeIndex(self.df.index).as_unit('ns').asi8
+        close_ns = times + mtf.bar_duration_ns(times)
+        self.df['Tier1_Signal'] = pd.Categorical.from_codes(self.macro_regime.codes(close_ns), list(REGIMES))
+
     def run(self, sma_col_name='SMA_20'):
         # Backward compatibility wrapper or main entry
-        if 'Tier1_Signal' in self.df.columns:
+        if 'Tier1_Signal' in self.df.columns or self.macro_regime is not None:
             self.run_portfolio_strategy()
         else:
             # Fallback to simple SMA logic
@@ -0,0 +1,237 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from series_index import SeriesIndex
+
+
+class BarEntry:
+    """
+    A cached OHLCV frame plus the bookkeeping needed to reuse it.
+
+    version is bumped only when the bars actually change. When the new frame
+    only differs from the previous version in its tail, prev_version and
+    changed_from (first changed timestamp) let dependents recompute just that tail.
+
+    indexes holds the range-query indexes built for its columns (see
+    series_index). On a tail-only change the next version gets copies advanced
+    over the changed bars; the superseded entry keeps its own untouched, so a
+    caller still reading them never sees a mix of two versions.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: int = 1, prev_version: int = None, changed_from=None):
+        self.df = df
+        self.version = version
+        self.prev_version = prev_version
+        self.changed_from = changed_from
+        self.fetched_at = time.time()
+        self.nbytes = int(df.memory_usage(index=True, deep=False).sum())
+        self.indexes = {}
+        self._index_lock = threading.Lock()
+
+    def is_fresh(self, ttl: float) -> bool:
+        return (time.time() - self.fetched_at) < ttl
+
+    def series_index(self, column: str = 'close') -> SeriesIndex:
+        """Range-query index over one column, built on first use."""
+        with self._index_lock:
+            index = self.indexes.get(column)
+            if index is None:
+                index = SeriesIndex(_column_values(self.df, column))
+                self.indexes[column] = index
+            return index
+
+
+class BarStore:
+    """
+    Thread-safe in-memory cache of OHLCV frames keyed by request parameters.
+
+    Concurrent requests for the same key share a single fetch (single-flight),
+    so a synthetic formula that references one ticker several times, or two
+    panes asking for the same pair, only walk the source cascade once.
+
+    Bounded: entries not refetched for keep_seconds (10 TTLs by default; kept
+    past the TTL so a refetch can still be diffed against them) are dropped on
+    every insert, and least recently used entries beyond max_entries or
+    max_bytes of frame data are evicted. Versions come from one counter for the
+    whole store, so a key fetched again after eviction never reuses a version
+    that dependents may still have results cached under.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 256, max_bytes: int = 1 << 30,
+                 keep_seconds: float = None):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.keep_seconds = 10 * ttl_seconds if keep_seconds is None else keep_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._versions = itertools.count(1)
+        self._inflight = {}
+
+    @staticmethod
+    def make_key(ticker: str, timeframe: str, limit: int = None, source: str = 'auto', to_timestamp: int = None) -> tuple:
+        return (ticker, timeframe, limit, source, to_timestamp)
+
+    def get(self, key) -> BarEntry:
+        """Returns the fresh entry for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.is_fresh(self.ttl):
+                self._entries.move_to_end(key)
+                return entry
+        return None
+
+    def put(self, key, df: pd.DataFrame) -> BarEntry:
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is None:
+                entry = BarEntry(df, next(self._versions))
+            else:
+                changed, changed_from = self._diff(previous.df, df)
+                if not changed:
+                    # Same bars: keep the version so dependents stay valid
+                    entry = BarEntry(df, previous.version, previous.prev_version, previous.changed_from)
+                    entry.indexes = previous.indexes
+                else:
+                    entry = BarEntry(df, next(self._versions), previous.version, changed_from)
+                    if changed_from is not None:
+                        entry.indexes = self._advance_indexes(previous, df, changed_from)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._bytes += entry.nbytes
+            self._evict(keep=key)
+            return entry
+
+    def _evict(self, keep):
+        """Drops entries past keep_seconds, then the least recently used ones over the bounds (lock held)."""
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if k != keep and now - e.fetched_at >= self.keep_seconds]:
+            self._bytes -= self._entries.pop(key).nbytes
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            # keep was just moved to the end, so the oldest entry is never it
+            self._bytes -= self._entries.popitem(last=False)[1].nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Frame bytes currently held."""
+        return self._bytes
+
+    @staticmethod
+    def _diff(old: pd.DataFrame, new: pd.DataFrame):
+        """
+        Compares two versions of a series.
+        Returns (changed, changed_from): changed_from is the first timestamp whose bar
+        differs when new is old with a revised/extended tail (the head may have slid
+        forward by a limit window), or None when the change is not tail-only
+        (including a new version with fewer bars at the tail than the old one).
+        """
+        if list(old.columns) != list(new.columns) or new.empty or old.empty:
+            return True, None
+        if not (old.index.is_monotonic_increasing and new.index.is_monotonic_increasing):
+            return True, None
+
+        # Locate new's first bar inside old (a sliding limit window drops head bars)
+        offset = old.index.searchsorted(new.index[0])
+        if offset >= len(old) or old.index[offset] != new.index[0]:
+            return True, None
+
+        if len(new) < len(old) - offset:
+            # Bars at the tail were withdrawn: not an append or revision, recompute fully
+            return True, None
+        overlap = len(old) - offset
+        if not old.index[offset:offset + overlap].equals(new.index[:overlap]):
+            return True, None
+
+        old_vals = old.iloc[offset:offset + overlap].to_numpy(dtype='float64', na_value=float('nan'))
+        new_vals = new.iloc[:overlap].to_numpy(dtype='float64', na_value=float('nan'))
+        same = (old_vals == new_vals) | (pd.isna(old_vals) & pd.isna(new_vals))
+        row_same = same.all(axis=1)
+
+        if row_same.all():
+            if len(new) == overlap:
+                # Nothing new at the tail; only a changed head counts as a change
+                return offset > 0, (new.index[-1] if offset > 0 else None)
+            return True, new.index[overlap]
+
+        first_diff = int(row_same.argmin())
+        return True, new.index[first_diff]
+
+    @staticmethod
+    def _advance_indexes(previous: BarEntry, df: pd.DataFrame, changed_from) -> dict:
+        """
+        Carries the previous version's indexes over a tail-only change: copies
+        them (readers of the previous entry may still hold them), drops the bars
+        that slid out of the head, cuts the revised tail and appends the new
+        one, so the recomputation is proportional to the changed bars.
+        """
+        with previous._index_lock:
+            indexes = {column: index.copy() for column, index in previous.indexes.items() if column in df.columns}
+        if not indexes:
+            return {}
+        offset = int(previous.df.index.searchsorted(df.index[0]))
+        keep = int(df.index.searchsorted(changed_from))
+        for column, index in indexes.items():
+            index.drop_head(offset)
+            index.truncate(keep)
+            index.append(_column_values(df, column)[keep:])
+        return indexes
+
+    def get_or_fetch(self, key, fetch_fn) -> BarEntry:
+        """
+        Returns a fresh cached entry, or calls fetch_fn() exactly once across
+        all threads waiting on the same key. Empty results are not cached.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            df = fetch_fn()
+            if df is not None and not df.empty:
+                entry = self.put(key, df)
+            else:
+                entry = None
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def invalidate(self, ticker: str = None):
+        """Drops cached entries (all of them, or those for one ticker)."""
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                for key in [k for k in self._entries if k[0] == ticker]:
+                    self._bytes -= self._entries.pop(key).nbytes
+
+
+def _column_values(df: pd.DataFrame, column: str) -> np.ndarray:
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
@@ -3,6 +3,16 @@ import ccxt
 import pandas as pd
 import datetime
 import os
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import alignment
+from bar_store import BarStore
+from series_index import SeriesIndex
+import wire
 try:
     from fredapi import Fred
 except ImportError:
@@ -34,6 +44,16 @@ class DataLoader:
             except Exception as e:
                 print(f"Failed to initialize TVLoader: {e}")
 
+        # In-memory bar cache shared by plain fetches and synthetic components
+        self.bar_store = BarStore(ttl_seconds=60)
+        # yfinance.download and TvDatafeed keep per-call state on shared objects,
+        # so concurrent component fetches must not overlap inside them.
+        self._yf_lock = threading.Lock()
+        self._tv_lock = threading.Lock()
+        # Dataset handles given out by /api/v1/data: id -> fetch params (most recent last)
+        self._datasets = OrderedDict()
+        self._datasets_lock = threading.Lock()
+
         print("Initializing ccxt...")
         self.ccxt_exchange = ccxt.binance()
         print("ccxt initialized.")
@@ -62,7 +82,91 @@ class DataLoader:
             self._synthetic_engine = SyntheticEngine()
         return self._synthetic_engine
 
-    def fetch_data(self, ticker: str, timeframe: str, limit: int = 50000, source: str = 'auto', to_timestamp: int = None) -> pd.DataFrame:
+    @property
+    def onchain(self):
+        """Local on-chain metrics store (data/onchain/), filled from imported CSV dumps."""
+        if not hasattr(self, '_onchain'):
+            from onchain_store import OnChainStore
+            self._onchain = OnChainStore(self.data_dir)
+        return self._onchain
+
+    @property
+    def fx_matrix(self):
+        """Daily FX matrix shared by the macro composites, TVLoader.fetch_composite_m2 and the legacy M2 path."""
+        if not hasattr(self, '_fx_matrix'):
+            from fx_matrix import FxMatrix
+            self._fx_matrix = FxMatrix(self._fetch_fx_pair, cache_dir=self.data_dir)
+            if self.tv_loader:
+                self.tv_loader.fx_matrix = self._fx_matrix
+        return self._fx_matrix
+
+    @property
+    def global_m2(self):
+        """Materialized Global M2 composite (daily, per component and total), built on first use."""
+        if not hasattr(self, '_global_m2'):
+            from macro_composite import MacroComposite, GLOBAL_M2_COMPONENTS
+            self._global_m2 = MacroComposite('global_m2', GLOBAL_M2_COMPONENTS, self._fetch_m2_component,
+                                             cache_dir=self.data_dir, fx=self.fx_matrix)
+        return self._global_m2
+
+    @property
+    def global_liquidity(self):
+        """Materialized GLF index: central-bank balance sheets in USD net of RRP and TGA."""
+        if not hasattr(self, '_global_liquidity'):
+            from macro_composite import MacroComposite, GLF_COMPONENTS, GLF_WEIGHTS
+            self._global_liquidity = MacroComposite('global_liquidity', GLF_COMPONENTS, self._fetch_glf_component,
+                                                    cache_dir=self.data_dir, positive_only=False,
+                                                    fx=self.fx_matrix, weights=GLF_WEIGHTS)
+        return self._global_liquidity
+
+    @property
+    def macro_regime(self):
+        """Tier 1 QE/QT/Neutral regime from WALCL and DXY, recomputed once per release."""
+        if not hasattr(self, '_macro_regime'):
+            from macro_regime import MacroRegime
+            self._macro_regime = MacroRegime(self._fetch_regime_source, cache_dir=self.data_dir)
+        return self._macro_regime
+
+    def _fetch_m2_component(self, component) -> pd.Series:
+        """One Global M2 component in local currency (publication dates) from TradingView."""
+        name, m2_sym, m2_exch, fx_sym, fx_exch, op = component
+        if not self.tv_loader:
+            return None
+        return self.tv_loader.fetch_m2_series(m2_sym, m2_exch)
+
+    def _fetch_glf_component(self, component) -> pd.Series:
+        """One GLF component in local currency: US series are daily, foreign balance sheets monthly."""
+        name, sym, exch, fx_sym, fx_exch, op = component
+        if not self.tv_loader:
+            return None
+        if op != 'none':
+            return self.tv_loader.fetch_m2_series(sym, exch)
+        df = self.tv_loader.fetch_macro_series(f"{exch}:{sym}", n_bars=3000)
+        if df is None or df.empty:
+            return None
+        return df['close'] if 'close' in df.columns else df.iloc[:, 0]
+
+    def _fetch_regime_source(self, source) -> pd.Series:
+        """WALCL / DXY daily closes from TradingView."""
+        name, sym, exch = source
+        if not self.tv_loader:
+            return None
+        df = self.tv_loader.fetch_macro_series(f"{exch}:{sym}", n_bars=5000)
+        if df is None or df.empty:
+            return None
+        return df['close'] if 'close' in df.columns else df.iloc[:, 0]
+
+    def _fetch_fx_pair(self, pair: str) -> pd.Series:
+        """Daily FX quotes for an FX matrix key: 'YF:<ticker>' from yfinance, anything else from TradingView."""
+        exchange, symbol = pair.split(':', 1)
+        if exchange == 'YF':
+            df = self._fetch_yfinance(symbol, timeframe='1d')
+            return df['close'] if not df.empty else None
+        if not self.tv_loader:
+            return None
+        return self.tv_loader.fetch_fx_series(symbol, exchange)
+
+    def fetch_data(self, ticker: str, timeframe: str, limit: int = 50000, source: str = 'auto', to_timestamp: int = None, align: str = 'inner') -> pd.DataFrame:
         try:
             print(f"DEBUG: fetch_data called with ticker='{ticker}', timeframe='{timeframe}'") 
             
@@ -86,27 +190,15 @@ class DataLoader:
                     print(f"DEBUG: Recursion detected (extracted ticker same as input). Falling back to standard fetch.")
                     # Pass through to standard logic below
                 else:
-                    data_map = {}
-                    for sub in sub_tickers:
-                        if sub == ticker: 
-                            print("DEBUG: Loop detected in sub-ticker. Skipping.")
-                            continue
-                            
-                        print(f"DEBUG: Fetching component: '{sub}'")
-                        df_sub = self.fetch_data(sub, timeframe, limit=limit, source=source, to_timestamp=to_timestamp)
-                        
-                        if not df_sub.empty:
-                            data_map[sub] = df_sub
-                            print(f"DEBUG: Component '{sub}' loaded. Rows: {len(df_sub)}")
-                        else:
-                            print(f"DEBUG: Warning - No data for component '{sub}'")
+                    entries = self._fetch_components(ticker, sub_tickers, timeframe, limit, source, to_timestamp)
                     
-                    if not data_map:
+                    if not entries:
                         print("DEBUG: No component data found (data_map empty). Returning empty.")
                         return pd.DataFrame()
                         
-                    print(f"DEBUG: Data map populated. Keys: {list(data_map.keys())}. Calculating...")
-                    df_calc = engine.calculate(ticker, data_map)
+                    print(f"DEBUG: Data map populated. Keys: {list(entries.keys())}. Calculating...")
+                    # Reuses the materialized result while component versions are unchanged
+                    df_calc = engine.calculate_materialized(ticker, entries, context=(timeframe, limit, source, to_timestamp), how=align)
                     
                     if not df_calc.empty:
                         print(f"DEBUG: Calculation complete. Rows: {len(df_calc)}")
@@ -116,92 +208,230 @@ class DataLoader:
                         print("DEBUG: Calculation returned empty.")
                         return pd.DataFrame()
 
-            
-            # 1. Try TradingView (Best quality, but no pagination support)
-            # If to_timestamp is requested (history load), skip TV and fallback to CCXT/YF which support history.
-            if (source == 'auto' or source == 'tv') and self.tv_loader and to_timestamp is None:
-                try:
-                    df = self._fetch_tv_wrapper(ticker, timeframe, limit)
-                    if df is not None and not df.empty:
-                        print(f"DEBUG: TV data found for {ticker} {timeframe}, rows={len(df)}")
-                        return df
-                except Exception as e:
-                    print(f"DEBUG: TV Fetch failed: {e}")
-                    pass
-
-            # 2. Try CCXT (Crypto fallback)
-            if '/' in ticker: 
-                try:
-                    print(f"DEBUG: Trying CCXT for {ticker}") 
-                    # If to_timestamp is set, we need to calculate 'since' differently logic is inside _fetch_ccxt?
-                    # No, _fetch_ccxt takes 'since'.
-                    # If to_timestamp is provided, 'since' = to_timestamp - (limit * duration).
-                    
-                    ccxt_since = None
-                    if to_timestamp:
-                        # Convert to ms
-                        to_ms = to_timestamp * 1000
-                        duration_sec = self.ccxt_exchange.parse_timeframe(timeframe)
-                        duration_ms = duration_sec * 1000
-                        ccxt_since = to_ms - (limit * duration_ms)
-                        # Ensure positive
-                        if ccxt_since < 0: ccxt_since = 0
-                    
-                    df = self._fetch_ccxt(ticker, timeframe, limit, since=ccxt_since)
-                    if not df.empty:
-                         return df
-                except Exception as e:
-                    print(f"CCXT Error: {e}")
 
-            # 3. Try yfinance (Stock/Crypto fallback)
+            # --- Plain ticker: serve from the bar cache, walking the source cascade on a miss ---
+            entry = self._fetch_entry(ticker, timeframe, limit, source, to_timestamp, is_formula)
+            if entry is None:
+                return pd.DataFrame()
+            # Callers add columns to what they get back, keep the cached frame pristine
+            return entry.df.copy()
+
+        except Exception as e:
+            print(f"CRITICAL ERROR in fetch_data: {e}")
+            import traceback
+            traceback.print_exc()
+            return pd.DataFrame()
+
+    def _fetch_entry(self, ticker, timeframe, limit, source, to_timestamp, is_formula=False):
+        """
+        Returns the BarEntry for a plain ticker (cached bars plus version stamp),
+        walking the source cascade on a miss. None if no source has data.
+        """
+        key = BarStore.make_key(ticker, timeframe, limit, source, to_timestamp)
+        return self.bar_store.get_or_fetch(
+            key, lambda: self._fetch_from_sources(ticker, timeframe, limit, source, to_timestamp, is_formula)
+        )
+
+    MAX_DATASETS = 1024
+
+    def register_dataset(self, ticker: str, timeframe: str, limit: int = 50000, source: str = 'auto',
+                         to_timestamp: int = None, align: str = 'inner') -> str:
+        """
+        Handle for a fetch, so indicator requests can name the series instead of
+        uploading it. The id is derived from the params (the same fetch gets the
+        same id); it resolves to the params, and the bars come from the bar cache.
+        """
+        params = {'ticker': ticker, 'timeframe': timeframe, 'limit': limit, 'source': source,
+                  'to_timestamp': to_timestamp, 'align': align}
+        dataset_id = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        with self._datasets_lock:
+            self._datasets[dataset_id] = params
+            self._datasets.move_to_end(dataset_id)
+            while len(self._datasets) > self.MAX_DATASETS:
+                self._datasets.popitem(last=False)
+        return dataset_id
+
+    def resolve_dataset(self, dataset_id: str) -> dict:
+        """Fetch params behind a dataset id, or None when unknown (e.g. issued before a restart)."""
+        with self._datasets_lock:
+            params = self._datasets.get(dataset_id)
+            return dict(params) if params is not None else None
+
+    def load_dataset(self, ticker: str, timeframe: str, limit: int = 50000, source: str = 'auto',
+                     to_timestamp: int = None, align: str = 'inner') -> pd.DataFrame:
+        """
+        The bars as indicator input, shaped like an uploaded series: a 'time'
+        column (unix seconds) and numeric columns on a RangeIndex. Served from
+        the bar cache, so nothing is parsed or coerced per request. The fetch
+        params ride along in attrs['dataset'] (apply_mtf uses them to load the
+        higher-timeframe history of the same series).
+        """
+        df = self.fetch_data(ticker, timeframe, limit=limit, source=source, to_timestamp=to_timestamp, align=align)
+        if df.empty:
+            return df
+        frame = pd.DataFrame(wire.frame_columns(df))
+        frame.attrs['dataset'] = {'ticker': ticker, 'timeframe': timeframe, 'limit': limit, 'source': source,
+                                  'to_timestamp': to_timestamp, 'align': align}
+        return frame
+
+    def range_stats(self, ticker: str, timeframe: str, start: int = None, end: int = None,
+                    columns=('high', 'low', 'close'), limit: int = 50000, source: str = 'auto',
+                    to_timestamp: int = None) -> dict:
+        """
+        min / max / mean / std / sum / count of each column over the bars between
+        start and end (unix seconds, inclusive; open-ended when None), e.g. for
+        autoscaling the visible range. Plain tickers answer from the range indexes
+        kept on their cached bars, so repeated queries are O(1) per column.
+        """
+        if any(op in ticker for op in ['+', '*', '(', ')', '-', ' ']) or ticker.count('/') > 1:
+            # Synthetic results are not in the bar store: index this evaluation only
+            df = self.fetch_data(ticker, timeframe, limit=limit, source=source, to_timestamp=to_timestamp)
+            entry = None
+        else:
+            entry = self._fetch_entry(ticker, timeframe, limit, source, to_timestamp)
+            df = entry.df if entry is not None else pd.DataFrame()
+        if df.empty:
+            return None
+
+        seconds = alignment.to_int64(df.index, 's')
+        lo = 0 if start is None else int(seconds.searchsorted(start, side='left'))
+        hi = len(df) if end is None else int(seconds.searchsorted(end, side='right'))
+        result = {'bars': max(0, hi - lo), 'columns': {}}
+        if hi <= lo:
+            return result
+        result['from'] = int(seconds[lo])
+        result['to'] = int(seconds[hi - 1])
+
+        for column in columns:
+            if column not in df.columns:
+                continue
+            if entry is not None:
+                index = entry.series_index(column)
+            else:
+                index = SeriesIndex(pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64', na_value=float('nan')))
+            stats = {
+                'min': index.min(lo, hi), 'max': index.max(lo, hi),
+                'mean': index.mean(lo, hi), 'std': index.std(lo, hi),
+                'sum': index.sum(lo, hi), 'count': index.count(lo, hi),
+            }
+            result['columns'][column] = {k: (None if v != v else v) for k, v in stats.items()}
+        return result
+
+    def _fetch_components(self, formula, sub_tickers, timeframe, limit, source, to_timestamp) -> dict:
+        """
+        Fetches the components of a synthetic formula concurrently.
+        Each component hits the bar cache first and concurrent requests for the
+        same component share one fetch. Returns {ticker: BarEntry}.
+        """
+        subs = [sub for sub in sub_tickers if sub != formula]
+        if len(subs) != len(sub_tickers):
+            print("DEBUG: Loop detected in sub-ticker. Skipping.")
+        if not subs:
+            return {}
+
+        def _load(sub):
+            print(f"DEBUG: Fetching component: '{sub}'")
             try:
-                # Map ticker for yfinance
-                yf_symbol = ticker.replace('/', '-') 
-                if ticker == 'BTC/USDT': yf_symbol = 'BTC-USD' 
-                
-                print(f"DEBUG: Trying yfinance for {yf_symbol} {timeframe}") 
+                return self._fetch_entry(sub, timeframe, limit, source, to_timestamp)
+            except Exception as e:
+                print(f"DEBUG: Component '{sub}' failed: {e}")
+                return None
+
+        entries = {}
+        with ThreadPoolExecutor(max_workers=min(len(subs), 8)) as pool:
+            for sub, entry in zip(subs, pool.map(_load, subs)):
+                if entry is not None:
+                    entries[sub] = entry
+                    print(f"DEBUG: Component '{sub}' loaded. Rows: {len(entry.df)} (v{entry.version})")
+                else:
+                    print(f"DEBUG: Warning - No data for component '{sub}'")
+        return entries
+
+    def _fetch_from_sources(self, ticker, timeframe, limit, source, to_timestamp, is_formula) -> pd.DataFrame:
+        """
+        Walks the source cascade (TV -> CCXT -> yfinance -> smart retry) for a plain ticker.
+        """
+        df = pd.DataFrame()
+        
+        # 1. Try TradingView (Best quality, but no pagination support)
+        # If to_timestamp is requested (history load), skip TV and fallback to CCXT/YF which support history.
+        if (source == 'auto' or source == 'tv') and self.tv_loader and to_timestamp is None:
+            try:
+                df = self._fetch_tv_wrapper(ticker, timeframe, limit)
+                if df is not None and not df.empty:
+                    print(f"DEBUG: TV data found for {ticker} {timeframe}, rows={len(df)}")
+                    return df
+            except Exception as e:
+                print(f"DEBUG: TV Fetch failed: {e}")
+                pass
+
+        # 2. Try CCXT (Crypto fallback)
+        if '/' in ticker: 
+            try:
+                print(f"DEBUG: Trying CCXT for {ticker}") 
+                # If to_timestamp is set, we need to calculate 'since' differently logic is inside _fetch_ccxt?
+                # No, _fetch_ccxt takes 'since'.
+                # If to_timestamp is provided, 'since' = to_timestamp - (limit * duration).
                 
-                end_date = None
+                ccxt_since = None
                 if to_timestamp:
-                    end_date = datetime.datetime.fromtimestamp(to_timestamp).strftime('%Y-%m-%d')
-
-                df = self._fetch_yfinance(yf_symbol, timeframe, end_date=end_date)
+                    # Convert to ms
+                    to_ms = to_timestamp * 1000
+                    duration_sec = self.ccxt_exchange.parse_timeframe(timeframe)
+                    duration_ms = duration_sec * 1000
+                    ccxt_since = to_ms - (limit * duration_ms)
+                    # Ensure positive
+                    if ccxt_since < 0: ccxt_since = 0
+                
+                df = self._fetch_ccxt(ticker, timeframe, limit, since=ccxt_since)
                 if not df.empty:
-                    return df
+                     return df
             except Exception as e:
-                print(f"YF Error: {e}")
-
-            # 4. Smart Retry (Auto-Resolve Crypto)
-            # If input is simple (e.g. "BTC"), assume it might be a crypto pair and try common variants.
-            if df.empty and '/' not in ticker and '-' not in ticker and not is_formula:
-                 # Check if it looks like a ticker (alphanumeric)
-                 if ticker.isalnum():
-                     print(f"DEBUG: Smart Resolution - Trying variations for '{ticker}'...")
-                     
-                     # Variation A: Crypto Pair (BTC -> BTC/USDT) for CCXT/TV
-                     var_a = f"{ticker}/USDT"
-                     print(f"DEBUG: Trying '{var_a}'...")
-                     df = self.fetch_data(var_a, timeframe, limit, source, to_timestamp)
-                     if not df.empty: 
-                         print(f"DEBUG: Resolved '{ticker}' to '{var_a}'")
-                         return df
-
-                     # Variation B: YFinance Crypto (BTC -> BTC-USD)
-                     var_b = f"{ticker}-USD"
-                     print(f"DEBUG: Trying '{var_b}'...")
-                     df = self.fetch_data(var_b, timeframe, limit, source, to_timestamp)
-                     if not df.empty: 
-                         print(f"DEBUG: Resolved '{ticker}' to '{var_b}'")
-                         return df
+                print(f"CCXT Error: {e}")
+
+        # 3. Try yfinance (Stock/Crypto fallback)
+        try:
+            # Map ticker for yfinance
+            yf_symbol = ticker.replace('/', '-') 
+            if ticker == 'BTC/USDT': yf_symbol = 'BTC-USD' 
             
-            print(f"DEBUG: All sources failed for {ticker}")
-            return pd.DataFrame()
+            print(f"DEBUG: Trying yfinance for {yf_symbol} {timeframe}") 
+            
+            end_date = None
+            if to_timestamp:
+                end_date = datetime.datetime.fromtimestamp(to_timestamp).strftime('%Y-%m-%d')
 
+            df = self._fetch_yfinance(yf_symbol, timeframe, end_date=end_date)
+            if not df.empty:
+                return df
         except Exception as e:
-            print(f"CRITICAL ERROR in fetch_data: {e}")
-            import traceback
-            traceback.print_exc()
-            return pd.DataFrame()
+            print(f"YF Error: {e}")
+
+        # 4. Smart Retry (Auto-Resolve Crypto)
+        # If input is simple (e.g. "BTC"), assume it might be a crypto pair and try common variants.
+        if (df is None or df.empty) and '/' not in ticker and '-' not in ticker and not is_formula:
+             # Check if it looks like a ticker (alphanumeric)
+             if ticker.isalnum():
+                 print(f"DEBUG: Smart Resolution - Trying variations for '{ticker}'...")
+                 
+                 # Variation A: Crypto Pair (BTC -> BTC/USDT) for CCXT/TV
+                 var_a = f"{ticker}/USDT"
+                 print(f"DEBUG: Trying '{var_a}'...")
+                 df = self.fetch_data(var_a, timeframe, limit, source, to_timestamp)
+                 if not df.empty: 
+                     print(f"DEBUG: Resolved '{ticker}' to '{var_a}'")
+                     return df
+
+                 # Variation B: YFinance Crypto (BTC -> BTC-USD)
+                 var_b = f"{ticker}-USD"
+                 print(f"DEBUG: Trying '{var_b}'...")
+                 df = self.fetch_data(var_b, timeframe, limit, source, to_timestamp)
+                 if not df.empty: 
+                     print(f"DEBUG: Resolved '{ticker}' to '{var_b}'")
+                     return df
+        
+        print(f"DEBUG: All sources failed for {ticker}")
+        return pd.DataFrame()
 
     def _fetch_tv_wrapper(self, ticker, timeframe, limit):
         """
@@ -235,7 +465,8 @@ class DataLoader:
         elif timeframe == '5m': tv_interval = Interval.in_5_minute
         
         # 3. Fetch
-        return self.tv_loader.fetch_tv_data(symbol, exchange, interval=tv_interval, n_bars=limit)
+        with self._tv_lock:
+            return self.tv_loader.fetch_tv_data(symbol, exchange, interval=tv_interval, n_bars=limit)
 
     def _fetch_ccxt(self, symbol: str, timeframe: str, limit: int, since: int = None) -> pd.DataFrame:
         duration_sec = self.ccxt_exchange.parse_timeframe(timeframe)
@@ -303,7 +534,8 @@ class DataLoader:
         # If start_date is provided, use it. Otherwise use period.
         if start_date:
             print(f"DEBUG: yf.download {symbol} interval={yf_timeframe} start={start_date}")
-            df = yf.download(symbol, start=start_date, interval=yf_timeframe, progress=False, auto_adjust=True)
+            with self._yf_lock:
+                df = yf.download(symbol, start=start_date, interval=yf_timeframe, progress=False, auto_adjust=True)
         elif end_date:
              # Calculate start based on period manually if only end is given?
              # Auto-period doesn't work well with specific end.
@@ -311,11 +543,13 @@ class DataLoader:
              # Assume 'limit' is large, so start = end - 5 years?
              # Let's try passing period='max' or '5y' with end_date. yfinance might support it.
              print(f"DEBUG: yf.download {symbol} interval={yf_timeframe} end={end_date} period=5y")
-             df = yf.download(symbol, end=end_date, period='5y', interval=yf_timeframe, progress=False, auto_adjust=True)
+             with self._yf_lock:
+                 df = yf.download(symbol, end=end_date, period='5y', interval=yf_timeframe, progress=False, auto_adjust=True)
         else:
             period = period_map.get(timeframe, '5y') # Default to 5y
             print(f"DEBUG: yf.download {symbol} interval={yf_timeframe} period={period}")
-            df = yf.download(symbol, period=period, interval=yf_timeframe, progress=False, auto_adjust=True)
+            with self._yf_lock:
+                df = yf.download(symbol, period=period, interval=yf_timeframe, progress=False, auto_adjust=True)
         
         if df.empty:
             return df
@@ -412,15 +646,13 @@ class DataLoader:
         Priority 1: TradingView (tvDatafeed)
         Priority 2: Legacy (CCXT/FRED)
         """
-        # 1. Try TradingView
+        # 1. Try TradingView (materialized composite, refetched only when stale)
         if self.tv_loader:
             print("Attempting to fetch Global M2 via TradingView...")
             try:
-                df_tv = self.tv_loader.get_global_m2_tv()
-                if df_tv is not None and not df_tv.empty:
-                    # Rename for consistency if needed, though get_global_m2_tv returns 'global_m2' col
-                    df_tv.index = df_tv.index.tz_localize(None) # Ensure naive
-                    return df_tv
+                self.global_m2.ensure_fresh()
+                if not self.global_m2.empty:
+                    return self.global_m2.series().to_frame(name='global_m2')
             except Exception as e:
                 print(f"TV Global M2 Fetch failed: {e}")
         
@@ -464,6 +696,8 @@ class DataLoader:
         ]
         
         m2_components = []
+        fx = self.fx_matrix
+        fx.ensure_fresh([fx.key(c[2], 'YF') for c in components if c[2]])
         
         for name, m2_ticker, fx_ticker, op in components:
             try:
@@ -482,22 +716,12 @@ class DataLoader:
                 if name == 'US':
                     m2_usd = m2_df['close']
                 else:
-                    # Fetch FX
-                    fx_df = self._fetch_yfinance(fx_ticker, timeframe='1d') 
+                    # Convert with the shared FX matrix (rate as of each publication)
+                    m2_usd = fx.convert(m2_df['close'], fx.key(fx_ticker, 'YF'), op)
                     
-                    if fx_df.empty:
+                    if m2_usd is None:
                         print(f"Warning: Could not fetch FX for {name} ({fx_ticker}). Skipping.")
                         continue
-                        
-                    # Resample FX - Use nearest with no limit to catch monthly vs daily alignments
-                    fx_resampled = fx_df['close'].reindex(m2_df.index, method='nearest')
-                    
-                    if op == 'multiply':
-                        m2_usd = m2_df['close'] * fx_resampled
-                    elif op == 'divide':
-                        m2_usd = m2_df['close'] / fx_resampled
-                    else:
-                        m2_usd = m2_df['close']
                 
                 # Check for NaNs
                 # Only drop rows where the result is NaN (missing FX or M2)
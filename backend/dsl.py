@@ -0,0 +1,588 @@
+"""
+Custom indicators in a small Pine-like language, compiled to an IndicatorGraph.
+
+    indicator("MACD cross", overlay=false)
+    fast = input.int(12, "fast")
+    macd = ta.ema(close, fast) - ta.ema(close, 26)
+    signal = ta.ema(macd, 9)
+    trend = macd > signal ? 1 : -1
+    if ta.crossunder(macd, signal)
+        trend := 0
+    plot(macd, "MACD", color=color.blue)
+    plot(signal, "Signal", color=color.orange)
+    plot(ta.crossover(macd, signal), "Buy")
+
+Supported: series arithmetic and comparisons, and/or/not, the ternary operator,
+if / else if / else blocks (both branches are computed over all bars and merged
+with a vectorized where, so ta.* calls inside a branch see every bar, not only
+the bars where it ran), the history operator x[n], the ta.* functions of ta.py,
+math.*, na()/nz(), input()/input.int()/input.float()/input.bool() (overridden by
+request params of the same title), plot() and indicator() (whose title, color,
+style and overlay settings must be constants, not per-bar series).
+
+The built-ins open/high/low/close/volume/hl2/hlc3/ohlc4/bar_index are columns of
+the request frame. `var` state is not supported: every statement is a whole-series
+expression. A script compiles to graph nodes keyed structurally, so repeated
+subexpressions are computed once and, in a batch, shared with other indicators.
+Compiled plans are cached by source hash and inputs.
+"""
+import hashlib
+import inspect
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import ta
+from indicator_graph import IndicatorGraph, ELEMENTWISE, _is_node
+
+
+class DSLError(ValueError):
+    def __init__(self, message: str, line: int = None):
+        super().__init__(f"line {line}: {message}" if line else message)
+        self.line = line
+
+
+# --- Tokens and lines ---
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>[ \t]+)
+  | (?P<comment>//.*)
+  | (?P<num>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<str>"[^"]*"|'[^']*')
+  | (?P<name>[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)
+  | (?P<op>:=|==|!=|<=|>=|[-+*/%<>?:=()\[\],])
+""", re.VERBOSE)
+
+# A line ending in one of these continues on the next one
+_CONTINUES = {'+', '-', '*', '/', '%', '?', ':', ',', '=', ':=', '==', '!=', '<', '>', '<=', '>=', 'and', 'or', 'not', '('}
+
+
+class _Line:
+    def __init__(self, indent: int, tokens: list, number: int):
+        self.indent = indent
+        self.tokens = tokens
+        self.number = number
+
+
+def _tokenize(text: str, number: int) -> list:
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise DSLError(f"unexpected character {text[pos]!r}", number)
+        pos = match.end()
+        kind = match.lastgroup
+        if kind in ('ws', 'comment'):
+            continue
+        tokens.append((kind, match.group()))
+    return tokens
+
+
+def _lines(source: str) -> list:
+    """Logical lines: physical lines joined inside brackets or after a dangling operator."""
+    lines = []
+    depth = 0
+    for number, raw in enumerate(source.splitlines(), 1):
+        tokens = _tokenize(raw, number)
+        if not tokens:
+            continue
+        if lines and (depth > 0 or lines[-1].tokens[-1][1] in _CONTINUES):
+            lines[-1].tokens.extend(tokens)
+        else:
+            expanded = raw.expandtabs(4)
+            lines.append(_Line(len(expanded) - len(expanded.lstrip()), tokens, number))
+        for kind, text in tokens:
+            if kind == 'op' and text in '([':
+                depth += 1
+            elif kind == 'op' and text in ')]':
+                depth -= 1
+    return lines
+
+
+# --- Parser ---
+# Expressions parse to tuples: ('num', v) ('str', s) ('name', id) ('call', name, args, kwargs)
+# ('index', expr, expr) ('unary', op, expr) ('bin', op, a, b) ('ternary', cond, a, b).
+
+_BINDING = {
+    '?': 10, 'or': 20, 'and': 30,
+    '==': 40, '!=': 40, '<': 50, '>': 50, '<=': 50, '>=': 50,
+    '+': 60, '-': 60, '*': 70, '/': 70, '%': 70,
+    '(': 90, '[': 90,
+}
+_UNARY_BINDING = 80
+_TYPE_WORDS = {'float', 'int', 'bool', 'series', 'simple', 'const', 'string', 'color'}
+
+
+class _Parser:
+    def __init__(self, tokens: list, line: int):
+        self.tokens = tokens
+        self.pos = 0
+        self.line = line
+
+    def peek(self, offset: int = 0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        if token[0] is None:
+            raise DSLError("unexpected end of line", self.line)
+        self.pos += 1
+        return token
+
+    def expect(self, text: str):
+        kind, value = self.take()
+        if value != text:
+            raise DSLError(f"expected '{text}', got '{value}'", self.line)
+
+    def done(self) -> bool:
+        return self.pos >= len(self.tokens)
+
+    def finish(self):
+        if not self.done():
+            raise DSLError(f"unexpected '{self.peek()[1]}'", self.line)
+
+    def expression(self, rbp: int = 0):
+        left = self._prefix()
+        while True:
+            kind, value = self.peek()
+            bp = _BINDING.get(value, 0) if kind in ('op', 'name') else 0
+            if bp <= rbp:
+                return left
+            self.take()
+            left = self._infix(value, left, bp)
+
+    def _prefix(self):
+        kind, value = self.take()
+        if kind == 'num':
+            return ('num', float(value) if any(c in value for c in '.eE') else int(value))
+        if kind == 'str':
+            return ('str', value[1:-1])
+        if kind == 'name':
+            if value == 'not':
+                return ('unary', 'not', self.expression(_UNARY_BINDING))
+            if value in _BINDING or value in ('if', 'else'):
+                raise DSLError(f"unexpected '{value}'", self.line)
+            return ('name', value)
+        if value == '(':
+            inner = self.expression()
+            self.expect(')')
+            return inner
+        if value in ('-', '+'):
+            operand = self.expression(_UNARY_BINDING)
+            return ('unary', 'neg', operand) if value == '-' else operand
+        raise DSLError(f"unexpected '{value}'", self.line)
+
+    def _infix(self, op: str, left, bp: int):
+        if op == '?':
+            then = self.expression()
+            self.expect(':')
+            return ('ternary', left, then, self.expression(bp - 1))
+        if op == '(':
+            if left[0] != 'name':
+                raise DSLError("only named functions can be called", self.line)
+            return self._call(left[1])
+        if op == '[':
+            offset = self.expression()
+            self.expect(']')
+            return ('index', left, offset)
+        return ('bin', op, left, self.expression(bp))
+
+    def _call(self, name: str):
+        args, kwargs = [], {}
+        if self.peek()[1] != ')':
+            while True:
+                if self.peek()[0] == 'name' and self.peek(1)[1] == '=':
+                    key = self.take()[1]
+                    self.take()
+                    kwargs[key] = self.expression()
+                elif kwargs:
+                    raise DSLError("positional argument after keyword argument", self.line)
+                else:
+                    args.append(self.expression())
+                if self.peek()[1] != ',':
+                    break
+                self.take()
+        self.expect(')')
+        return ('call', name, args, kwargs)
+
+
+def _statement(line: _Line):
+    """One line -> ('assign' | 'reassign', name, expr) / ('if', cond) / ('else', cond or None) / ('expr', expr)."""
+    p = _Parser(line.tokens, line.number)
+    first = p.peek()[1]
+    if first in ('var', 'varip'):
+        raise DSLError(f"'{first}' state is not supported (statements are whole-series expressions)", line.number)
+    if first == 'if':
+        p.take()
+        cond = p.expression()
+        p.finish()
+        return ('if', cond)
+    if first == 'else':
+        p.take()
+        if p.done():
+            return ('else', None)
+        p.expect('if')
+        cond = p.expression()
+        p.finish()
+        return ('else', cond)
+    if first in _TYPE_WORDS and p.peek(1)[0] == 'name' and p.peek(2)[1] == '=':
+        p.take()
+    if p.peek()[0] == 'name' and p.peek(1)[1] in ('=', ':='):
+        name = p.take()[1]
+        op = p.take()[1]
+        expr = p.expression()
+        p.finish()
+        return ('assign' if op == '=' else 'reassign', name, expr)
+    expr = p.expression()
+    p.finish()
+    return ('expr', expr)
+
+
+def _block(lines: list, i: int, indent: int):
+    """Statements of one block: [(kind, ..., line number)], and the index after it."""
+    stmts = []
+    while i < len(lines) and lines[i].indent >= indent:
+        line = lines[i]
+        if line.indent > indent:
+            raise DSLError("unexpected indent", line.number)
+        stmt = _statement(line)
+        if stmt[0] == 'else':
+            raise DSLError("'else' without 'if'", line.number)
+        if stmt[0] != 'if':
+            stmts.append(stmt + (line.number,))
+            i += 1
+            continue
+        node, i = _if_block(lines, i, indent, stmt[1])
+        stmts.append(node)
+    return stmts, i
+
+
+def _if_block(lines: list, i: int, indent: int, cond):
+    number = lines[i].number
+    if i + 1 >= len(lines) or lines[i + 1].indent <= indent:
+        raise DSLError("'if' needs an indented block", number)
+    then, i = _block(lines, i + 1, lines[i + 1].indent)
+    otherwise = []
+    if i < len(lines) and lines[i].indent == indent and lines[i].tokens[0][1] == 'else':
+        stmt = _statement(lines[i])
+        if stmt[1] is not None:
+            # else if: a nested if in the else branch
+            nested, i = _if_block(lines, i, indent, stmt[1])
+            otherwise = [nested]
+        else:
+            if i + 1 >= len(lines) or lines[i + 1].indent <= indent:
+                raise DSLError("'else' needs an indented block", lines[i].number)
+            otherwise, i = _block(lines, i + 1, lines[i + 1].indent)
+    return ('if', cond, then, otherwise, number), i
+
+
+def parse(source: str) -> list:
+    lines = _lines(source)
+    if not lines:
+        raise DSLError("empty script")
+    stmts, i = _block(lines, 0, lines[0].indent)
+    if i < len(lines):
+        raise DSLError("unexpected dedent", lines[i].number)
+    return stmts
+
+
+# --- Compiler ---
+
+PRICE_SOURCES = {'open', 'high', 'low', 'close', 'volume'}
+COLORS = {
+    'red': '#ff5252', 'green': '#4caf50', 'blue': '#2196f3', 'orange': '#ff9800', 'yellow': '#ffeb3b',
+    'purple': '#9c27b0', 'aqua': '#00bcd4', 'teal': '#009688', 'lime': '#00e676', 'gray': '#787b86',
+    'white': '#ffffff', 'black': '#363a45', 'fuchsia': '#e040fb', 'maroon': '#880e4f', 'navy': '#311b92',
+    'olive': '#808000', 'silver': '#b2b5be',
+}
+PLOT_STYLES = {'line': 'line', 'linebr': 'line', 'stepline': 'line', 'histogram': 'histogram',
+               'columns': 'histogram', 'area': 'area', 'circles': 'markers', 'cross': 'markers'}
+_PALETTE = ['#2962ff', '#ff9800', '#26a69a', '#ef5350', '#7e57c2', '#8d6e63']
+
+TA_FUNCTIONS = {name for name, fn in inspect.getmembers(ta, inspect.isfunction)
+                if not name.startswith('_') and fn.__module__ == ta.__name__}
+# Leading series arguments of each ta function (the rest must be constants)
+_SERIES_ARGS = {'crossover': 2, 'crossunder': 2, 'cross': 2, 'valuewhen': 2, 'tr': 3, 'atr': 3}
+# Pine's ta.tr / ta.atr read the chart's high, low and close implicitly
+_IMPLICIT_HLC = {'tr', 'atr'}
+# ta functions that are the same kernels as existing graph ops (shared with built-in indicators)
+_GRAPH_OPS = {'sma': 'sma', 'ema': 'ema'}
+MATH_FUNCTIONS = {'abs', 'log', 'log10', 'exp', 'sqrt', 'pow', 'max', 'min', 'sign', 'round', 'floor', 'ceil'}
+
+
+def _constant(value):
+    """numpy scalar results of folded constants -> plain Python values."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class Plan:
+    """A compiled script: its graph, {output column: node}, plots, meta and input schema."""
+
+    def __init__(self, graph: IndicatorGraph, outputs: dict, plots: dict, meta: dict, inputs: list):
+        self.graph = graph
+        self.outputs = outputs
+        self.plots = plots
+        self.meta = meta
+        self.inputs = inputs
+
+
+class _Compiler:
+    def __init__(self, params: dict):
+        self.params = params or {}
+        self.graph = IndicatorGraph()
+        self.env = {}
+        self.inputs = []
+        self.outputs = {}
+        self.plots = {}
+        self.meta = {'type': 'oscillator', 'name': 'Custom'}
+
+    def compile(self, stmts: list) -> Plan:
+        self.block(stmts, top=True)
+        if not self.outputs:
+            raise DSLError("script has no plot()")
+        return Plan(self.graph, self.outputs, self.plots, self.meta, self.inputs)
+
+    # --- Statements ---
+
+    def block(self, stmts: list, top: bool = False):
+        for stmt in stmts:
+            kind, line = stmt[0], stmt[-1]
+            if kind == 'assign':
+                name = stmt[1]
+                if name in self.env or name in PRICE_SOURCES:
+                    raise DSLError(f"'{name}' is already declared, use ':=' to reassign it", line)
+                self.env[name] = self.expr(stmt[2], line, name)
+            elif kind == 'reassign':
+                name = stmt[1]
+                if name not in self.env:
+                    raise DSLError(f"'{name}' is not declared", line)
+                self.env[name] = self.expr(stmt[2], line, name)
+            elif kind == 'if':
+                self.branch(stmt[1], stmt[2], stmt[3], line)
+            elif stmt[1][0] == 'call' and stmt[1][1] in ('plot', 'indicator', 'study'):
+                if not top:
+                    raise DSLError(f"{stmt[1][1]}() must be at the top level", line)
+                self.declaration(stmt[1], line)
+            else:
+                raise DSLError("expression result is not used (assign or plot it)", line)
+
+    def branch(self, cond_expr, then: list, otherwise: list, line: int):
+        """Both branches run over every bar; variables they reassign are merged with where(cond)."""
+        cond = self.expr(cond_expr, line)
+        outer = self.env
+        self.env = dict(outer)
+        self.block(then)
+        then_env = self.env
+        self.env = dict(outer)
+        self.block(otherwise)
+        else_env = self.env
+        self.env = outer
+        for name in outer:
+            a, b = then_env[name], else_env[name]
+            if a == b:
+                outer[name] = a
+            elif _is_node(cond):
+                outer[name] = self.graph.node('where', cond, a, b)
+            else:
+                outer[name] = a if cond else b
+
+    def declaration(self, call, line: int):
+        _, name, args, kwargs = call
+        if name == 'plot':
+            values = self._bind(args, kwargs, ['series', 'title'], line, 'plot')
+            title = self._setting(values, 'title', line, 'plot') if 'title' in values else f"plot{len(self.outputs)}"
+            key = str(title)
+            if key in self.outputs:
+                raise DSLError(f"duplicate plot title '{key}'", line)
+            self.outputs[key] = self.node(self.expr(values['series'], line))
+            color = self._setting(values, 'color', line, 'plot') if 'color' in values else _PALETTE[len(self.plots) % len(_PALETTE)]
+            style = self._setting(values, 'style', line, 'plot') if 'style' in values else 'line'
+            self.plots[key] = {'type': style, 'color': color, 'title': key}
+        else:
+            values = self._bind(args, kwargs, ['title', 'shorttitle', 'overlay'], line, name)
+            if 'title' in values:
+                self.meta['name'] = str(self._setting(values, 'title', line, name))
+            if 'overlay' in values:
+                self.meta['type'] = 'overlay' if self._setting(values, 'overlay', line, name) else 'oscillator'
+
+    def _setting(self, values: dict, key: str, line: int, fn: str):
+        """A plot()/indicator() setting: these describe the whole plot, so per-bar values are rejected."""
+        value = self.expr(values[key], line)
+        if _is_node(value):
+            raise DSLError(f"{fn}(): '{key}' must be a constant", line)
+        return value
+
+    def _bind(self, args, kwargs, names: list, line: int, fn: str) -> dict:
+        if len(args) > len(names):
+            raise DSLError(f"{fn}() takes at most {len(names)} positional arguments", line)
+        values = dict(zip(names, args))
+        for key, value in kwargs.items():
+            if key in values:
+                raise DSLError(f"{fn}() got '{key}' twice", line)
+            values[key] = value
+        return values
+
+    # --- Expressions ---
+
+    def node(self, value):
+        """A graph node for a value (constants become a filled column)."""
+        return value if _is_node(value) else self.graph.node('const', value)
+
+    def expr(self, e, line: int, target: str = None):
+        kind = e[0]
+        if kind in ('num', 'str'):
+            return e[1]
+        if kind == 'name':
+            return self.name(e[1], line)
+        if kind == 'unary':
+            return self.elementwise(e[1], [self.expr(e[2], line)])
+        if kind == 'bin':
+            return self.elementwise(e[1], [self.expr(e[2], line), self.expr(e[3], line)])
+        if kind == 'ternary':
+            cond = self.expr(e[1], line)
+            a, b = self.expr(e[2], line), self.expr(e[3], line)
+            if not _is_node(cond):
+                return a if cond else b
+            return self.graph.node('where', cond, a, b)
+        if kind == 'index':
+            offset = self.expr(e[2], line)
+            if _is_node(offset) or isinstance(offset, str) or offset != int(offset) or offset < 0:
+                raise DSLError("history offset [n] must be a non-negative constant", line)
+            value = self.expr(e[1], line)
+            if not _is_node(value) or int(offset) == 0:
+                return value
+            return self.graph.node('shift', value, int(offset))
+        if kind == 'call':
+            return self.call(e[1], e[2], e[3], line, target)
+        raise DSLError(f"unsupported expression {kind}", line)
+
+    def name(self, name: str, line: int):
+        if name in self.env:
+            return self.env[name]
+        if name in PRICE_SOURCES:
+            return self.graph.node('col', name)
+        g = self.graph
+        if name == 'hl2':
+            return g.node('ew', '/', g.node('ew', '+', g.node('col', 'high'), g.node('col', 'low')), 2.0)
+        if name == 'hlc3':
+            hl = g.node('ew', '+', g.node('col', 'high'), g.node('col', 'low'))
+            return g.node('ew', '/', g.node('ew', '+', hl, g.node('col', 'close')), 3.0)
+        if name == 'ohlc4':
+            oh = g.node('ew', '+', g.node('col', 'open'), g.node('col', 'high'))
+            lc = g.node('ew', '+', g.node('col', 'low'), g.node('col', 'close'))
+            return g.node('ew', '/', g.node('ew', '+', oh, lc), 4.0)
+        if name == 'bar_index':
+            return g.node('bar_index')
+        if name == 'ta.tr':
+            return self.call('ta.tr', [], {}, line)
+        if name in ('true', 'false'):
+            return name == 'true'
+        if name == 'na':
+            return float('nan')
+        if name.startswith('color.') and name[6:] in COLORS:
+            return COLORS[name[6:]]
+        if name.startswith('plot.style_') and name[11:] in PLOT_STYLES:
+            return PLOT_STYLES[name[11:]]
+        raise DSLError(f"unknown name '{name}'", line)
+
+    def elementwise(self, op: str, values: list):
+        if not any(_is_node(v) for v in values):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return _constant(ELEMENTWISE[op](*values))
+        return self.graph.node('ew', op, *values)
+
+    def call(self, name: str, args: list, kwargs: dict, line: int, target: str = None):
+        if name in ('input', 'input.int', 'input.float', 'input.bool'):
+            return self.input(name, args, kwargs, line, target)
+        values = [self.expr(a, line) for a in args]
+        named = {k: self.expr(v, line) for k, v in kwargs.items()}
+        if name.startswith('ta.') and name[3:] in TA_FUNCTIONS:
+            return self.ta_call(name[3:], values, named, line)
+        if name.startswith('math.') and name[5:] in MATH_FUNCTIONS:
+            if named:
+                raise DSLError(f"{name}() takes positional arguments only", line)
+            return self.elementwise(name[5:], values)
+        if name in ('na', 'nz'):
+            return self.elementwise(name, values + list(named.values()))
+        raise DSLError(f"unknown function '{name}'", line)
+
+    def ta_call(self, fn: str, values: list, named: dict, line: int):
+        if fn in _IMPLICIT_HLC:
+            values = [self.graph.node('col', c) for c in ('high', 'low', 'close')] + values
+        signature = inspect.signature(getattr(ta, fn))
+        try:
+            bound = signature.bind(*values, **named)
+        except TypeError as e:
+            raise DSLError(f"ta.{fn}: {e}", line)
+        bound.apply_defaults()
+        series_count = _SERIES_ARGS.get(fn, 1)
+        args = []
+        for i, (param, value) in enumerate(bound.arguments.items()):
+            if i < series_count:
+                args.append(self.node(value))
+            elif _is_node(value):
+                raise DSLError(f"ta.{fn}: '{param}' must be a constant", line)
+            else:
+                args.append(value)
+        if fn in _GRAPH_OPS:
+            return self.graph.node(_GRAPH_OPS[fn], args[0], int(args[1]))
+        return self.graph.node('ta', fn, *args)
+
+    def input(self, name: str, args: list, kwargs: dict, line: int, target: str = None):
+        values = self._bind(args, kwargs, ['defval', 'title'], line, name)
+        if 'defval' not in values:
+            raise DSLError(f"{name}() needs a default value", line)
+        default = self.expr(values['defval'], line)
+        title = str(self.expr(values['title'], line)) if 'title' in values else (target or f"input{len(self.inputs)}")
+        if _is_node(default):
+            raise DSLError(f"{name}() default must be a constant", line)
+        kind = name.split('.')[1] if '.' in name else type(default).__name__
+        value = self.params.get(title, default)
+        try:
+            if kind == 'int':
+                value = int(float(value))
+            elif kind == 'float':
+                value = float(value)
+            elif kind == 'bool':
+                value = value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+        except (TypeError, ValueError):
+            raise DSLError(f"input '{title}': invalid value {value!r}", line)
+        self.inputs.append({'name': title, 'default': default, 'type': kind})
+        return value
+
+
+# --- Plan cache ---
+
+_PLANS = OrderedDict()
+_PLANS_LOCK = threading.Lock()
+MAX_PLANS = 128
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def compile_plan(source: str, params: dict = None) -> Plan:
+    """
+    Parses and compiles a script with its inputs set from params; plans are cached
+    by (source hash, params) so re-running a script only evaluates its graph.
+    """
+    if not source or not source.strip():
+        raise DSLError("empty script")
+    params = {k: v for k, v in (params or {}).items() if k not in ('source', 'timeframe')}
+    key = (source_hash(source), tuple(sorted((str(k), repr(v)) for k, v in params.items())))
+    with _PLANS_LOCK:
+        plan = _PLANS.get(key)
+        if plan is not None:
+            _PLANS.move_to_end(key)
+            return plan
+    plan = _Compiler(params).compile(parse(source))
+    with _PLANS_LOCK:
+        _PLANS[key] = plan
+        while len(_PLANS) > MAX_PLANS:
+            _PLANS.popitem(last=False)
+    return plan
@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from macro_composite import DAY_NS, _clean, _days
+
+
+class FxMatrix:
+    """
+    Daily FX rates shared by every macro composite: one (days x pairs) float
+    array holding each pair's rate as of each day (NaN before its first quote).
+
+    Pairs are keyed 'EXCHANGE:SYMBOL' and fetched through fetch_fx(key) the
+    first time they are needed and again once older than the TTL. A refetch
+    only rewrites the pair's column from its first changed day and bumps
+    versions[key], so dependents can tell which pairs were revised. The matrix
+    is persisted to data/fx_matrix.csv.
+
+    Lookups are vectorized: the as-of row of a timestamp is a subtraction on
+    the daily grid, so converting a series to USD is a single gather and multiply.
+    """
+
+    def __init__(self, fetch_fx, cache_dir: str = 'data', ttl_seconds: float = 6 * 3600):
+        self._fetch_fx = fetch_fx
+        self.cache_path = os.path.join(cache_dir, "fx_matrix.csv")
+        self.ttl = ttl_seconds
+
+        self._lock = threading.RLock()
+        self.pairs = []
+        self._col = {}
+        self._start_day = None
+        self._rates = np.empty((0, 0))
+        self.versions = {}
+        self._fetched_at = {}
+        self._in_flight = set()  # pairs being refetched (single-flight per pair)
+        self._loaded = False
+
+    @staticmethod
+    def key(symbol: str, exchange: str) -> str:
+        """Matrix key of an FX pair, e.g. 'FX:EURUSD' or 'YF:JPY=X'."""
+        return f"{exchange}:{symbol}"
+
+    # --- Lifecycle ---
+
+    def ensure_fresh(self, pairs: list):
+        """
+        Loads the persisted matrix on first use and refetches the given pairs that are
+        stale, outside the lock; a pair another caller is already refetching is skipped.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            now = time.time()
+            stale = [p for p in dict.fromkeys(pairs)
+                     if p not in self._in_flight and (now - self._fetched_at.get(p, 0.0)) >= self.ttl]
+            self._in_flight.update(stale)
+        if stale:
+            try:
+                self.refresh(stale)
+            finally:
+                with self._lock:
+                    self._in_flight.difference_update(stale)
+
+    def refresh(self, pairs: list):
+        changed = []
+        for pair in pairs:
+            try:
+                series = self._fetch_fx(pair)
+            except Exception as e:
+                print(f"  [fx_matrix] {pair} fetch failed: {e}")
+                series = None
+            with self._lock:
+                self._fetched_at[pair] = time.time()
+            if series is None or series.empty:
+                print(f"  [fx_matrix] {pair} returned no data, keeping previous rates.")
+                continue
+            if self.apply(pair, series):
+                changed.append(pair)
+
+        if changed:
+            print(f"[fx_matrix] Updated pairs: {changed}")
+            self._save()
+
+    def _load(self):
+        self._loaded = True
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            stored = pd.read_csv(self.cache_path, index_col=0, parse_dates=True, float_precision='round_trip')
+        except Exception as e:
+            print(f"[fx_matrix] Cache read error: {e}")
+            return
+        if stored.empty:
+            return
+        days = _days(stored.index)
+        fetched_at = os.path.getmtime(self.cache_path)
+        # Stored rows are the contiguous daily grid
+        self._start_day = int(days[0])
+        self._rates = stored.to_numpy(dtype='float64').copy()
+        self.pairs = list(stored.columns)
+        self._col = {p: i for i, p in enumerate(self.pairs)}
+        for pair in self.pairs:
+            self.versions[pair] = self.versions.get(pair, 0) + 1
+            self._fetched_at[pair] = fetched_at
+        print(f"[fx_matrix] Loaded {len(self.pairs)} pairs from cache.")
+
+    def _save(self):
+        try:
+            self.frame().to_csv(self.cache_path)
+        except Exception as e:
+            print(f"[fx_matrix] Cache write error: {e}")
+
+    # --- Incremental maintenance ---
+
+    def apply(self, pair: str, series: pd.Series) -> bool:
+        """Stores a new version of one pair's quotes. Returns False when no day's rate changed."""
+        series = _clean(series)
+        if series.empty:
+            return False
+        days = _days(series.index)
+        with self._lock:
+            if pair not in self._col:
+                self._col[pair] = len(self.pairs)
+                self.pairs.append(pair)
+                self._rates = np.hstack([self._rates, np.full((len(self._rates), 1), np.nan)])
+            self._cover(int(days[0]), int(days[-1]))
+
+            col = self._col[pair]
+            grid_days = np.arange(self._start_day, self._start_day + len(self._rates))
+            pos = np.searchsorted(days, grid_days, side='right') - 1
+            new = series.to_numpy()[np.maximum(pos, 0)]
+            new[pos < 0] = np.nan
+
+            old = self._rates[:, col]
+            differs = ~((old == new) | (np.isnan(old) & np.isnan(new)))
+            if not differs.any():
+                return False
+            first = int(differs.argmax())
+            self._rates[first:, col] = new[first:]
+            self.versions[pair] = self.versions.get(pair, 0) + 1
+            return True
+
+    def _cover(self, first_day: int, last_day: int):
+        """Grows the grid so it spans [first_day, last_day]; new trailing rows carry the last rates forward."""
+        if self._start_day is None or len(self._rates) == 0:
+            self._start_day = first_day
+            self._rates = np.full((last_day - first_day + 1, len(self.pairs)), np.nan)
+            return
+        if first_day < self._start_day:
+            head = np.full((self._start_day - first_day, len(self.pairs)), np.nan)
+            self._rates = np.vstack([head, self._rates])
+            self._start_day = first_day
+        end_day = self._start_day + len(self._rates) - 1
+        if last_day > end_day:
+            tail = np.repeat(self._rates[-1:], last_day - end_day, axis=0)
+            self._rates = np.vstack([self._rates, tail])
+
+    # --- Reads ---
+
+    def asof(self, pairs: list, times_ns, fill_before: bool = False) -> np.ndarray:
+        """
+        Rates of several pairs as of each timestamp (int64 ns): a (len(times), len(pairs))
+        array. Times before a pair's first quote are NaN, or its first rate with
+        fill_before; unknown pairs are all NaN.
+        """
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        with self._lock:
+            out = np.full((len(times_ns), len(pairs)), np.nan)
+            known = [(i, self._col[p]) for i, p in enumerate(pairs) if p in self._col]
+            if not known or len(self._rates) == 0:
+                return out
+            pos = times_ns // DAY_NS - self._start_day
+            rows = np.clip(pos, 0, len(self._rates) - 1)
+            dst, src = zip(*known)
+            block = self._rates[rows][:, list(src)]
+            block[pos < 0] = np.nan
+            if fill_before:
+                columns = self._rates[:, list(src)]
+                valid = ~np.isnan(columns)
+                first = columns[valid.argmax(axis=0), np.arange(columns.shape[1])]
+                block = np.where(np.isnan(block), first, block)
+            out[:, list(dst)] = block
+            return out
+
+    def rate(self, pair: str, times_ns, fill_before: bool = False) -> np.ndarray:
+        return self.asof([pair], times_ns, fill_before)[:, 0]
+
+    def convert(self, series: pd.Series, pair: str, operation: str = 'multiply'):
+        """
+        Local-currency series -> USD with the rate as of each date ('multiply' for
+        XXXUSD quotes, 'divide' for USDXXX). Dates before the pair's first quote
+        use its first rate. None when the pair has no rates.
+        """
+        if pair not in self._col:
+            return None
+        rate = self.rate(pair, _days(series.index) * DAY_NS, fill_before=True)
+        values = series.to_numpy(dtype='float64')
+        values = values / rate if operation == 'divide' else values * rate
+        return pd.Series(values, index=series.index, name=series.name)
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            days = np.arange(self._start_day or 0, (self._start_day or 0) + len(self._rates), dtype=np.int64)
+            index = pd.DatetimeIndex((days * DAY_NS).view('datetime64[ns]'))
+            return pd.DataFrame(self._rates.copy(), index=index, columns=list(self.pairs))
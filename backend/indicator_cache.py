@@ -0,0 +1,238 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(df: pd.DataFrame, rows: int = None, columns=None) -> str:
+    """
+    Cheap content hash of a frame (or of its first `rows` rows): column names,
+    dtypes and raw value bytes, plus the index when it carries information.
+    columns limits it to the columns an indicator reads ('time' always counts).
+    """
+    if rows is not None:
+        df = df.iloc[:rows]
+    h = hashlib.sha1()  # hardware-accelerated on most CPUs, about twice as fast as blake2b here
+    h.update(str(len(df)).encode())
+    if not isinstance(df.index, pd.RangeIndex):
+        index = np.asarray(df.index)
+        h.update(str(index.dtype).encode())
+        if index.dtype.kind in 'iumM':
+            h.update(np.ascontiguousarray(index).view(np.uint8).data)
+        else:
+            h.update(np.ascontiguousarray(pd.util.hash_array(index.astype(object))).data)
+    if columns is not None:
+        columns = [col for col in dict.fromkeys(('time', *columns)) if col in df.columns]
+    for col in (df.columns if columns is None else columns):
+        values = df[col].to_numpy()
+        h.update(f"{col}:{values.dtype}".encode())
+        if values.dtype.kind in 'biufcmM':
+            h.update(np.ascontiguousarray(values).view(np.uint8).data)
+        else:
+            h.update(np.ascontiguousarray(pd.util.hash_array(values.astype(object))).data)
+    return h.hexdigest()
+
+
+def normalize_params(params: dict) -> tuple:
+    """
+    Canonical, hashable form of indicator params, so {"length": "20"},
+    {"length": 20} and {"length": 20.0} share one cache entry.
+    """
+    def norm(value):
+        if isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                return value
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            value = float(value)
+            return int(value) if value.is_integer() else value
+        if isinstance(value, (list, tuple)):
+            return tuple(norm(v) for v in value)
+        if isinstance(value, dict):
+            return normalize_params(value)
+        return str(value)
+    return tuple(sorted((str(k), norm(v)) for k, v in (params or {}).items()))
+
+
+def _estimate_bytes(result: dict) -> int:
+    """Rough in-memory size of a packaged result (columns, or records of boxed values)."""
+    records = result.get("data") or []
+    size = 1024
+    if isinstance(records, dict):
+        for values in records.values():
+            values = np.asarray(values)
+            size += values.nbytes + (len(values) * 32 if values.dtype.kind == 'O' else 0)
+    elif records:
+        first = records[0]
+        per_record = sys.getsizeof(first) + sum(sys.getsizeof(v) for v in first.values()) + 8
+        size += per_record * len(records)
+    return size
+
+
+def _freeze(result: dict) -> dict:
+    """Marks a result's column arrays read-only before it is shared through the cache."""
+    data = result.get("data")
+    if isinstance(data, dict):
+        for values in data.values():
+            if isinstance(values, np.ndarray):
+                values.setflags(write=False)
+    return result
+
+
+def _served(result: dict) -> dict:
+    """
+    What a caller gets for a cached result: its own dicts (data, meta, plots)
+    over the shared read-only arrays, so reassigning columns or slicing the
+    result never changes the cached entry.
+    """
+    out = dict(result)
+    for key in ("data", "meta", "plots"):
+        if isinstance(out.get(key), dict):
+            out[key] = dict(out[key])
+    return out
+
+
+class CacheEntry:
+    """
+    A packaged indicator result for one input.
+
+    rows/fingerprint identify the input it was computed from. For indicators
+    that can be extended bar by bar, `state` is the streaming state after the
+    last row.
+    """
+
+    def __init__(self, result: dict, rows: int, fingerprint: str, state=None):
+        self.result = result
+        self.rows = rows
+        self.fingerprint = fingerprint
+        self.state = state
+        self.nbytes = _estimate_bytes(result)
+
+
+class IndicatorCache:
+    """
+    LRU cache of indicator results keyed by (indicator, normalized params, extra key, input fingerprint),
+    bounded by the estimated byte size of the stored results.
+
+    When an earlier result was computed from a strict prefix of the new input
+    (a chart that gained bars), `extend` computes only the new tail.
+
+    Cached results are shared: their column arrays are read-only and every call
+    returns a shallow copy of the result's dicts.
+    """
+
+    # How many shorter inputs to try as a prefix before recomputing
+    MAX_PREFIX_CANDIDATES = 4
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_series = {}
+        self._bytes = 0
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, name: str, params: dict, df: pd.DataFrame, compute, extend=None, warm=None, columns=None,
+                       key_extra: tuple = ()):
+        """
+        Returns the cached result for this input, extends a cached prefix, or calls compute().
+
+        extend(entry, df) -> (result, state) or None, computing rows entry.rows: from
+        the entry's state. warm(df) -> the streaming state after df's last row, stored
+        with a freshly computed result so the next longer input can be extended.
+        columns: the input columns the indicator reads (None: all of them).
+        key_extra: whatever else the result depends on (e.g. the kernel backend).
+        Only successful (non-error) dict results are cached.
+        """
+        series_key = (name, normalize_params(params)) + tuple(key_extra)
+        fp = fingerprint(df, columns=columns)
+
+        with self._lock:
+            entry = self._entries.get(series_key + (fp,))
+            if entry is not None:
+                self._entries.move_to_end(series_key + (fp,))
+                self.hits += 1
+                return _served(entry.result)
+
+        state = None
+        result = None
+        if extend is not None:
+            prefix = self._find_prefix(series_key, df, columns)
+            if prefix is not None:
+                extended = extend(prefix, df)
+                if extended is not None:
+                    result, state = extended
+                    with self._lock:
+                        self.prefix_hits += 1
+
+        if result is None:
+            with self._lock:
+                self.misses += 1
+            result = compute()
+
+        if isinstance(result, dict) and "error" not in result:
+            if state is None and warm is not None:
+                state = warm(df)
+            self._store(series_key, CacheEntry(_freeze(result), len(df), fp, state=state))
+            return _served(result)
+        return result
+
+    def _find_prefix(self, series_key: tuple, df: pd.DataFrame, columns=None):
+        """Longest cached input of the same indicator that is a strict prefix of df."""
+        with self._lock:
+            candidates = [self._entries.get(series_key + (fp,)) for fp in self._by_series.get(series_key, ())]
+        candidates = sorted((e for e in candidates if e is not None and 0 < e.rows < len(df)), key=lambda e: -e.rows)
+
+        for entry in candidates[:self.MAX_PREFIX_CANDIDATES]:
+            if entry.state is not None and fingerprint(df, entry.rows, columns) == entry.fingerprint:
+                with self._lock:
+                    if series_key + (entry.fingerprint,) in self._entries:
+                        self._entries.move_to_end(series_key + (entry.fingerprint,))
+                return entry
+        return None
+
+    def _store(self, series_key: tuple, entry: CacheEntry):
+        if entry.nbytes > self.max_bytes:
+            return
+        key = series_key + (entry.fingerprint,)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._by_series.setdefault(series_key, set()).add(entry.fingerprint)
+            self._bytes += entry.nbytes
+
+            while self._bytes > self.max_bytes and self._entries:
+                key, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                fps = self._by_series.get(key[:-1])
+                if fps is not None:
+                    fps.discard(key[-1])
+                    if not fps:
+                        del self._by_series[key[:-1]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_series.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "prefix_hits": self.prefix_hits,
+                "misses": self.misses,
+            }
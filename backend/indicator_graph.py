@@ -0,0 +1,223 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import kernels
+import ta
+
+
+# Primitive operations on float64 arrays. Each node is (op, *args); args that
+# are node keys are resolved to their computed arrays first. The arithmetic is
+# exactly that of the kernels behind the tv functions, so a batched indicator
+# equals its standalone result bit for bit.
+OPS = {
+    'col': lambda df, name: kernels.as_array(df[name]),
+    'sma': kernels.sma,
+    'ema': kernels.ema,
+    'rma': kernels.rma,
+    'stdev': kernels.rolling_std,
+    'diff': kernels.diff,
+    'gain': lambda d: np.maximum(d, 0),
+    'loss': lambda d: -1 * np.minimum(d, 0),
+    'add': lambda a, b: a + b,
+    'sub': lambda a, b: a - b,
+    'div': lambda a, b: a / b,
+    'scale': lambda s, k: k * s,
+    'rsi': lambda rs: 100 - (100 / (1 + rs)),
+    # Custom (DSL) indicators, see dsl.py
+    'const': lambda df, value: np.full(len(df), value),
+    'bar_index': lambda df: np.arange(len(df), dtype='float64'),
+    'ta': lambda name, *args: np.asarray(getattr(ta, name)(*args)),
+    'ew': lambda name, *args: ELEMENTWISE[name](*args),
+    'where': lambda cond, a, b: np.where(ta._bool(cond), a, b),
+    'shift': lambda x, n: ta._shift(kernels.as_array(x), n),
+}
+
+# Operations that read the frame itself rather than other nodes
+FRAME_OPS = {'col', 'const', 'bar_index'}
+
+# Elementwise operators and math.* functions with Pine's na rules: arithmetic
+# propagates NaN, comparisons and logic treat it as false
+ELEMENTWISE = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.divide,
+    '%': np.fmod,
+    '==': np.equal,
+    '!=': lambda a, b: ~np.equal(a, b) & ~(np.isnan(a) | np.isnan(b)),
+    '<': np.less,
+    '>': np.greater,
+    '<=': np.less_equal,
+    '>=': np.greater_equal,
+    'and': lambda a, b: ta._bool(a) & ta._bool(b),
+    'or': lambda a, b: ta._bool(a) | ta._bool(b),
+    'not': lambda a: ~ta._bool(a),
+    'neg': np.negative,
+    'abs': np.abs,
+    'log': np.log,
+    'log10': np.log10,
+    'exp': np.exp,
+    'sqrt': np.sqrt,
+    'pow': np.power,
+    'max': np.maximum,
+    'min': np.minimum,
+    'sign': np.sign,
+    'round': np.round,
+    'floor': np.floor,
+    'ceil': np.ceil,
+    'na': lambda a: np.isnan(kernels.as_array(a)),
+    'nz': lambda a, b=0.0: np.where(np.isnan(kernels.as_array(a)), b, a),
+}
+
+
+def _is_node(arg) -> bool:
+    return isinstance(arg, tuple) and len(arg) > 0 and arg[0] in OPS
+
+
+class IndicatorGraph:
+    """
+    Dependency graph of primitive operations shared by several indicators.
+
+    Nodes are keyed structurally, so "EMA 12" requested by MACD and by an EMA
+    pane, or the diff/clip pair behind two RSIs, are the same node and are
+    computed once.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+
+    def node(self, op: str, *args) -> tuple:
+        key = (op,) + args
+        if key not in self.nodes:
+            self.nodes[key] = [a for a in args if _is_node(a)]
+        return key
+
+    def close(self, column: str = 'close') -> tuple:
+        return self.node('col', column)
+
+    def merge(self, other: 'IndicatorGraph'):
+        """Adds another graph's nodes; nodes both graphs share stay single."""
+        for key, deps in other.nodes.items():
+            self.nodes.setdefault(key, deps)
+
+    def levels(self) -> list:
+        """Nodes grouped so every node's dependencies sit in an earlier group."""
+        depth = {}
+        for key, deps in self.nodes.items():  # insertion order is topological
+            depth[key] = 1 + max((depth[d] for d in deps), default=-1)
+        grouped = {}
+        for key, d in depth.items():
+            grouped.setdefault(d, []).append(key)
+        return [grouped[d] for d in sorted(grouped)]
+
+    def evaluate(self, df: pd.DataFrame, max_workers: int = None) -> dict:
+        """
+        Computes every node once. With max_workers > 1, independent nodes of the
+        same level run in a thread pool (numpy and the jitted kernels release the GIL).
+        """
+        values = {}
+
+        def run(key):
+            op, args = key[0], key[1:]
+            resolved = [values[a] if _is_node(a) else a for a in args]
+            if op in FRAME_OPS:
+                return OPS[op](df, *resolved)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return OPS[op](*resolved)
+
+        if max_workers and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for level in self.levels():
+                    for key, value in zip(level, pool.map(run, level)):
+                        values[key] = value
+        else:
+            for key in self.nodes:
+                values[key] = run(key)
+        return values
+
+
+# --- Indicator builders ---
+# Each adds its nodes to the graph and returns (outputs, plots, meta), where
+# outputs maps response columns to node keys. Param handling, plots and meta
+# mirror the matching Indicators.ind_* method.
+
+def _sma(g, length=20, **kwargs):
+    length = int(length)
+    return (
+        {'sma': g.node('sma', g.close(), length)},
+        {'sma': {'type': 'line', 'color': '#2962ff', 'title': f'SMA {length}'}},
+        {'type': 'overlay', 'name': f'SMA {length}'},
+    )
+
+
+def _ema(g, length=20, **kwargs):
+    length = int(length)
+    return (
+        {'ema': g.node('ema', g.close(), length)},
+        {'ema': {'type': 'line', 'color': '#ff9800', 'title': f'EMA {length}'}},
+        {'type': 'overlay', 'name': f'EMA {length}'},
+    )
+
+
+def _rsi(g, length=14, **kwargs):
+    length = int(length)
+    delta = g.node('diff', g.close())
+    ma_up = g.node('rma', g.node('gain', delta), length)
+    ma_down = g.node('rma', g.node('loss', delta), length)
+    return (
+        {'rsi': g.node('rsi', g.node('div', ma_up, ma_down))},
+        {'rsi': {'type': 'line', 'color': '#7e57c2', 'title': f'RSI {length}'}},
+        {'type': 'oscillator', 'name': f'RSI {length}'},
+    )
+
+
+def _macd(g, fast=12, slow=26, signal=9, **kwargs):
+    fast = int(kwargs.get('fast_length', fast))
+    slow = int(kwargs.get('slow_length', slow))
+    signal = int(kwargs.get('signal_length', signal))
+    macd = g.node('sub', g.node('ema', g.close(), fast), g.node('ema', g.close(), slow))
+    signal_line = g.node('ema', macd, signal)
+    return (
+        {'macd': macd, 'signal': signal_line, 'hist': g.node('sub', macd, signal_line)},
+        {
+            'hist': {'type': 'histogram', 'color': '#26a69a', 'title': 'Histogram'},
+            'macd': {'type': 'line', 'color': '#2962ff', 'title': 'MACD'},
+            'signal': {'type': 'line', 'color': '#ff9800', 'title': 'Signal'}
+        },
+        {'type': 'oscillator', 'name': f'MACD {fast} {slow} {signal}'},
+    )
+
+
+def _bollinger(g, length=20, mult=2.0, **kwargs):
+    length = int(length)
+    mult = float(mult)
+    basis = g.node('sma', g.close(), length)
+    width = g.node('scale', g.node('stdev', g.close(), length), mult)
+    return (
+        {'upper': g.node('add', basis, width), 'lower': g.node('sub', basis, width), 'basis': basis},
+        {
+            'upper': {'type': 'line', 'color': '#26a69a', 'title': 'Upper'},
+            'lower': {'type': 'line', 'color': '#26a69a', 'title': 'Lower'},
+            'basis': {'type': 'line', 'color': '#ff9800', 'title': 'Basis'}
+        },
+        {'type': 'overlay', 'name': f'BB {length} {mult}'},
+    )
+
+
+def _custom(g, source='', **params):
+    import dsl
+    plan = dsl.compile_plan(source, params)
+    g.merge(plan.graph)
+    return plan.outputs, plan.plots, plan.meta
+
+
+BUILDERS = {
+    'SMA': _sma,
+    'EMA': _ema,
+    'RSI': _rsi,
+    'MACD': _macd,
+    'Bollinger': _bollinger,
+    'Custom': _custom,
+}
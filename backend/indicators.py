@@ -1,14 +1,70 @@
 import pandas as pd
 import numpy as np
+
+import os
+import inspect
+import copy
+
+import kernels
+import ta_backend
+from indicator_cache import IndicatorCache
+from indicator_graph import IndicatorGraph, BUILDERS
+from plugin_registry import PluginRegistry
+import onchain_store
+import mtf
+import dsl
+import wire
+from alignment import to_int64
+
+# Import TV Algorithms (Expects backend/tv.py)
 try:
-    import talib
-except ImportError:
-    talib = None
-    print("Warning: TA-Lib not found. Using Pandas fallbacks or disabling specific indicators.")
+    import tv
+except ImportError as e:
+    msg = f"CRITICAL ERROR: Could not load 'tv' module: {e}"
+    print(msg)
+    with open("backend_indicators.log", "a") as f:
+        f.write(msg + "\n")
+    tv = None
+
+def _bar_times_ns(df: pd.DataFrame) -> np.ndarray:
+    """Bar timestamps as int64 ns, from the 'time' column (unix seconds) or a DatetimeIndex."""
+    if 'time' in df:
+        return pd.to_numeric(df['time']).to_numpy(dtype='int64') * 10**9
+    return to_int64(df.index)
+
+
+WEEK_NS = 7 * 86400 * 10**9
+
+# Bitcoin block heights at the halvings (and genesis), for the issued supply
+_HALVING_HEIGHTS = np.array([0, 210000, 420000, 630000, 840000])
+_HALVING_TIMES_NS = pd.DatetimeIndex(['2009-01-03', '2012-11-28', '2016-07-09', '2020-05-11', '2024-04-20']).as_unit('ns').asi8
+
+
+def _btc_supply(times_ns: np.ndarray) -> np.ndarray:
+    """
+    Issued BTC supply at each timestamp from the subsidy schedule: block height
+    interpolated between halvings (144 blocks/day after the last one), 50 BTC
+    per block halved every 210,000 blocks.
+    """
+    times_ns = np.asarray(times_ns, dtype=np.int64)
+    height = np.interp(times_ns, _HALVING_TIMES_NS, _HALVING_HEIGHTS)
+    after = times_ns > _HALVING_TIMES_NS[-1]
+    height[after] = _HALVING_HEIGHTS[-1] + (times_ns[after] - _HALVING_TIMES_NS[-1]) / (600 * 10**9)
+    height = np.maximum(height, 0)
+    era = np.floor(height / 210000)
+    reward = 50.0 / 2 ** era
+    issued_before = 210000 * 50.0 * 2 * (1 - 0.5 ** era)
+    return issued_before + (height - era * 210000) * reward
+
+
+def _mvrv_signals(zscore: np.ndarray, upper: float, lower: float) -> np.ndarray:
+    """'Buy' where the Z-score crosses under `lower`, 'Sell' where it crosses over `upper`, else None."""
+    prev = np.concatenate([[np.nan], zscore[:-1]])
+    signals = np.full(len(zscore), None, dtype=object)
+    signals[(zscore < lower) & (prev >= lower)] = 'Buy'
+    signals[(zscore > upper) & (prev <= upper)] = 'Sell'
+    return signals
 
-import logging
-import glob
-import importlib.util
 
 class Indicators:
     """
@@ -16,71 +72,89 @@ class Indicators:
     Supports dynamic loading of indicator plugins from 'indicator/' directory.
     """
 
+    # Native indicators whose result depends only on the input frame and params (and on
+    # versioned local data, see _data_versions). Only these are served from the result
+    # cache (GLF/BTC_GM2/Tier 1 read live macro data).
+    PURE_INDICATORS = {'SMA', 'EMA', 'RSI', 'MACD', 'Bollinger', 'Antigravity_Tier2', 'Custom'}
+    # Input columns each cached indicator reads (besides time); Custom reads what its script references
+    INPUT_COLUMNS = {name: ('close',) for name in ('SMA', 'EMA', 'RSI', 'MACD', 'Bollinger', 'Antigravity_Tier2')}
+
     def __init__(self, loader=None):
         self.loader = loader
-        self.plugins = {}
-        # self._load_plugins() # DISABLED: Prevent legacy/conflicting plugins from loading
-        
-        # Load TV module locally to instance
-        try:
-            import tv
-            self.tv = tv
-            print("Success: Loaded 'tv' module to self.tv")
-        except ImportError:
-            print("Error: Could not load 'tv' module")
-            self.tv = None
+        self.plugins = None
+        self.cache = IndicatorCache()
+        self._load_plugins()
+        self.tv = tv
 
     def _load_plugins(self):
-        """Dynamic loading of external indicator files"""
-        try:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            plugin_dir = os.path.join(current_dir, 'indicator')
-            if not os.path.exists(plugin_dir):
-                return
-
-            # Find all .py files
-            files = glob.glob(os.path.join(plugin_dir, "*.py"))
-            for f in files:
-                module_name = os.path.basename(f)[:-3]
-                spec = importlib.util.spec_from_file_location(module_name, f)
-                if spec and spec.loader:
-                    mod = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(mod)
-                    
-                    # Register functions starting with ind_
-                    for name, func in inspect.getmembers(mod, inspect.isfunction):
-                        if name.startswith('ind_'):
-                            self.plugins[name] = func
-                            print(f"Registered plugin indicator: {name}")
-        except Exception as e:
-            print(f"Error loading plugins: {e}")
+        """
+        Registers the 'indicator/' directory. Files are only parsed for ind_* signatures
+        here; a plugin module is imported the first time one of its indicators runs.
+        Plugins redefining a native indicator are ignored (see PluginRegistry).
+        """
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        self.plugins = PluginRegistry(os.path.join(current_dir, 'indicator'), reserved=self._native_schemas())
+
+    @classmethod
+    def _native_schemas(cls) -> dict:
+        """Parameter schemas of the native ind_* methods, introspected once per class."""
+        schemas = cls.__dict__.get('_NATIVE_SCHEMAS')
+        if schemas is None:
+            schemas = {}
+            for name, func in inspect.getmembers(cls, predicate=inspect.isfunction):
+                if not name.startswith('ind_'):
+                    continue
+                params = []
+                for p in list(inspect.signature(func).parameters.values())[2:]:
+                    if p.kind in (p.VAR_KEYWORD, p.VAR_POSITIONAL):
+                        continue
+                    params.append({
+                        "name": p.name,
+                        "default": None if p.default is p.empty else p.default,
+                        "type": getattr(p.annotation, '__name__', None) if p.annotation is not p.empty else None,
+                    })
+                doc = (inspect.getdoc(func) or "").split("\n")[0]
+                schemas[name[4:]] = {"name": name[4:], "source": "native", "params": params, "doc": doc}
+            cls._NATIVE_SCHEMAS = schemas
+        return schemas
+
+    def get_indicator_schemas(self) -> dict:
+        """{name: schema} for every indicator; native methods shadow plugins of the same name."""
+        schemas = self.plugins.schemas() if self.plugins is not None else {}
+        schemas.update(self._native_schemas())
+        return dict(sorted(schemas.items()))
 
     def get_available_indicators(self):
         """Returns a list of available indicator method names (without 'ind_' prefix)."""
-        # Native methods
-        methods = [name[4:] for name, _ in inspect.getmembers(self, predicate=inspect.ismethod) if name.startswith('ind_')]
-        # Plugins
-        plugins = [name[4:] for name in self.plugins.keys()]
-        return sorted(list(set(methods + plugins)))
+        return list(self.get_indicator_schemas().keys())
 
     def apply_indicator(self, df: pd.DataFrame, indicator_name: str, **kwargs) -> pd.DataFrame:
-        """Applies a specific indicator by name."""
+        """
+        Applies a specific indicator by name.
+        A `timeframe` param (e.g. '1w') evaluates it on that higher timeframe, see apply_mtf.
+        """
+        timeframe = kwargs.pop('timeframe', None)
+        if timeframe:
+            return self.apply_mtf(df, indicator_name, timeframe, **kwargs)
+
         method_name = f"ind_{indicator_name}"
-        
-        # 1. Try Plugin
-        if method_name in self.plugins:
-            try:
-                # Plugins might expect (df) or (df, loader). 
-                # We'll pass df and args. Plugin should handle logic.
-                return self.plugins[method_name](df, **kwargs)
-            except Exception as e:
-                print(f"Plugin error {method_name}: {e}")
-                return df
 
-        # 2. Try Native Method
+        # 1. Try Native Method (takes precedence over legacy plugins of the same name)
         if hasattr(self, method_name):
             try:
                 method = getattr(self, method_name)
+                if indicator_name in self.PURE_INDICATORS:
+                    streaming = self._streaming_spec(indicator_name, kwargs)
+                    extend = warm = None
+                    if streaming is not None:
+                        make_state, outputs = streaming
+                        warmup = self._warmup_bars(indicator_name, kwargs)
+                        extend = lambda entry, new_df: self._extend_cached(entry, new_df, outputs)
+                        warm = lambda new_df: self._warm_state(new_df, make_state, warmup)
+                    return self.cache.get_or_compute(indicator_name, kwargs, df, lambda: method(df, **kwargs),
+                                                     extend=extend, warm=warm,
+                                                     columns=self._input_columns(indicator_name, kwargs),
+                                                     key_extra=(ta_backend.get_backend(),) + self._data_versions(indicator_name))
                 return method(df, **kwargs)
             except Exception as e:
                 msg = f"Native Method Error {method_name}: {e}"
@@ -88,56 +162,359 @@ class Indicators:
                 with open("backend_indicators.log", "a") as f:
                     f.write(msg + "\n")
                 return df
+
+        # 2. Try Plugin (imported on first use)
+        plugin = self.plugins.get(indicator_name) if self.plugins is not None else None
+        if plugin is not None:
+            try:
+                # Plugins might expect (df) or (df, loader). 
+                # We'll pass df and args. Plugin should handle logic.
+                return plugin(df, **kwargs)
+            except Exception as e:
+                print(f"Plugin error {method_name}: {e}")
+                return df
+
+        print(f"Indicator {indicator_name} not found.")
+        return df
+
+    def apply_mtf(self, df: pd.DataFrame, indicator_name: str, timeframe: str, **kwargs):
+        """
+        request.security equivalent: runs the indicator on `timeframe` bars (through the
+        result cache like any other call) and maps each value onto the chart bars once
+        its higher-timeframe bar has closed. When the chart bars came from the bar cache
+        (attrs['dataset'], see DataLoader.load_dataset) the higher-timeframe bars are that
+        series' own history, so their warmup reaches back before the chart's first bar;
+        otherwise (uploaded bars) they are resampled from the chart bars.
+        A timeframe not above the chart's runs on the chart bars directly.
+        """
+        times = _bar_times_ns(df)
+        chart_ns = mtf.bar_duration_ns(times)
+        if mtf.timeframe_ns(timeframe) <= chart_ns:
+            return self.apply_indicator(df, indicator_name, **kwargs)
+
+        stored = self._stored_htf(df.attrs.get('dataset'), timeframe)
+        htf_df, htf_close = stored if stored is not None else mtf.resample(df, times, timeframe)
+        result = self.apply_indicator(htf_df, indicator_name, **kwargs)
+        rows = mtf.map_confirmed(htf_close, times + chart_ns)
+
+        if isinstance(result, pd.DataFrame):
+            # Legacy plugins return the frame with their columns added
+            mapped = df.copy()
+            for col in result.columns:
+                if col not in htf_df.columns:
+                    mapped[col] = mtf.take(result[col].to_numpy(), rows)
+            return mapped
+        if not isinstance(result, dict) or "error" in result or "data" not in result:
+            return result
+
+        columns = wire.as_columns(result["data"])
+        data = {k: mtf.take(np.asarray(v), rows) for k, v in columns.items() if k != 'time'}
+        meta = dict(result.get("meta", {}))
+        if 'name' in meta:
+            meta['name'] = f"{meta['name']} ({timeframe})"
+        return self._package_response(data=data, plots=result.get("plots", {}), meta=meta, reference_df=df)
+
+    def _stored_htf(self, dataset: dict, timeframe: str):
+        """
+        (bars, close times in ns) of the dataset's series on `timeframe` from the bar
+        cache, or None when the series is unknown or has no bars there.
+        """
+        if not dataset or self.loader is None or not hasattr(self.loader, 'load_dataset'):
+            return None
+        unit, count = mtf.parse_timeframe(timeframe)
+        try:
+            htf_df = self.loader.load_dataset(**{**dataset, 'timeframe': f"{count}{unit}"})
+        except Exception as e:
+            print(f"MTF history fetch failed for {dataset.get('ticker')} {timeframe}: {e}")
+            return None
+        if htf_df.empty or 'time' not in htf_df:
+            return None
+        _, close = mtf.bucket_bounds(htf_df['time'].to_numpy(dtype=np.int64) * mtf.SECOND_NS, timeframe)
+        return htf_df, close
+
+    def apply_window(self, df: pd.DataFrame, indicator_name: str, start_time: int = None,
+                     end_time: int = None, **kwargs):
+        """
+        Indicator values for the bars with start_time <= time <= end_time (unix seconds,
+        either end open) only. Computes over that window plus the indicator's declared
+        warmup (see _warmup_bars) and returns just the window's rows; indicators without
+        a declared warmup run on the whole frame and are then cut to the window.
+        """
+        times = _bar_times_ns(df) // 10**9
+        first = int(np.searchsorted(times, start_time, side='left')) if start_time is not None else 0
+        last = int(np.searchsorted(times, end_time, side='right')) if end_time is not None else len(df)
+
+        warmup = self._warmup_bars(indicator_name, kwargs)
+        if warmup is None:
+            begin, stop = 0, len(df)
         else:
-            print(f"Indicator {indicator_name} not found.")
-            return df
+            begin, stop = max(0, first - warmup), last
+        result = self.apply_indicator(df.iloc[begin:stop], indicator_name, **kwargs)
+
+        skip, keep = first - begin, last - first
+        return self.take_rows(result, slice(skip, skip + keep))
+
+    @staticmethod
+    def take_rows(result, rows: slice):
+        """A row slice of an indicator result (frame or packaged); errors pass through."""
+        if isinstance(result, pd.DataFrame):
+            return result.iloc[rows]
+        if isinstance(result, dict) and "data" in result and "error" not in result:
+            return {**result, "data": wire.take_rows(result["data"], rows)}
+        return result
+
+    def apply_batch(self, df: pd.DataFrame, specs: list, max_workers: int = None) -> list:
+        """
+        Applies several indicators to one frame. Graph-capable indicators share a
+        single dependency graph, so common primitives (EMAs of close, RSI's diff/clip,
+        rolling means) are computed once; the rest go through apply_indicator.
+        specs: [{"indicator": name, "params": {...}}]. Returns one result per spec, in order.
+
+        The shared graph runs the native kernels, so with the TA-Lib backend selected
+        (see ta_backend.set_backend) every spec goes through apply_indicator instead and
+        gets the same TA-Lib values as a single request. A spec whose graph fails to
+        evaluate never fails the others: they are then recomputed one by one.
+        """
+        results = [None] * len(specs)
+        graph = IndicatorGraph()
+        planned = []
+        shared = ta_backend.get_backend() == 'native'
+        if not shared and len(specs) > 1:
+            print(f"Batch: {ta_backend.get_backend()} backend active, {len(specs)} indicators computed separately")
+
+        for i, spec in enumerate(specs):
+            name = spec.get('indicator')
+            params = spec.get('params') or {}
+            builder = BUILDERS.get(name) if shared else None
+            if params.get('timeframe'):
+                builder = None
+            if builder is None or 'close' not in df:
+                results[i] = self.apply_indicator(df, name, **params)
+                continue
+            try:
+                # Plan each spec on its own graph first so its inputs can be checked
+                own = IndicatorGraph()
+                outputs, plots, meta = builder(own, **params)
+            except Exception as e:
+                results[i] = {"error": f"{name} Error: {e}"}
+                continue
+            missing = sorted({key[1] for key in own.nodes if key[0] == 'col' and key[1] not in df.columns})
+            if missing:
+                results[i] = {"error": f"{name} Error: missing columns {missing}"}
+                continue
+            graph.merge(own)
+            planned.append((i, (outputs, plots, meta)))
+
+        if planned:
+            try:
+                values = graph.evaluate(df, max_workers=max_workers)
+            except Exception as e:
+                print(f"Batch graph failed ({e}), computing {len(planned)} indicators separately")
+                for i, _ in planned:
+                    spec = specs[i]
+                    results[i] = self.apply_indicator(df, spec.get('indicator'), **(spec.get('params') or {}))
+                return results
+            for i, (outputs, plots, meta) in planned:
+                results[i] = self._package_response(
+                    data={col: values[key] for col, key in outputs.items()},
+                    plots=plots,
+                    meta=meta,
+                    reference_df=df
+                )
+        return results
+
+    # Length sweeps computed in one pass: indicator -> (tv sweep function, output column)
+    LENGTH_SWEEPS = {'SMA': ('SMA_sweep', 'sma'), 'EMA': ('EMA_sweep', 'ema'), 'RSI': ('RSI_sweep', 'rsi')}
+
+    def apply_sweep(self, df: pd.DataFrame, indicator_name: str, param: str, values: list, **kwargs) -> dict:
+        """
+        Parameter optimisation: the indicator for every value of `param` (other params
+        fixed), packaged as one matrix result with a column per value (named str(value))
+        holding the indicator's first output. SMA/EMA/RSI length sweeps run as one
+        2-D sweep sharing prefix sums / the diff; anything else calls apply_indicator
+        once per value.
+        """
+        values = list(values)
+        if not values:
+            return {"error": "Sweep Error: no values"}
+        meta = {'type': 'sweep', 'name': f'{indicator_name} {param} sweep', 'param': param, 'values': values}
+        sweep = self.LENGTH_SWEEPS.get(indicator_name)
+        try:
+            if (sweep is not None and param == 'length' and self.tv is not None and 'close' in df
+                    and not kwargs.get('timeframe')):
+                lengths = [int(v) for v in values]
+                matrix = getattr(self.tv, sweep[0])(df['close'], lengths)
+                data = {str(v): matrix[n].to_numpy() for v, n in zip(values, lengths)}
+            else:
+                data = {}
+                for value in values:
+                    result = self.apply_indicator(df, indicator_name, **{**kwargs, param: value})
+                    if not isinstance(result, dict) or "error" in result or "data" not in result:
+                        error = result.get("error") if isinstance(result, dict) else "no packaged result"
+                        return {"error": f"Sweep Error at {param}={value}: {error}"}
+                    columns = wire.as_columns(result["data"])
+                    output = next((k for k in columns if k != 'time'), None)
+                    data[str(value)] = np.asarray(columns[output]) if output else np.full(len(df), np.nan)
+        except Exception as e:
+            return {"error": f"Sweep Error: {e}"}
+        return self._package_response(data=data, plots={}, meta=meta, reference_df=df)
+
+    def _streaming_spec(self, indicator_name: str, params: dict):
+        """
+        (state factory, {output column: snapshot key}) for indicators whose cached
+        result can be extended bar by bar with a tv streaming state, else None.
+        Param handling mirrors the matching ind_* method.
+        """
+        tv = self.tv
+        # States mirror the native kernels; TA-Lib results are only cached whole
+        if tv is None or ta_backend.get_backend() != 'native':
+            return None
+        try:
+            if indicator_name == 'SMA':
+                length = int(params.get('length', 20))
+                return (lambda: tv.SMAState(length)), {'sma': None}
+            if indicator_name == 'EMA':
+                length = int(params.get('length', 20))
+                return (lambda: tv.EMAState(length)), {'ema': None}
+            if indicator_name == 'RSI':
+                length = int(params.get('length', 14))
+                return (lambda: tv.RSIState(length)), {'rsi': None}
+            if indicator_name == 'MACD':
+                fast = int(params.get('fast_length', params.get('fast', 12)))
+                slow = int(params.get('slow_length', params.get('slow', 26)))
+                signal = int(params.get('signal_length', params.get('signal', 9)))
+                return (lambda: tv.MACDState(fast, slow, signal)), {'macd': 'MACD', 'signal': 'Signal', 'hist': 'Hist'}
+            if indicator_name == 'Bollinger':
+                length = int(params.get('length', 20))
+                mult = float(params.get('mult', 2.0))
+                return (lambda: tv.BollingerState(length, mult)), {'upper': 'upper', 'lower': 'lower', 'basis': 'basis'}
+        except (TypeError, ValueError):
+            return None
+        return None
+
+    def _warmup_bars(self, indicator_name: str, params: dict):
+        """
+        Bars before an output window the indicator must see for the window's values
+        to match a computation over the full history (EMA-style averages: until the
+        seed's weight is below kernels.CONVERGENCE_TOLERANCE). None when undeclared
+        (macro/on-chain indicators, plugins, higher timeframes): compute over everything.
+        Param handling mirrors the matching ind_* method.
+        """
+        if params.get('timeframe'):
+            return None
+        try:
+            if indicator_name in ('SMA', 'Bollinger'):
+                return int(params.get('length', 20)) - 1
+            if indicator_name == 'EMA':
+                return kernels.ema_horizon(int(params.get('length', 20)))
+            if indicator_name == 'RSI':
+                # one bar for the price change, then Wilder's smoothing
+                return 1 + kernels.ema_horizon(alpha=1 / int(params.get('length', 14)))
+            if indicator_name == 'MACD':
+                fast = int(params.get('fast_length', params.get('fast', 12)))
+                slow = int(params.get('slow_length', params.get('slow', 26)))
+                signal = int(params.get('signal_length', params.get('signal', 9)))
+                return kernels.ema_horizon(max(fast, slow)) + kernels.ema_horizon(signal)
+        except (TypeError, ValueError):
+            return None
+        return None
+
+    def _input_columns(self, indicator_name: str, params: dict):
+        """Columns of the input an indicator reads (what its cache entries are keyed on), None if unknown."""
+        if indicator_name == 'Custom':
+            try:
+                plan = dsl.compile_plan(params.get('source', ''), {k: v for k, v in params.items() if k != 'source'})
+            except Exception:
+                return None
+            return sorted({key[1] for key in plan.graph.nodes if key[0] == 'col'})
+        return self.INPUT_COLUMNS.get(indicator_name)
+
+    def _data_versions(self, indicator_name: str) -> tuple:
+        """Versions of the stored data an indicator reads besides its input (part of its cache key)."""
+        if indicator_name == 'Antigravity_Tier2':
+            # MVRV comes from the on-chain store, which a CSV import replaces
+            store = self._onchain()
+            return (store.version if store is not None else None,)
+        return ()
+
+    @staticmethod
+    def _warm_state(df: pd.DataFrame, make_state, warmup):
+        """
+        Streaming state after df's last row, warmed on just the last warmup + 1 bars
+        (see _warmup_bars), so caching a result costs a few hundred steps, not a pass
+        over the whole history. None when there is no close or no declared warmup.
+        """
+        if 'close' not in df or warmup is None:
+            return None
+        close = df['close'].to_numpy(dtype='float64', na_value=np.nan)
+        state = make_state()
+        state.update_many(close[max(0, len(close) - warmup - 1):])
+        return state
+
+    def _extend_cached(self, entry, df: pd.DataFrame, columns: dict):
+        """
+        Extends a cached result computed from df's first entry.rows rows:
+        only the new tail is run through the streaming state.
+        Returns (result, state) or None to fall back to a full recompute.
+        """
+        if 'close' not in df or entry.state is None:
+            return None
+        state = copy.deepcopy(entry.state)
+
+        tail_df = df.iloc[entry.rows:]
+        snaps = state.update_many(tail_df['close'].to_numpy(dtype='float64', na_value=np.nan))
+        data = {
+            col: pd.Series([s if key is None else s[key] for s in snaps], index=tail_df.index, dtype='float64')
+            for col, key in columns.items()
+        }
+        tail = self._package_response(data=data, plots=entry.result['plots'], meta=entry.result['meta'], reference_df=tail_df)
+        if 'error' in tail:
+            return None
+        return {**entry.result, 'data': wire.concat_rows(entry.result['data'], tail['data'])}, state
 
     # --- Native Indicators ---
-    
-    # Import TV Algorithms (Expects backend/tv.py)
-    try:
-        import tv
-        print("Success: Loaded 'tv' module")
-        with open("backend_indicators.log", "a") as f:
-            f.write("Success: Loaded 'tv' module\n")
-    except ImportError as e:
-        msg = f"CRITICAL ERROR: Could not load 'tv' module: {e}"
-        print(msg)
-        with open("backend_indicators.log", "a") as f:
-            f.write(msg + "\n")
-        tv = None
 
     def _package_response(self, data: dict, plots: dict, meta: dict, reference_df: pd.DataFrame) -> dict:
         """
         Universal helper to package indicator results into Protocol 2.0 format.
-        Ensures consistent JSON structure, time alignment, and NaN handling.
+        Ensures consistent time alignment; data is kept as columns ({name: array},
+        NaN where there is no value) and only encoded for the wire (see wire.py).
         """
         try:
-            out_df = pd.DataFrame()
-            
             # 1. Handle Time
             if 'time' in reference_df:
-                out_df['time'] = reference_df['time']
+                columns = {'time': reference_df['time']}
+                index = reference_df.index
             else:
                 # Assuming Index is DateTime or similar if 'time' col missing
                 # If index is already int64 (unix), use it. If Datetime, convert.
                 if pd.api.types.is_datetime64_any_dtype(reference_df.index):
-                     out_df['time'] = reference_df.index.astype(np.int64) // 10**9
+                     columns = {'time': reference_df.index.astype(np.int64) // 10**9}
                 else:
-                     out_df['time'] = reference_df.index
-            
-            # 2. Add Data
+                     columns = {'time': reference_df.index}
+                # The time values become a column, rows are then positional
+                index = pd.RangeIndex(len(reference_df))
+
+            # 2. Add Data (Series align on the row index, arrays are positional)
             for key, series in data.items():
-                out_df[key] = series
+                if isinstance(series, pd.Series) and not series.index.equals(index):
+                    series = series.reindex(index)
+                columns[key] = series
+
+            # 3. Plain arrays, one per column (sanitized per format when encoded)
+            n = len(index)
+            arrays = {}
+            for key, values in columns.items():
+                arr = np.full(n, values) if np.isscalar(values) else np.asarray(values)
+                if len(arr) != n:
+                    raise ValueError(f"Length of values ({len(arr)}) does not match length of index ({n})")
+                arrays[key] = arr
 
-            # 3. Sanitize (Protocol 2.0 Strictness)
-            out_df = out_df.replace([float('inf'), float('-inf'), np.nan], None)
-            
             return {
                 "protocol": "2.0",
                 "meta": meta,
                 "plots": plots,
-                "data": out_df.to_dict(orient='records')
+                "data": arrays
             }
         except Exception as e:
             return {"error": f"Packaging Error: {e}"}
@@ -232,54 +609,16 @@ class Indicators:
              return {"error": "GLF Error: TV Loader not available."}
              
         try:
-            print("Calculating GLF (Global Liquidity Flow)...")
-            # Components (Simplified for performance)
-            components = [
-                ('US', 'ECONOMICS:USCBBS', None, None, 'none'), # Fed
-                ('US_RRP', 'FRED:RRPONTSYD', None, None, 'none'), # RRP (Subtract)
-                ('US_TGA', 'FRED:WTREGEN', None, None, 'none'), # TGA (Subtract)
-                ('EU', 'ECONOMICS:EUCBBS', 'EURUSD', 'FX', 'multiply'),
-                ('CN', 'ECONOMICS:CNCBBS', 'CNYUSD', 'FX_IDC', 'multiply'),
-                ('JP', 'ECONOMICS:JPCBBS', 'JPYUSD', 'FX_IDC', 'multiply'),
-            ]
-            
-            series_list = []
-            
-            for name, tick, fx, fx_ex, op in components:
-                # Use loader's composite fetcher
-                if op == 'none':
-                    s = self.loader.tv_loader.fetch_macro_series(tick, n_bars=3000)
-                    if s is not None and not s.empty:
-                        # Extract close
-                        s = s['close'] if 'close' in s.columns else s.iloc[:, 0]
-                        # Handle Subtractions
-                        if name in ['US_RRP', 'US_TGA']:
-                            s = -1 * s
-                        s.name = name
-                        series_list.append(s)
-                else:
-                    # Parse ticker to sym/exch
-                    tsym = tick.split(':')[1] if ':' in tick else tick
-                    texch = tick.split(':')[0] if ':' in tick else 'ECONOMICS'
-                    
-                    s_df = self.loader.tv_loader.fetch_composite_m2(tsym, texch, fx, fx_ex, op)
-                    if s_df is not None and not s_df.empty:
-                        s = s_df['close']
-                        s.name = name
-                        series_list.append(s)
-            
-            if not series_list:
+            glf = self.loader.global_liquidity
+            glf.ensure_fresh()
+            if glf.empty:
                 return {"error": "GLF: No data fetched"}
-                
-            # Aggregate
-            agg = pd.concat(series_list, axis=1).ffill().sum(axis=1)
-            agg = agg / 1e12 # Trillions
-            
-            # Align to DF
-            agg_reindexed = agg.reindex(df.index, method='ffill')
-            
+
+            # Trillions, as of each bar
+            values = glf.asof(_bar_times_ns(df)) / 1e12
+
             return self._package_response(
-                data={'glf': agg_reindexed},
+                data={'glf': values},
                 plots={'glf': {'type': 'line', 'color': '#00bcd4', 'title': 'Global Liquidity (T)'}},
                 meta={'type': 'oscillator', 'name': 'GLF (Global Liquidity)'},
                 reference_df=df
@@ -288,26 +627,61 @@ class Indicators:
         except Exception as e:
             return {"error": f"GLF Calculation Error: {e}"}
 
-    def ind_BTC_GM2(self, df: pd.DataFrame, **kwargs) -> dict:
+    def ind_BTC_GM2(self, df: pd.DataFrame, sma_weeks: int = 52, lead_weeks: int = 10,
+                    yoy_threshold: float = 2.5, distance_sell: float = 0.7, **kwargs) -> dict:
         """
-        BTC vs Global M2.
+        BTC % of Global M2 (port of indicator/btcm2.txt).
+        BTC market cap as a percentage of Global M2, its SMA and distance, 52-week
+        M2 growth, and buy/sell signals at least lead_weeks apart.
         """
-        if not self.loader or not self.loader.tv_loader:
+        if not self.loader:
              return {"error": "GM2 Error: Loader missing"}
+        if 'close' not in df.columns:
+             return {"error": "GM2 Error: Missing close data"}
              
         try:
-             # Use the dedicated method which caches and calculates
-             m2_df = self.loader.tv_loader.get_global_m2_tv()
-             if m2_df is None or m2_df.empty:
+             # Materialized daily composite: refetched only when stale, read as-of per bar
+             m2 = self.loader.global_m2
+             m2.ensure_fresh()
+             if m2.empty:
                   return {"error": "GM2: No data fetched"}
 
              # Align
-             m2_aligned = m2_df['global_m2'].reindex(df.index, method='ffill')
-             
+             times = _bar_times_ns(df)
+             m2_aligned = m2.asof(times)
+             m2_year_ago = m2.asof(times - 52 * WEEK_NS)
+
+             # Weeks are calendar windows (Pine hard-codes x7 bars for daily charts)
+             bar_ns = mtf.bar_duration_ns(times) or WEEK_NS
+
+             close = kernels.as_array(df['close'])
+             with np.errstate(divide='ignore', invalid='ignore'):
+                  btc_percent = close * _btc_supply(times) / m2_aligned * 100
+                  # Unchanged M2 (no new publication within the year) has no YoY
+                  yoy_change = np.where(m2_aligned != m2_year_ago,
+                                        (m2_aligned - m2_year_ago) / m2_year_ago * 100, np.nan)
+             sma_btc = kernels.calendar_sma(btc_percent, times, f"{int(sma_weeks)}W")
+             distance = btc_percent - sma_btc
+
+             min_gap = kernels.window_bars(f"{max(1, int(lead_weeks))}W", bar_ns)
+             buy = kernels.space_signals((yoy_change > float(yoy_threshold)) & (distance < 0), min_gap)
+             sell = kernels.space_signals(distance > float(distance_sell), min_gap)
+
+             zone = np.full(len(df), None, dtype=object)
+             zone[distance < -0.3] = 'rgba(255, 82, 82, 0.08)'
+             zone[distance > 0.5] = 'rgba(76, 175, 80, 0.08)'
+
              return self._package_response(
-                 data={'GlobalM2': m2_aligned},
-                 plots={'GlobalM2': {'type': 'line', 'color': '#ffeb3b', 'title': 'Global M2', 'priceScaleId': 'left'}},
-                 meta={'type': 'overlay', 'name': 'BTC vs Global M2'},
+                 data={
+                     'BTC_GM2': btc_percent, 'BTC_GM2_SMA': sma_btc, 'Distance': distance,
+                     'YoY_M2': yoy_change, 'GlobalM2': m2_aligned, 'Zone_Color': zone,
+                     'Signal_Buy': buy, 'Signal_Sell': sell,
+                 },
+                 plots={
+                     'BTC_GM2': {'type': 'line', 'color': '#00cc99', 'title': 'BTC % Global M2'},
+                     'BTC_GM2_SMA': {'type': 'line', 'color': '#ffaa00', 'title': 'SMA'},
+                 },
+                 meta={'type': 'oscillator', 'name': 'BTC % of Global M2'},
                  reference_df=df
              )
         except Exception as e:
@@ -315,47 +689,151 @@ class Indicators:
 
     def ind_Antigravity_Tier1(self, df: pd.DataFrame, **kwargs) -> dict:
         """
-        Tier 1 (Macro):
-        - Calculates ROC for WALCL (Fed Balance Sheet).
+        Tier 1 (Macro): Fed balance sheet and DXY 30-day ROC and the
+        QE/QT/Neutral regime, joined from the materialized macro regime.
         """
+        regime = getattr(self.loader, 'macro_regime', None) if self.loader else None
+        if regime is None:
+            return {"error": "Tier 1 Error: Macro regime not available"}
         try:
-            n = len(df)
-            trend = np.linspace(4e12, 8e12, n)
-            phase = np.linspace(0, 15, n) 
-            cycle = np.sin(phase) * 1e12 
-            walcl_values = trend + cycle
-            
-            roc = pd.Series(walcl_values).pct_change(periods=min(28, n-1)).fillna(0) * 100
-            
+            regime.ensure_fresh()
+            if regime.empty:
+                return {"error": "Tier 1: no WALCL/DXY data"}
+
+            # Each bar sees the regime of the last day closed by its own close
+            times = _bar_times_ns(df)
+            close_ns = times + mtf.bar_duration_ns(times)
+            joined = regime.asof(close_ns)
+            labels = regime.labels(close_ns)
+            zone = np.array(['rgba(128, 128, 128, 0.08)', 'rgba(76, 175, 80, 0.08)', 'rgba(255, 82, 82, 0.08)'],
+                            dtype=object)[joined['regime'].to_numpy()]
+
             return self._package_response(
-                data={'roc': roc},
-                plots={'roc': {'type': 'line', 'color': '#2962ff', 'title': 'Fed BS ROC'}},
+                data={
+                    'roc': joined['walcl_roc'].to_numpy(), 'dxy_roc': joined['dxy_roc'].to_numpy(),
+                    'walcl': joined['walcl'].to_numpy(), 'Tier1_Signal': labels, 'Zone_Color': zone,
+                },
+                plots={
+                    'roc': {'type': 'line', 'color': '#2962ff', 'title': 'Fed BS ROC'},
+                    'dxy_roc': {'type': 'line', 'color': '#ff9800', 'title': 'DXY ROC'},
+                },
                 meta={'type': 'oscillator', 'name': 'Antigravity Tier 1 (Macro)'},
                 reference_df=df
             )
         except Exception as e:
             return {"error": f"Tier 1 Error: {e}"}
 
+    def _onchain(self):
+        return getattr(self.loader, 'onchain', None) if self.loader else None
+
+    def ind_CVDD(self, df: pd.DataFrame, slope_factor: float = 100, intercept_factor: float = 100,
+                 bottom_shift: float = 120, **kwargs) -> dict:
+        """
+        CVDD - Coin Value Days Destroyed (port of indicator/CVDD.txt).
+        CVDD, its shifted bottom and time-extended top, from the on-chain store.
+        """
+        store = self._onchain()
+        if store is None:
+            return {"error": "CVDD Error: On-chain store not available"}
+        try:
+            daily = store.derived(('cvdd',), onchain_store.cvdd_daily)
+            if daily is None or daily.empty:
+                return {"error": "CVDD: import realized_cap and transfer_volume into the on-chain store"}
+
+            times = _bar_times_ns(df)
+            cvdd = onchain_store.asof(daily['cvdd'], times)
+            bottom = cvdd * float(bottom_shift) / 100
+            # Pine's `time` is in milliseconds
+            top_exp = -8.1775e-13 * float(slope_factor) / 100 * (times / 10**6) + 1.965805965 * float(intercept_factor) / 100
+            top = cvdd * np.power(10.0, top_exp)
+
+            high = kernels.as_array(df['high'] if 'high' in df else df['close'])
+            low = kernels.as_array(df['low'] if 'low' in df else df['close'])
+            zone = np.full(len(df), None, dtype=object)
+            zone[low <= bottom] = 'rgba(45, 255, 52, 0.2)'
+            zone[high >= top] = 'rgba(128, 0, 0, 0.3)'
+
+            return self._package_response(
+                data={'cvdd': cvdd, 'cvdd_bottom': bottom, 'cvdd_top': top, 'Zone_Color': zone},
+                plots={
+                    'cvdd_bottom': {'type': 'line', 'color': '#4920ff', 'title': 'Shifted CVDD'},
+                    'cvdd_top': {'type': 'line', 'color': '#c727e3', 'title': 'CVDD Extension'},
+                    'cvdd': {'type': 'line', 'color': '#27e3c0', 'title': 'CVDD'},
+                },
+                meta={'type': 'overlay', 'name': 'CVDD'},
+                reference_df=df
+            )
+        except Exception as e:
+            return {"error": f"CVDD Error: {e}"}
+
+    def ind_MVRV(self, df: pd.DataFrame, upper: float = 7.0, lower: float = 0.1, free_float: bool = False, **kwargs) -> dict:
+        """
+        MVRV and MVRV Z-Score (port of indicator/MVRV.txt), from the on-chain store.
+        Signal_MVRV is 'Buy' when the Z-score crosses under `lower`, 'Sell' when it crosses over `upper`.
+        """
+        store = self._onchain()
+        if store is None:
+            return {"error": "MVRV Error: On-chain store not available"}
+        try:
+            free_float = str(free_float).lower() in ('true', '1', 'free float')
+            daily = store.derived(('mvrv', free_float), lambda s: onchain_store.mvrv_daily(s, free_float))
+            if daily is None or daily.empty:
+                return {"error": "MVRV: import market_cap and realized_cap into the on-chain store"}
+
+            times = _bar_times_ns(df)
+            mvrv = onchain_store.asof(daily['mvrv'], times)
+            zscore = onchain_store.asof(daily['zscore'], times)
+            return self._package_response(
+                data={'mvrv': mvrv, 'zscore': zscore, 'Signal_MVRV': _mvrv_signals(zscore, float(upper), float(lower))},
+                plots={
+                    'mvrv': {'type': 'line', 'color': '#2196f3', 'title': 'MVRV'},
+                    'zscore': {'type': 'line', 'color': '#ffeb3b', 'title': 'Z-score'},
+                },
+                meta={'type': 'oscillator', 'name': 'MVRV Z Score'},
+                reference_df=df
+            )
+        except Exception as e:
+            return {"error": f"MVRV Error: {e}"}
+
     def ind_Antigravity_Tier2(self, df: pd.DataFrame, **kwargs) -> dict:
         """
         Tier 2 (Trading / OnChain):
-        - MVRV Z-Score Proxy
+        - MVRV Z-Score from the on-chain store (with Buy/Sell signals), or a
+          4-year price z-score on daily closes when no on-chain data was imported
         """
         if 'close' not in df.columns: return {"error": "Missing close data"}
         
         try:
-            # A. MVRV Z-Score Proxy
-            rolling_mean_4y = df['close'].rolling(window=365*4).mean()
-            rolling_std_4y = df['close'].rolling(window=365*4).std()
-            mvrv_proxy = (df['close'] - rolling_mean_4y) / rolling_std_4y
+            close = kernels.as_array(df['close'])
+            times = _bar_times_ns(df)
+
+            # A. MVRV Z-Score (per-day cached on-chain series, as of each bar)
+            store = self._onchain()
+            daily = store.derived(('mvrv', False), onchain_store.mvrv_daily) if store is not None else None
+            if daily is not None and not daily.empty:
+                mvrv = onchain_store.asof(daily['zscore'], times)
+                signals = _mvrv_signals(mvrv, 7.0, 0.1)
+                title = 'MVRV Z-Score'
+            else:
+                # Proxy: z-score of price against a 4-year calendar window (daily closes on intraday charts)
+                mean_4y = kernels.calendar_sma(close, times, '4Y')
+                std_4y = kernels.calendar_std(close, times, '4Y')
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    mvrv = (close - mean_4y) / std_4y
+                signals = None
+                title = 'MVRV Z-Score (Proxy)'
             
             # B. SMA 200 (Simple Liquidity Check)
-            sma_200 = df['close'].rolling(window=200).mean()
+            sma_200 = kernels.sma(close, 200)
+
+            data = {'mvrv': mvrv, 'sma200': sma_200}
+            if signals is not None:
+                data['Signal_MVRV'] = signals
             
             return self._package_response(
-                data={'mvrv': mvrv_proxy, 'sma200': sma_200},
+                data=data,
                 plots={
-                    'mvrv': {'type': 'line', 'color': '#ff9800', 'title': 'MVRV Z-Score (Proxy)'},
+                    'mvrv': {'type': 'line', 'color': '#ff9800', 'title': title},
                     'sma200': {'type': 'line', 'color': '#2962ff', 'title': 'SMA 200 Support', 'priceScaleId': 'right'}
                 },
                 meta={'type': 'oscillator', 'name': 'Antigravity Tier 2'},
@@ -363,3 +841,23 @@ class Indicators:
             )
         except Exception as e:
             return {"error": f"Tier 2 Error: {e}"}
+
+    def ind_Custom(self, df: pd.DataFrame, source: str = '', **kwargs) -> dict:
+        """
+        User-defined indicator: a Pine-like script (see dsl.py) compiled to a cached
+        vectorized plan. Other params set the script's inputs by title.
+        """
+        try:
+            plan = dsl.compile_plan(source, kwargs)
+            missing = {key[1] for key in plan.graph.nodes if key[0] == 'col' and key[1] not in df.columns}
+            if missing:
+                return {"error": f"Custom Error: missing columns {sorted(missing)}"}
+            values = plan.graph.evaluate(df)
+            return self._package_response(
+                data={col: values[key] for col, key in plan.outputs.items()},
+                plots=plan.plots,
+                meta=dict(plan.meta, inputs=plan.inputs),
+                reference_df=df
+            )
+        except Exception as e:
+            return {"error": f"Custom Error: {e}"}
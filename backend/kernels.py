@@ -0,0 +1,377 @@
+"""
+Array-native indicator kernels.
+
+Everything here takes and returns contiguous float64 ndarrays, so the tv
+functions and indicator methods can skip pandas' index alignment and object
+overhead. Recursive kernels (EMA/RMA, rolling variance) are JIT-compiled with
+numba when it is installed; without it they fall back to pandas' C loops on
+the raw array, which run the same arithmetic.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+HAS_JIT = njit is not None
+
+
+def as_array(x) -> np.ndarray:
+    """Series / list / ndarray -> contiguous float64 ndarray (no copy when already one)."""
+    if isinstance(x, pd.Series):
+        x = x.to_numpy(dtype='float64', na_value=np.nan)
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+
+def _window(n) -> int:
+    n = int(n)
+    if n < 1:
+        raise ValueError(f"Window length must be >= 1, got {n}")
+    return n
+
+
+def _prefix(values) -> np.ndarray:
+    """Cumulative sum with a leading 0, so window sums are prefix[i + 1] - prefix[i + 1 - n]."""
+    out = np.empty(len(values) + 1, dtype=values.dtype if values.dtype.kind == 'f' else np.int64)
+    out[0] = 0
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _window_diff(prefix: np.ndarray, n: int) -> np.ndarray:
+    """Per-row sum over the trailing n rows (the first n - 1 rows use what exists)."""
+    out = prefix[1:].copy()
+    out[n:] -= prefix[1:len(prefix) - n]
+    return out
+
+
+def _sma_prefix(x: np.ndarray):
+    """Shared state of every SMA over x: (prefix sums of shifted finite values, finite-bar prefix counts, shift)."""
+    finite = np.isfinite(x)
+    shift = x[finite][0] if finite.any() else 0.0
+    return _prefix(np.where(finite, x - shift, 0.0)), _prefix(finite), shift
+
+
+def _sma_from_prefix(prefix: np.ndarray, finite_prefix: np.ndarray, shift: float, n: int) -> np.ndarray:
+    out = _window_diff(prefix, n) / n + shift
+    # Every bar of the window must be a finite number
+    out[_window_diff(finite_prefix, n) < n] = np.nan
+    return out
+
+
+def sma(x, n: int) -> np.ndarray:
+    """
+    Rolling mean over n bars from prefix sums (NaN until n valid bars, like rolling(n).mean()).
+
+    Values are summed relative to the first finite value, which keeps the prefix
+    sums small for price-like series and makes constant stretches exact.
+    Windows holding an infinity are NaN, as in pandas.
+    """
+    x = as_array(x)
+    n = _window(n)
+    if len(x) == 0:
+        return x.copy()
+    return _sma_from_prefix(*_sma_prefix(x), n)
+
+
+def ema(x, length: int = None, alpha: float = None) -> np.ndarray:
+    """
+    ewm(adjust=False).mean() recurrence, from a span-style length or an explicit alpha.
+    NaN bars are skipped (their weight decays), matching pandas.
+    """
+    x = as_array(x)
+    # pandas normalizes span/alpha to a center of mass first; do the same so the bits agree
+    com = (_window(length) - 1) / 2.0 if alpha is None else (1.0 - alpha) / alpha
+    if HAS_JIT:
+        return _ema_jit(x, com)
+    return pd.Series(x).ewm(com=com, adjust=False).mean().to_numpy()
+
+
+def rma(x, n: int) -> np.ndarray:
+    """Wilder's smoothing (EMA with alpha = 1 / n)."""
+    return ema(x, alpha=1 / _window(n))
+
+
+# Relative weight the seed of a recursive average may still carry after its warmup
+CONVERGENCE_TOLERANCE = 1e-7
+
+
+def ema_horizon(length: int = None, alpha: float = None, tol: float = CONVERGENCE_TOLERANCE) -> int:
+    """
+    Bars after which an EMA/RMA no longer depends on where it started: the
+    starting value's weight (1 - alpha) ** k has decayed below tol.
+    """
+    if alpha is None:
+        alpha = 2.0 / (_window(length) + 1)
+    if alpha >= 1:
+        return 0
+    return int(np.ceil(np.log(tol) / np.log1p(-alpha)))
+
+
+def rolling_var(x, n: int, ddof: int = 1) -> np.ndarray:
+    """Rolling variance over n bars with compensated Welford add/remove updates."""
+    x = as_array(x)
+    n = _window(n)
+    if HAS_JIT:
+        return _rolling_var_jit(x, n, ddof)
+    return pd.Series(x).rolling(window=n).var(ddof=ddof).to_numpy()
+
+
+def rolling_std(x, n: int, ddof: int = 1) -> np.ndarray:
+    var = rolling_var(x, n, ddof)
+    # Tiny negative variances from rounding become 0, like pandas' std
+    return np.sqrt(np.where(var < 0, 0.0, var))
+
+
+def diff(x, periods: int = 1) -> np.ndarray:
+    x = as_array(x)
+    out = np.full(len(x), np.nan)
+    if periods < len(x):
+        out[periods:] = x[periods:] - x[:-periods]
+    return out
+
+
+def rsi(x, n: int) -> np.ndarray:
+    """RSI with Wilder-smoothed gains and losses."""
+    delta = diff(x)
+    up = np.maximum(delta, 0)
+    down = -1 * np.minimum(delta, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = rma(up, n) / rma(down, n)
+        return 100 - (100 / (1 + rs))
+
+
+def macd(x, fast: int, slow: int, signal: int):
+    """Returns (macd, signal, hist) arrays."""
+    x = as_array(x)
+    line = ema(x, fast) - ema(x, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(x, n: int, mult: float):
+    """Returns (upper, lower, basis) arrays."""
+    x = as_array(x)
+    basis = sma(x, n)
+    dev = rolling_std(x, n)
+    return basis + (mult * dev), basis - (mult * dev), basis
+
+
+# --- Parameter sweeps ---
+# One row per length, shape (len(lengths), len(x)). Work shared by every length
+# (prefix sums, the diff and gain/loss split) is done once; each row equals the
+# single-length kernel bit for bit.
+
+def _lengths(lengths) -> list:
+    lengths = [_window(n) for n in lengths]
+    if not lengths:
+        raise ValueError("At least one length is required")
+    return lengths
+
+
+def sma_sweep(x, lengths) -> np.ndarray:
+    x = as_array(x)
+    lengths = _lengths(lengths)
+    out = np.empty((len(lengths), len(x)))
+    if len(x):
+        prefix = _sma_prefix(x)
+        for row, n in enumerate(lengths):
+            out[row] = _sma_from_prefix(*prefix, n)
+    return out
+
+
+def ema_sweep(x, lengths) -> np.ndarray:
+    x = as_array(x)
+    lengths = _lengths(lengths)
+    out = np.empty((len(lengths), len(x)))
+    for row, n in enumerate(lengths):
+        out[row] = ema(x, n)
+    return out
+
+
+def rsi_sweep(x, lengths) -> np.ndarray:
+    delta = diff(x)
+    up = np.maximum(delta, 0)
+    down = -1 * np.minimum(delta, 0)
+    lengths = _lengths(lengths)
+    out = np.empty((len(lengths), len(delta)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for row, n in enumerate(lengths):
+            rs = rma(up, n) / rma(down, n)
+            out[row] = 100 - (100 / (1 + rs))
+    return out
+
+
+# --- Calendar windows ---
+# Window specs like '4Y', '52W', '30D', '12H' or '90m' mean the same span of time on
+# any timeframe. Short spans resolve to a bar count; spans that would need more
+# than MAX_DIRECT_BARS chart bars run on the series downsampled to daily closes
+# and are mapped back onto the chart bars once each day has closed.
+
+_SPAN_NS = {'m': 60, 'H': 3600, 'D': 86400, 'W': 7 * 86400, 'M': 30 * 86400, 'Y': 365 * 86400}
+MAX_DIRECT_BARS = 5000
+
+
+def span_ns(window) -> int:
+    """'4Y' / '52W' / '30D' / '12H' / '90m' -> span in ns (a month is 30 days, a year 365)."""
+    spec = str(window).strip()
+    unit = (spec[-1] if spec[-1] in _SPAN_NS else spec[-1].upper()) if spec else ''
+    if unit not in _SPAN_NS or not spec[:-1].isdigit():
+        raise ValueError(f"Unknown window '{window}'. Use <count><m|H|D|W|M|Y>, e.g. '4Y' or '52W'.")
+    return int(spec[:-1]) * _SPAN_NS[unit] * 10**9
+
+
+def window_bars(window, bar_ns: int) -> int:
+    """Bars covering a window: ints are bar counts already, specs are divided by the bar duration."""
+    if isinstance(window, (int, np.integer)):
+        return _window(window)
+    if bar_ns <= 0:
+        raise ValueError("Bar duration is needed to resolve a calendar window")
+    return max(1, int(round(span_ns(window) / bar_ns)))
+
+
+def calendar_rolling(kernel, x, times_ns, window, max_bars: int = MAX_DIRECT_BARS) -> np.ndarray:
+    """
+    Runs kernel(values, n) with a calendar window. On the chart bars when the window
+    is at most max_bars long (or the bars are daily or longer), otherwise on daily
+    closes with the value of the last closed day on every bar.
+    """
+    import mtf
+
+    x = as_array(x)
+    times_ns = np.asarray(times_ns, dtype=np.int64)
+    bar_ns = mtf.bar_duration_ns(times_ns)
+    n = window_bars(window, bar_ns)
+    if n <= max_bars or bar_ns >= mtf.timeframe_ns('1d') or isinstance(window, (int, np.integer)):
+        return kernel(x, n)
+
+    start, end = mtf.bucket_bounds(times_ns, '1d')
+    last = np.flatnonzero(np.append(start[1:] != start[:-1], True))
+    daily = kernel(x[last], window_bars(window, mtf.timeframe_ns('1d')))
+    rows = mtf.map_confirmed(end[last], times_ns + bar_ns)
+    return mtf.take(daily, rows)
+
+
+def calendar_sma(x, times_ns, window) -> np.ndarray:
+    return calendar_rolling(sma, x, times_ns, window)
+
+
+def calendar_std(x, times_ns, window) -> np.ndarray:
+    return calendar_rolling(rolling_std, x, times_ns, window)
+
+
+# --- Signals ---
+
+def space_signals(mask, min_gap: int) -> np.ndarray:
+    """
+    Keeps a signal only when at least min_gap bars have passed since the last
+    kept one (Pine's `na(last) or bar_index - last >= gap` filter).
+
+    Loop-free over bars: every candidate's successor is the first candidate
+    min_gap or more bars later (one searchsorted), and the chain from the
+    first candidate is expanded by pointer doubling, so the work is
+    O(k log k) array operations for k candidates.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    out = np.zeros(len(mask), dtype=bool)
+    candidates = np.flatnonzero(mask)
+    k = len(candidates)
+    if k == 0:
+        return out
+
+    # jump[i]: next kept candidate after candidate i (k = none); jump[k] = k
+    jump = np.append(np.searchsorted(candidates, candidates + max(int(min_gap), 1)), k)
+    chain = np.zeros(1, dtype=np.int64)
+    while True:
+        # chain holds steps 0..L-1 from the first candidate and jump is L steps at once
+        ahead = jump[chain]
+        ahead = ahead[ahead < k]
+        chain = np.concatenate([chain, ahead])
+        if len(ahead) < len(chain) - len(ahead):
+            break
+        jump = jump[jump]
+    out[candidates[chain]] = True
+    return out
+
+
+if HAS_JIT:
+    @njit(cache=True, nogil=True)
+    def _ema_jit(values, com):
+        # Port of pandas' ewm(adjust=False, ignore_na=False) loop
+        n = len(values)
+        out = np.empty(n)
+        if n == 0:
+            return out
+        alpha = 1.0 / (1.0 + com)
+        old_wt_factor = 1.0 - alpha
+        new_wt = alpha
+        weighted = values[0]
+        old_wt = 1.0
+        out[0] = weighted
+        for i in range(1, n):
+            cur = values[i]
+            is_observation = not np.isnan(cur)
+            if not np.isnan(weighted):
+                old_wt *= old_wt_factor
+                if com == 1:
+                    new_wt = 1.0 - old_wt
+                if is_observation:
+                    if weighted != cur:
+                        weighted = ((old_wt * weighted) + (new_wt * cur)) / (old_wt + new_wt)
+                    old_wt = 1.0
+            elif is_observation:
+                weighted = cur
+            out[i] = weighted
+        return out
+
+    @njit(cache=True, nogil=True)
+    def _rolling_var_jit(values, window, ddof):
+        # Port of pandas' sliding_var kernel for fixed windows
+        n = len(values)
+        out = np.empty(n)
+        nobs = 0
+        mean_x = 0.0
+        ssqdm_x = 0.0
+        comp_add = 0.0
+        comp_remove = 0.0
+        same_ct = 0
+        prev_value = values[0] if n else np.nan
+        for i in range(n):
+            if i >= window:
+                val = values[i - window]
+                if not np.isnan(val):
+                    nobs -= 1
+                    if nobs:
+                        prev_mean = mean_x - comp_remove
+                        y = val - comp_remove
+                        t = y - mean_x
+                        comp_remove = t + mean_x - y
+                        mean_x -= t / nobs
+                        ssqdm_x -= (val - prev_mean) * (val - mean_x)
+                    else:
+                        mean_x = 0.0
+                        ssqdm_x = 0.0
+            val = values[i]
+            if not np.isnan(val):
+                if val == prev_value:
+                    same_ct += 1
+                else:
+                    same_ct = 1
+                prev_value = val
+                nobs += 1
+                prev_mean = mean_x - comp_add
+                y = val - comp_add
+                t = y - mean_x
+                comp_add = t + mean_x - y
+                mean_x += t / nobs
+                ssqdm_x += (val - prev_mean) * (val - mean_x)
+            if nobs >= window and nobs > ddof:
+                if nobs == 1 or same_ct >= nobs:
+                    out[i] = 0.0
+                else:
+                    out[i] = ssqdm_x / (nobs - ddof)
+            else:
+                out[i] = np.nan
+        return out
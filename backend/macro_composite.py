@@ -0,0 +1,342 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+DAY_NS = 86400 * 10**9
+
+# (Name, M2_Ticker, M2_Exch, FX_Ticker, FX_Exch, Op)
+GLOBAL_M2_COMPONENTS = [
+    ('USD', 'USM2', 'ECONOMICS', None, None, 'none'),
+    ('EUR', 'EUM2', 'ECONOMICS', 'EURUSD', 'FX', 'multiply'),
+    ('CNY', 'CNM2', 'ECONOMICS', 'CNYUSD', 'FX_IDC', 'multiply'),
+    ('JPY', 'JPM2', 'ECONOMICS', 'JPYUSD', 'FX_IDC', 'multiply'),
+    ('GBP', 'GBM2', 'ECONOMICS', 'GBPUSD', 'FX', 'multiply'),
+    ('CAD', 'CAM2', 'ECONOMICS', 'CADUSD', 'FX_IDC', 'multiply'),
+    ('CHF', 'CHM2', 'ECONOMICS', 'CHFUSD', 'FX_IDC', 'multiply'),
+    ('RUB', 'RUM2', 'ECONOMICS', 'RUBUSD', 'FX_IDC', 'multiply'),
+]
+
+# Central-bank balance sheets net of the Fed's RRP and TGA (same layout as above)
+GLF_COMPONENTS = [
+    ('US', 'USCBBS', 'ECONOMICS', None, None, 'none'),
+    ('US_RRP', 'RRPONTSYD', 'FRED', None, None, 'none'),
+    ('US_TGA', 'WTREGEN', 'FRED', None, None, 'none'),
+    ('EU', 'EUCBBS', 'ECONOMICS', 'EURUSD', 'FX', 'multiply'),
+    ('CN', 'CNCBBS', 'ECONOMICS', 'CNYUSD', 'FX_IDC', 'multiply'),
+    ('JP', 'JPCBBS', 'ECONOMICS', 'JPYUSD', 'FX_IDC', 'multiply'),
+]
+GLF_WEIGHTS = {'US_RRP': -1.0, 'US_TGA': -1.0}
+
+
+def _clean(series: pd.Series) -> pd.Series:
+    """Sorted, tz-naive, de-duplicated (last publication wins) float series without NaN."""
+    series = series.dropna().astype('float64')
+    if isinstance(series.index, pd.DatetimeIndex) and series.index.tz is not None:
+        series.index = series.index.tz_localize(None)
+    series = series.sort_index()
+    return series[~series.index.duplicated(keep='last')]
+
+
+def _days(index) -> np.ndarray:
+    """Datetime index -> int64 day numbers since the epoch."""
+    return pd.DatetimeIndex(index).as_unit('ns').asi8 // DAY_NS
+
+
+def _first_change(old: pd.Series, new: pd.Series):
+    """First date at which two versions of a component differ (None when identical)."""
+    if old is None or old.empty:
+        return new.index[0] if not new.empty else None
+    if len(old) == len(new) and old.index.equals(new.index) and np.array_equal(old.to_numpy(), new.to_numpy()):
+        return None
+    idx = old.index.union(new.index)
+    a = old.reindex(idx).to_numpy()
+    b = new.reindex(idx).to_numpy()
+    differs = ~((a == b) | (np.isnan(a) & np.isnan(b)))
+    return idx[int(differs.argmax())] if differs.any() else None
+
+
+class MacroComposite:
+    """
+    A weighted sum of macro components in USD, materialized on a daily grid.
+
+    Components are (Name, Ticker, Exch, FX_Ticker, FX_Exch, Op) tuples. Each is
+    stored in local currency as published, converted to USD with the rate of
+    the shared FxMatrix as of each publication, and forward-filled into a daily
+    column; the total (sum of weight * column, weight 1 unless given) is kept
+    alongside. When a component publishes or is revised, or the matrix revises
+    an FX pair, only the affected columns from the first changed day onward and
+    the totals from that day onward are recomputed. Sources are persisted to
+    data/<name>_sources.csv and refetched once the copy is older than the TTL.
+
+    fetch_component(component) returns the local-currency series. Without an
+    FX matrix it must return USD values and Op is ignored.
+    """
+
+    def __init__(self, name: str, components: list, fetch_component, cache_dir: str = 'data',
+                 ttl_seconds: float = 6 * 3600, positive_only: bool = True,
+                 fx=None, weights: dict = None):
+        self.name = name
+        self.components = components
+        self.names = [c[0] for c in components]
+        self._fetch_component = fetch_component
+        self.fx = fx
+        self.cache_path = os.path.join(cache_dir, f"{name}_sources.csv")
+        self.ttl = ttl_seconds
+        self.positive_only = positive_only
+        self.weights = np.array([float((weights or {}).get(n, 1.0)) for n in self.names])
+
+        # FX matrix key -> components converted with it, and the pair versions last applied
+        self._fx_key = {}
+        self._fx_users = {}
+        self._fx_seen = {}
+        if fx is not None:
+            for c in components:
+                if c[3] and c[5] in ('multiply', 'divide'):
+                    self._fx_key[c[0]] = fx.key(c[3], c[4])
+                    self._fx_users.setdefault(self._fx_key[c[0]], []).append(c[0])
+        self._spec = {c[0]: c for c in components}
+
+        self._lock = threading.RLock()
+        self._local = {}  # name -> local-currency series as published
+        self._raw = {}    # name -> USD series at publication dates
+        self._start_day = None
+        self._values = np.empty((0, len(components)))
+        self._total = np.empty(0)
+        self.version = 0
+        self.refreshed_at = 0.0
+        self._refreshing = False  # a refetch is running (single-flight)
+
+    # --- Lifecycle ---
+
+    @property
+    def empty(self) -> bool:
+        return not np.isfinite(self._total).any()
+
+    def is_fresh(self) -> bool:
+        return (time.time() - self.refreshed_at) < self.ttl
+
+    def ensure_fresh(self):
+        """
+        Loads the persisted components on first use and refetches once they are stale.
+        The refetch runs outside the lock, one at a time: callers arriving meanwhile
+        use the current values instead of waiting on the network.
+        """
+        if self.fx is not None and self.refreshed_at == 0.0:
+            # the first load converts with the matrix's rates (refresh() fetches them otherwise)
+            self.fx.ensure_fresh(list(self._fx_users))
+        with self._lock:
+            if self.refreshed_at == 0.0:
+                self._load()
+            if self.is_fresh() or self._refreshing:
+                # another composite may have refreshed a shared FX pair meanwhile
+                if self._sync_fx():
+                    self._save()
+                return
+            self._refreshing = True
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh(self):
+        """Refetches every FX pair and component and applies whatever changed."""
+        changed = []
+        if self.fx is not None:
+            self.fx.ensure_fresh(list(self._fx_users))
+            if self._sync_fx():
+                changed.append('fx')
+
+        for component in self.components:
+            name = component[0]
+            try:
+                series = self._fetch_component(component)
+            except Exception as e:
+                print(f"  [{self.name}] {name} fetch failed: {e}")
+                continue
+            if series is None or series.empty:
+                print(f"  [{self.name}] {name} returned no data, keeping previous values.")
+                continue
+            if self.apply_component(name, series):
+                changed.append(name)
+
+        with self._lock:
+            self.refreshed_at = time.time()
+            if changed:
+                print(f"[{self.name}] Updated components: {changed}")
+                self._save()
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            stored = pd.read_csv(self.cache_path, index_col=0, parse_dates=True, float_precision='round_trip')
+        except Exception as e:
+            print(f"[{self.name}] Cache read error: {e}")
+            return
+        with self._lock:
+            self._local = {col: _clean(stored[col]) for col in stored.columns if col in self.names}
+            if self.fx is not None:
+                self._fx_seen = {pair: self.fx.versions.get(pair) for pair in self._fx_users}
+            self._raw = {}
+            for name in self._local:
+                converted = self._convert(name)
+                if converted is not None:
+                    self._raw[name] = converted
+            self._rebuild()
+            self.refreshed_at = os.path.getmtime(self.cache_path)
+            print(f"[{self.name}] Loaded {len(self._local)} components from cache.")
+
+    def _save(self):
+        try:
+            pd.concat(self._local, axis=1, sort=True).to_csv(self.cache_path)
+        except Exception as e:
+            print(f"[{self.name}] Cache write error: {e}")
+
+    # --- Incremental maintenance ---
+
+    def apply_component(self, name: str, series: pd.Series) -> bool:
+        """
+        Stores a new version of one component's series (local currency, or USD
+        without an FX matrix). Returns False when nothing changed; otherwise
+        recomputes from the first changed day only.
+        """
+        series = _clean(series)
+        if series.empty:
+            return False
+        with self._lock:
+            old = self._local.get(name)
+            if old is not None and _first_change(old, series) is None:
+                return False
+            self._local[name] = series
+            return self._set_converted(name, self._convert(name))
+
+    def _sync_fx(self) -> bool:
+        """
+        Reconverts the components whose FX pair the matrix revised since it was
+        last applied; each is recomputed from its first changed publication.
+        """
+        if self.fx is None:
+            return False
+        changed = False
+        with self._lock:
+            for pair, users in self._fx_users.items():
+                version = self.fx.versions.get(pair)
+                if version == self._fx_seen.get(pair):
+                    continue
+                self._fx_seen[pair] = version
+                for name in users:
+                    if name in self._local:
+                        changed = self._set_converted(name, self._convert(name)) or changed
+        return changed
+
+    def _convert(self, name: str):
+        """USD value of a component at its publication dates (None while its FX rate is missing)."""
+        local = self._local[name]
+        pair = self._fx_key.get(name)
+        if pair is None:
+            return local
+        converted = self.fx.convert(local, pair, self._spec[name][5])
+        return converted.dropna() if converted is not None else None
+
+    def _set_converted(self, name: str, series) -> bool:
+        """Puts a component's USD series on the grid, recomputing from its first changed day."""
+        old = self._raw.get(name)
+        if series is None or series.empty:
+            if old is None:
+                return False
+            del self._raw[name]
+            self._rebuild()
+            self.version += 1
+            return True
+
+        first = _first_change(old, series)
+        if first is None:
+            return False
+        self._raw[name] = series
+
+        days = _days(series.index)
+        end_day = (self._start_day + len(self._total) - 1) if self._start_day is not None else None
+        old_days = _days(old.index[[0, -1]]) if old is not None else None
+        if (self._start_day is None or days[0] < self._start_day or days[-1] > end_day
+                or (old_days is not None and old_days[0] == self._start_day < days[0])
+                or (old_days is not None and old_days[1] == end_day > days[-1])):
+            # the grid's span changes
+            self._rebuild()
+        else:
+            pos = max(int(_days([first])[0] - self._start_day), 0)
+            self._fill_column(self.names.index(name), pos)
+            self._sum_rows(pos)
+        self.version += 1
+        return True
+
+    def _rebuild(self):
+        if not self._raw:
+            self._start_day = None
+            self._values = np.empty((0, len(self.names)))
+            self._total = np.empty(0)
+            return
+        self._start_day = int(min(_days(s.index)[0] for s in self._raw.values()))
+        end_day = int(max(_days(s.index)[-1] for s in self._raw.values()))
+        self._values = np.full((end_day - self._start_day + 1, len(self.names)), np.nan)
+        self._total = np.full(len(self._values), np.nan)
+        for col in range(len(self.names)):
+            self._fill_column(col, 0)
+        self._sum_rows(0)
+
+    def _fill_column(self, col: int, from_pos: int):
+        """Forward-fills one component onto the grid from row from_pos (as-of its publications)."""
+        series = self._raw.get(self.names[col])
+        if series is None:
+            self._values[from_pos:, col] = np.nan
+            return
+        grid_days = np.arange(self._start_day + from_pos, self._start_day + len(self._values))
+        pos = np.searchsorted(_days(series.index), grid_days, side='right') - 1
+        values = series.to_numpy()[np.maximum(pos, 0)]
+        values[pos < 0] = np.nan
+        self._values[from_pos:, col] = values
+
+    def _sum_rows(self, from_pos: int):
+        block = self._values[from_pos:]
+        present = ~np.isnan(block)
+        total = np.where(present, block * self.weights, 0.0).sum(axis=1)
+        total[~present.any(axis=1)] = np.nan
+        if self.positive_only:
+            total[total <= 0] = np.nan
+        self._total[from_pos:] = total
+
+    # --- Reads ---
+
+    def _index(self) -> pd.DatetimeIndex:
+        days = np.arange(self._start_day or 0, (self._start_day or 0) + len(self._total), dtype=np.int64)
+        return pd.DatetimeIndex((days * DAY_NS).view('datetime64[ns]'))
+
+    def series(self) -> pd.Series:
+        """The daily total (days without any component dropped)."""
+        with self._lock:
+            return pd.Series(self._total.copy(), index=self._index(), name=self.name).dropna()
+
+    def frame(self) -> pd.DataFrame:
+        """Daily forward-filled components (USD, unweighted) plus the total column."""
+        with self._lock:
+            df = pd.DataFrame(self._values.copy(), index=self._index(), columns=self.names)
+            df[self.name] = self._total
+            return df
+
+    def asof(self, times_ns: np.ndarray) -> np.ndarray:
+        """
+        Total as of each timestamp (int64 ns): the daily grid makes the as-of
+        position a subtraction, so no per-request reindex or search is needed.
+        Times before the first day are NaN; times after the last day keep the last value.
+        """
+        with self._lock:
+            total = self._total
+            if self._start_day is None or len(total) == 0:
+                return np.full(len(times_ns), np.nan)
+            pos = np.asarray(times_ns, dtype=np.int64) // DAY_NS - self._start_day
+            out = total[np.clip(pos, 0, len(total) - 1)]
+            out[pos < 0] = np.nan
+            return out
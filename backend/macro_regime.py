@@ -0,0 +1,251 @@
+"""
+Tier 1 macro regime (port of the regime logic in indicator/GLF_Antigravity_Strategy.pine):
+
+    walcl_roc = 30-day % change of the Fed balance sheet (FRED:WALCL)
+    dxy_roc   = 30-day % change of the dollar index (TVC:DXY)
+    QE (risk-on)  : walcl_roc > 0 or (|walcl_roc| < 0.5 and dxy_roc < 0)
+    QT (risk-off) : walcl_roc < 0 and dxy_roc > 0
+    Neutral       : otherwise
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import mtf
+from macro_composite import DAY_NS, _clean, _days, _first_change
+
+# (Name, Ticker, Exch)
+REGIME_SOURCES = [
+    ('WALCL', 'WALCL', 'FRED'),
+    ('DXY', 'DXY', 'TVC'),
+]
+# Regime codes are the positions in this tuple
+REGIMES = ('Neutral', 'QE', 'QT')
+NEUTRAL, QE, QT = 0, 1, 2
+ROC_DAYS = 30
+
+
+def classify(walcl_roc: np.ndarray, dxy_roc: np.ndarray) -> np.ndarray:
+    """Regime codes (int8) from the two ROC series; Neutral wherever an input is NaN."""
+    with np.errstate(invalid='ignore'):
+        risk_on = (walcl_roc > 0) | ((np.abs(walcl_roc) < 0.5) & (dxy_roc < 0))
+        risk_off = (walcl_roc < 0) & (dxy_roc > 0)
+    codes = np.full(len(walcl_roc), NEUTRAL, dtype=np.int8)
+    codes[risk_off] = QT
+    codes[risk_on] = QE
+    return codes
+
+
+class MacroRegime:
+    """
+    Daily QE/QT/Neutral classification, materialized once per WALCL/DXY release.
+
+    WALCL and DXY are forward-filled onto a daily grid (the strategy's daily
+    request.security), their 30-day ROC computed and classified. The regime is
+    kept as an int8 code per day (see REGIMES), so joining it onto any bars is
+    one searchsorted and gather. A bar sees a day's regime once that day has
+    closed (day start + 1 day <= the bar's close time), like a confirmed daily
+    request.security, so intraday bars never read the close of their own day.
+    The sources are persisted to
+    data/macro_regime_sources.csv and the daily result to data/macro_regime.csv;
+    after a refetch everything is recomputed only when a source published or
+    was revised.
+
+    fetch_source(source) returns the series as published.
+    """
+
+    def __init__(self, fetch_source, cache_dir: str = 'data', ttl_seconds: float = 6 * 3600):
+        self._fetch_source = fetch_source
+        self.sources_path = os.path.join(cache_dir, "macro_regime_sources.csv")
+        self.cache_path = os.path.join(cache_dir, "macro_regime.csv")
+        self.ttl = ttl_seconds
+
+        self._lock = threading.RLock()
+        self._sources = {}
+        self._start_day = None
+        self._walcl = np.empty(0)
+        self._walcl_roc = np.empty(0)
+        self._dxy_roc = np.empty(0)
+        self._codes = np.empty(0, dtype=np.int8)
+        self.version = 0
+        self.refreshed_at = 0.0
+        self._refreshing = False  # a refetch is running (single-flight)
+
+    # --- Lifecycle ---
+
+    @property
+    def empty(self) -> bool:
+        return len(self._codes) == 0
+
+    def is_fresh(self) -> bool:
+        return (time.time() - self.refreshed_at) < self.ttl
+
+    def ensure_fresh(self):
+        """
+        Loads the persisted regime on first use and refetches the sources once they are
+        stale. The refetch runs outside the lock, one at a time (see MacroComposite).
+        """
+        with self._lock:
+            if self.refreshed_at == 0.0:
+                self._load()
+            if self.is_fresh() or self._refreshing:
+                return
+            self._refreshing = True
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh(self):
+        changed = []
+        for source in REGIME_SOURCES:
+            name = source[0]
+            try:
+                series = self._fetch_source(source)
+            except Exception as e:
+                print(f"  [macro_regime] {name} fetch failed: {e}")
+                continue
+            if series is None or series.empty:
+                print(f"  [macro_regime] {name} returned no data, keeping previous values.")
+                continue
+            if self.apply_source(name, series):
+                changed.append(name)
+
+        with self._lock:
+            self.refreshed_at = time.time()
+            if changed:
+                self._recompute()
+                print(f"[macro_regime] New release in {changed}, regime recomputed ({len(self._codes)} days).")
+                self._save()
+
+    def apply_source(self, name: str, series: pd.Series) -> bool:
+        """Stores a new version of a source series. Returns False when nothing changed."""
+        series = _clean(series)
+        if series.empty:
+            return False
+        with self._lock:
+            old = self._sources.get(name)
+            if old is not None and _first_change(old, series) is None:
+                return False
+            self._sources[name] = series
+            return True
+
+    def _load(self):
+        if not os.path.exists(self.sources_path):
+            return
+        try:
+            sources = pd.read_csv(self.sources_path, index_col=0, parse_dates=True, float_precision='round_trip')
+        except Exception as e:
+            print(f"[macro_regime] Cache read error: {e}")
+            return
+        with self._lock:
+            self._sources = {col: _clean(sources[col]) for col in sources.columns}
+            self.refreshed_at = os.path.getmtime(self.sources_path)
+            try:
+                stored = pd.read_csv(self.cache_path, index_col=0, parse_dates=True, float_precision='round_trip')
+                self._start_day = int(_days(stored.index[:1])[0])
+                self._walcl = stored['walcl'].to_numpy(dtype='float64')
+                self._walcl_roc = stored['walcl_roc'].to_numpy(dtype='float64')
+                self._dxy_roc = stored['dxy_roc'].to_numpy(dtype='float64')
+                self._codes = stored['regime'].to_numpy(dtype=np.int8)
+                self.version += 1
+            except Exception as e:
+                # sources without a result (or an unreadable one): classify again
+                print(f"[macro_regime] Regime cache unusable ({e}), recomputing.")
+                self._recompute()
+            print(f"[macro_regime] Loaded {len(self._codes)} days from cache.")
+
+    def _save(self):
+        try:
+            pd.concat(self._sources, axis=1, sort=True).to_csv(self.sources_path)
+            self.frame(labels=False).to_csv(self.cache_path)
+        except Exception as e:
+            print(f"[macro_regime] Cache write error: {e}")
+
+    def _recompute(self):
+        walcl = self._sources.get('WALCL')
+        dxy = self._sources.get('DXY')
+        if walcl is None or dxy is None:
+            return
+        walcl_days = _days(walcl.index)
+        dxy_days = _days(dxy.index)
+        start = int(min(walcl_days[0], dxy_days[0]))
+        end = int(max(walcl_days[-1], dxy_days[-1]))
+        grid = np.arange(start, end + 1)
+
+        walcl_daily = _daily(walcl, walcl_days, grid)
+        dxy_daily = _daily(dxy, dxy_days, grid)
+        walcl_roc = _roc(walcl_daily, ROC_DAYS)
+        dxy_roc = _roc(dxy_daily, ROC_DAYS)
+
+        self._start_day = start
+        self._walcl = walcl_daily
+        self._walcl_roc = walcl_roc
+        self._dxy_roc = dxy_roc
+        self._codes = classify(walcl_roc, dxy_roc)
+        self.version += 1
+
+    # --- Reads ---
+
+    def _rows(self, close_ns) -> np.ndarray:
+        """Row of the last day closed by each bar close time (-1 before the first day closed)."""
+        day_close = (self._start_day + 1 + np.arange(len(self._codes), dtype=np.int64)) * DAY_NS
+        return mtf.map_confirmed(day_close, np.asarray(close_ns, dtype=np.int64))
+
+    def codes(self, close_ns) -> np.ndarray:
+        """Regime code of the last closed day at each bar close time (int64 ns); Neutral before the data."""
+        close_ns = np.asarray(close_ns, dtype=np.int64)
+        with self._lock:
+            if self.empty:
+                return np.full(len(close_ns), NEUTRAL, dtype=np.int8)
+            rows = self._rows(close_ns)
+            out = self._codes[np.maximum(rows, 0)]
+            out[rows < 0] = NEUTRAL
+            return out
+
+    def labels(self, close_ns) -> np.ndarray:
+        """'QE' / 'QT' / 'Neutral' at each bar close time (object array)."""
+        return np.array(REGIMES, dtype=object)[self.codes(close_ns)]
+
+    def asof(self, close_ns) -> pd.DataFrame:
+        """walcl, walcl_roc, dxy_roc and regime code at each bar close time (NaN before the data)."""
+        close_ns = np.asarray(close_ns, dtype=np.int64)
+        with self._lock:
+            columns = {}
+            rows = self._rows(close_ns) if not self.empty else np.full(len(close_ns), -1)
+            for name, values in (('walcl', self._walcl), ('walcl_roc', self._walcl_roc), ('dxy_roc', self._dxy_roc)):
+                out = values[np.maximum(rows, 0)] if len(values) else np.full(len(close_ns), np.nan)
+                out[rows < 0] = np.nan
+                columns[name] = out
+            columns['regime'] = self.codes(close_ns)
+            return pd.DataFrame(columns)
+
+    def frame(self, labels: bool = True) -> pd.DataFrame:
+        with self._lock:
+            days = np.arange(self._start_day or 0, (self._start_day or 0) + len(self._codes), dtype=np.int64)
+            index = pd.DatetimeIndex((days * DAY_NS).view('datetime64[ns]'))
+            regime = pd.Categorical.from_codes(self._codes, REGIMES) if labels else self._codes.copy()
+            return pd.DataFrame({'walcl': self._walcl, 'walcl_roc': self._walcl_roc,
+                                 'dxy_roc': self._dxy_roc, 'regime': regime}, index=index)
+
+
+def _daily(series: pd.Series, days: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Series forward-filled onto the day grid (NaN before its first value)."""
+    pos = np.searchsorted(days, grid, side='right') - 1
+    out = series.to_numpy(dtype='float64')[np.maximum(pos, 0)]
+    out[pos < 0] = np.nan
+    return out
+
+
+def _roc(values: np.ndarray, length: int) -> np.ndarray:
+    """ta.roc: 100 * (x - x[length]) / x[length]."""
+    out = np.full(len(values), np.nan)
+    if len(values) > length:
+        prev = values[:-length]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[length:] = 100 * (values[length:] - prev) / prev
+    return out
@@ -0,0 +1,124 @@
+"""
+Multi-timeframe evaluation (the request.security equivalent).
+
+Chart bars are resampled into higher-timeframe (HTF) bars, an indicator runs on
+those, and each HTF value is mapped back onto the chart bars once its HTF bar
+has closed: a chart bar only sees HTF bars whose close time is at or before its
+own close time, so no value from a still-forming HTF bar leaks into history.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+SECOND_NS = 10**9
+_UNIT_SECONDS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+# Weekly bars open on Monday (1970-01-05), like exchange and TradingView weeklies
+_WEEK_ANCHOR_NS = 4 * 86400 * SECOND_NS
+
+
+def parse_timeframe(timeframe: str):
+    """
+    '15m', '4h', '1d', '1w', '1M' or Pine's '60', '240', 'D', 'W', 'M', '3M'
+    -> (unit, count) with unit in m/h/d/w/M.
+    """
+    tf = str(timeframe).strip()
+    if tf.isdigit():
+        return 'm', int(tf)
+    match = re.fullmatch(r'(\d*)([mhdwDWM])', tf)
+    if not match:
+        raise ValueError(f"Unknown timeframe '{timeframe}'")
+    count = int(match.group(1) or 1)
+    unit = match.group(2)
+    if unit in 'DW':
+        unit = unit.lower()
+    if count < 1:
+        raise ValueError(f"Unknown timeframe '{timeframe}'")
+    return unit, count
+
+
+def timeframe_ns(timeframe: str) -> int:
+    """Nominal bar duration in ns (months count as 30 days)."""
+    unit, count = parse_timeframe(timeframe)
+    seconds = 30 * 86400 if unit == 'M' else _UNIT_SECONDS[unit]
+    return count * seconds * SECOND_NS
+
+
+def bucket_bounds(times_ns: np.ndarray, timeframe: str):
+    """(open, close) time in ns of the HTF bar containing each timestamp."""
+    unit, count = parse_timeframe(timeframe)
+    times_ns = np.asarray(times_ns, dtype=np.int64)
+    if unit == 'M':
+        months = times_ns.astype('datetime64[ns]').astype('datetime64[M]').astype(np.int64)
+        first = (months // count) * count
+        start = first.astype('datetime64[M]').astype('datetime64[ns]').astype(np.int64)
+        end = (first + count).astype('datetime64[M]').astype('datetime64[ns]').astype(np.int64)
+        return start, end
+    period = count * _UNIT_SECONDS[unit] * SECOND_NS
+    anchor = _WEEK_ANCHOR_NS if unit == 'w' else 0
+    start = (times_ns - anchor) // period * period + anchor
+    return start, start + period
+
+
+def bar_duration_ns(times_ns: np.ndarray) -> int:
+    """Chart bar duration, from the typical spacing of the timestamps."""
+    if len(times_ns) < 2:
+        return 0
+    return int(np.median(np.diff(times_ns)))
+
+
+def resample(df: pd.DataFrame, times_ns: np.ndarray, timeframe: str):
+    """
+    Chart bars -> HTF bars: open first, high max, low min, close last, volume sum
+    (in one pass of ufunc.reduceat over the bucket boundaries).
+
+    Returns (htf frame with a 'time' column in unix seconds and a RangeIndex, HTF close times in ns).
+    """
+    start, end = bucket_bounds(times_ns, timeframe)
+    if len(start) == 0:
+        return pd.DataFrame(columns=['time'] + [c for c in df.columns if c != 'time']), np.empty(0, dtype=np.int64)
+    first = np.flatnonzero(np.concatenate([[True], start[1:] != start[:-1]]))
+    last = np.concatenate([first[1:], [len(start)]]) - 1
+
+    columns = {'time': start[first] // SECOND_NS}
+    for col in df.columns:
+        if col == 'time':
+            continue
+        values = df[col].to_numpy()
+        if values.dtype.kind not in 'iuf':
+            continue
+        values = values.astype('float64')
+        if col == 'high':
+            columns[col] = np.fmax.reduceat(values, first)
+        elif col == 'low':
+            columns[col] = np.fmin.reduceat(values, first)
+        elif col == 'open':
+            columns[col] = values[first]
+        elif col == 'volume':
+            columns[col] = np.add.reduceat(np.nan_to_num(values), first)
+        else:
+            columns[col] = values[last]
+    return pd.DataFrame(columns), end[first]
+
+
+def map_confirmed(htf_close_ns: np.ndarray, chart_close_ns: np.ndarray) -> np.ndarray:
+    """
+    For each chart bar, the row of the last HTF bar closed at or before the chart
+    bar's close (-1 when none has closed yet).
+    """
+    return np.searchsorted(htf_close_ns, chart_close_ns, side='right') - 1
+
+
+def take(values, rows: np.ndarray):
+    """values[rows] with -1 rows as NaN (None for non-float columns)."""
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.full(len(rows), np.nan)
+    out = values[np.maximum(rows, 0)]
+    if out.dtype.kind == 'f':
+        out = out.copy()
+        out[rows < 0] = np.nan
+    else:
+        out = out.astype(object)
+        out[rows < 0] = None
+    return out
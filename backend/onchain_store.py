@@ -0,0 +1,202 @@
+"""
+Local store of daily on-chain metrics (market cap, realized cap, ...), filled
+from CSV dumps, plus the daily CVDD and MVRV series computed from it.
+
+Import a dump (CoinMetrics community CSV, Glassnode/TradingView exports or a
+plain date,value file):
+    python onchain_store.py import btc.csv
+    python onchain_store.py import realized.csv realized_cap
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from macro_composite import DAY_NS, _clean, _days
+
+# Metric -> column names it is recognised by in imported dumps
+METRICS = {
+    'market_cap': ['CapMrktCurUSD', 'BTC_MARKETCAP', 'market_cap', 'marketcap'],
+    'realized_cap': ['CapRealUSD', 'BTC_MARKETCAPREAL', 'realized_cap', 'realizedcap'],
+    'market_cap_ff': ['CapMrktFFUSD', 'BTC_MARKETCAPFF', 'market_cap_ff'],
+    'transfer_volume': ['TxTfrValAdjUSD', 'TxTfrValUSD', 'BTC_TOTALVOLUME', 'transfer_volume', 'total_volume'],
+}
+TIME_COLUMNS = ['time', 'timestamp', 'date', 't', 'datetime']
+
+
+def _parse_times(values: pd.Series) -> pd.DatetimeIndex:
+    """Dates, ISO strings or unix seconds/milliseconds -> tz-naive DatetimeIndex."""
+    if pd.api.types.is_numeric_dtype(values):
+        unit = 'ms' if values.abs().max() > 1e11 else 's'
+        return pd.DatetimeIndex(pd.to_datetime(values, unit=unit))
+    index = pd.DatetimeIndex(pd.to_datetime(values, utc=True))
+    return index.tz_localize(None)
+
+
+class OnChainStore:
+    """
+    Daily on-chain metrics, one CSV per metric under data/onchain/.
+
+    Metrics are loaded lazily and can be read as-of arbitrary bar times.
+    Derived daily series (CVDD, MVRV) are computed once per store version and
+    cached, so indicators only pay for the as-of lookup onto their bars.
+    """
+
+    def __init__(self, data_dir: str = 'data'):
+        self.store_dir = os.path.join(data_dir, 'onchain')
+        self._lock = threading.RLock()
+        self._series = {}
+        self._derived = {}
+        self.version = 0
+
+    def _path(self, metric: str) -> str:
+        return os.path.join(self.store_dir, f"{metric}.csv")
+
+    # --- Import ---
+
+    def import_csv(self, path: str, metric: str = None, value_column: str = None) -> list:
+        """
+        Merges a CSV dump into the store (imported rows replace stored ones on the
+        same day). Without metric, every known metric column in the file is
+        imported; with it, value_column (or the only non-time column) is used.
+        Returns the imported metric names.
+        """
+        raw = pd.read_csv(path)
+        time_col = next((c for c in raw.columns if str(c).lower() in TIME_COLUMNS), raw.columns[0])
+        index = _parse_times(raw[time_col])
+
+        if metric is not None:
+            if metric not in METRICS:
+                raise ValueError(f"Unknown on-chain metric '{metric}'. Use one of {list(METRICS)}.")
+            if value_column is None:
+                others = [c for c in raw.columns if c != time_col]
+                value_column = next((c for c in others if c in METRICS[metric]), others[0] if len(others) == 1 else None)
+            if value_column is None:
+                raise ValueError(f"{path}: several value columns, pass value_column")
+            columns = {metric: value_column}
+        else:
+            columns = {}
+            for name, aliases in METRICS.items():
+                found = next((c for c in raw.columns if c in aliases), None)
+                if found is not None:
+                    columns[name] = found
+            if not columns:
+                raise ValueError(f"{path}: no known metric columns ({sum(METRICS.values(), [])})")
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        with self._lock:
+            for name, column in columns.items():
+                values = pd.to_numeric(raw[column], errors='coerce').to_numpy(dtype='float64')
+                new = pd.Series(values, index=index.normalize())
+                old = self.series(name)
+                merged = _clean(pd.concat([old, new]) if old is not None else new)
+                merged.rename_axis('time').rename('value').to_csv(self._path(name))
+                self._series[name] = merged
+                print(f"[onchain] Imported {name}: {len(new)} rows from {os.path.basename(path)} ({len(merged)} stored)")
+            self.version += 1
+            self._derived.clear()
+        return list(columns)
+
+    # --- Reads ---
+
+    def series(self, metric: str):
+        """Daily series of a metric (None when it was never imported)."""
+        with self._lock:
+            if metric not in self._series:
+                path = self._path(metric)
+                if not os.path.exists(path):
+                    return None
+                try:
+                    stored = pd.read_csv(path, index_col=0, parse_dates=True, float_precision='round_trip')
+                except Exception as e:
+                    print(f"[onchain] Read error {path}: {e}")
+                    return None
+                self._series[metric] = _clean(stored.iloc[:, 0])
+            return self._series[metric]
+
+    def has(self, *metrics) -> bool:
+        return all(self.series(m) is not None for m in metrics)
+
+    def derived(self, key: tuple, compute):
+        """compute(store) cached per store version (daily series/frames derived from the metrics)."""
+        with self._lock:
+            cached = self._derived.get(key)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            result = compute(self)
+            self._derived[key] = (self.version, result)
+            return result
+
+
+def asof(series, times_ns) -> np.ndarray:
+    """Values of a daily series/frame as of each timestamp (int64 ns); NaN before its first day."""
+    times_ns = np.asarray(times_ns, dtype=np.int64)
+    pos = np.searchsorted(_days(series.index), times_ns // DAY_NS, side='right') - 1
+    values = series.to_numpy(dtype='float64')
+    out = values[np.maximum(pos, 0)]
+    out[pos < 0] = np.nan
+    return out
+
+
+# --- Derived daily series (ports of indicator/CVDD.txt and indicator/MVRV.txt) ---
+
+CVDD_START = pd.Timestamp('2011-08-06')
+
+
+def cvdd_daily(store: OnChainStore, volume_length: int = 500) -> pd.DataFrame:
+    """
+    Coin Value Days Destroyed approximation: (realized cap - SMA(transfer volume)) / 22M.
+    Needs realized_cap and transfer_volume; empty before 2011-08-06.
+    """
+    import kernels
+
+    realized = store.series('realized_cap')
+    volume = store.series('transfer_volume')
+    if realized is None or volume is None:
+        return None
+    volume_sma = pd.Series(kernels.sma(volume.to_numpy(), volume_length), index=volume.index)
+    index = realized.index.union(volume.index)
+    cvdd = (realized.reindex(index).ffill() - volume_sma.reindex(index).ffill()) / 22000000
+    return cvdd[index > CVDD_START].dropna().to_frame(name='cvdd')
+
+
+def mvrv_daily(store: OnChainStore, free_float: bool = False) -> pd.DataFrame:
+    """
+    MVRV = market cap / realized cap and its Z-score (market cap - realized cap)
+    divided by the population standard deviation of all market caps to date.
+    Needs market_cap (and market_cap_ff for the free-float variant) and realized_cap.
+    """
+    market = store.series('market_cap')
+    realized = store.series('realized_cap')
+    if market is None or realized is None:
+        return None
+    index = market.index.intersection(realized.index)
+    mc = market.reindex(index).to_numpy()
+    mcr = realized.reindex(index).to_numpy()
+    numerator = mc
+    if free_float:
+        ff = store.series('market_cap_ff')
+        if ff is None:
+            return None
+        numerator = ff.reindex(index).to_numpy()
+
+    # Expanding population std of the market cap, from shifted cumulative sums
+    shift = mc[0] if len(mc) else 0.0
+    count = np.arange(1, len(mc) + 1)
+    mean = np.cumsum(mc - shift) / count
+    var = np.cumsum((mc - shift) ** 2) / count - mean ** 2
+    std = np.sqrt(np.maximum(var, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mvrv = numerator / mcr
+        zscore = np.where(std > 0, (numerator - mcr) / std, np.nan)
+    return pd.DataFrame({'mvrv': mvrv, 'zscore': zscore}, index=index)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "import":
+        print("Usage: python onchain_store.py import <file.csv> [metric] [value_column]")
+        sys.exit(1)
+    store = OnChainStore(os.path.join(os.getcwd(), 'data'))
+    store.import_csv(sys.argv[2], *sys.argv[3:5])
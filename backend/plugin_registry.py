@@ -0,0 +1,181 @@
+import ast
+import importlib.util
+import os
+import threading
+
+
+def _literal(node):
+    """Value of a literal AST node (default values, metadata), or its source text when not a literal."""
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return ast.unparse(node)
+
+
+def _param_schema(fn: ast.FunctionDef) -> list:
+    """[{name, default, type}] for an ind_* function, skipping the leading df argument."""
+    args = fn.args.posonlyargs + fn.args.args
+    defaults = [None] * (len(args) - len(fn.args.defaults)) + list(fn.args.defaults)
+    params = []
+    for arg, default in list(zip(args, defaults))[1:]:
+        params.append({
+            "name": arg.arg,
+            "default": _literal(default) if default is not None else None,
+            "type": ast.unparse(arg.annotation) if arg.annotation is not None else None,
+        })
+    for arg, default in zip(fn.args.kwonlyargs, fn.args.kw_defaults):
+        params.append({
+            "name": arg.arg,
+            "default": _literal(default) if default is not None else None,
+            "type": ast.unparse(arg.annotation) if arg.annotation is not None else None,
+        })
+    return params
+
+
+class PluginSpec:
+    """What the registry knows about one plugin indicator before (and after) it is imported."""
+
+    def __init__(self, name: str, path: str, func_name: str, params: list, doc: str = "", meta: dict = None):
+        self.name = name
+        self.path = path
+        self.func_name = func_name
+        self.params = params
+        self.doc = doc
+        self.meta = meta or {}
+        self.func = None
+
+    def schema(self) -> dict:
+        return {"name": self.name, "source": "plugin", "params": self.params, "doc": self.doc, **self.meta}
+
+
+class PluginRegistry:
+    """
+    Indicator plugins from the indicator/ directory.
+
+    Files are parsed (not imported) to find top-level ind_* functions, their
+    parameter schemas and docstrings, plus an optional module-level
+    INDICATOR_META = {"ind_Name": {...}} literal. A plugin module is imported
+    only the first time one of its indicators is called. Scans are cached per
+    file by (mtime, size), so listing is cheap and edited files are picked up;
+    get() re-checks the stamp of the plugin's file, so an edited plugin is
+    re-imported on its next call and a new file is found by name.
+
+    `reserved` names (the native indicators) are never served from plugins:
+    legacy files that redefine them (indicator/standard.py's ind_EMA and
+    ind_Bollinger) are skipped, which is what loading plugins used to be
+    disabled for.
+    """
+
+    def __init__(self, plugin_dir: str, reserved=()):
+        self.plugin_dir = plugin_dir
+        self.reserved = set(reserved)
+        self._lock = threading.Lock()
+        self._files = {}    # path -> ((mtime, size), [PluginSpec])
+        self._specs = {}    # indicator name -> PluginSpec
+        self._modules = {}  # path -> imported module
+
+    def scan(self) -> dict:
+        """Refreshes the spec table from disk; returns {name: PluginSpec}."""
+        if not os.path.isdir(self.plugin_dir):
+            return {}
+        with self._lock:
+            seen = set()
+            for entry in sorted(os.scandir(self.plugin_dir), key=lambda e: e.name):
+                if not entry.is_file() or not entry.name.endswith('.py') or entry.name.startswith('_'):
+                    continue
+                seen.add(entry.path)
+                stat = entry.stat()
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                cached = self._files.get(entry.path)
+                if cached is None or cached[0] != stamp:
+                    self._files[entry.path] = (stamp, self._parse(entry.path))
+                    self._modules.pop(entry.path, None)
+            for path in [p for p in self._files if p not in seen]:
+                del self._files[path]
+                self._modules.pop(path, None)
+
+            self._specs = {}
+            for _, specs in self._files.values():
+                for spec in specs:
+                    if spec.name not in self.reserved:
+                        self._specs.setdefault(spec.name, spec)
+            return dict(self._specs)
+
+    def _stale(self, path: str) -> bool:
+        """True when a scanned file changed (or vanished) since it was parsed."""
+        cached = self._files.get(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return True
+        return cached is None or cached[0] != (stat.st_mtime_ns, stat.st_size)
+
+    def _lookup(self, name: str):
+        """The current spec for `name`, rescanning when it is unknown or its file changed."""
+        if name in self.reserved:
+            return None
+        spec = self._specs.get(name)
+        if spec is None or self._stale(spec.path):
+            spec = self.scan().get(name)
+        return spec
+
+    @staticmethod
+    def _parse(path: str) -> list:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError) as e:
+            print(f"Error scanning plugin {path}: {e}")
+            return []
+
+        meta = {}
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == 'INDICATOR_META' for t in node.targets):
+                value = _literal(node.value)
+                if isinstance(value, dict):
+                    meta = value
+
+        specs = []
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and node.name.startswith('ind_'):
+                specs.append(PluginSpec(
+                    name=node.name[4:],
+                    path=path,
+                    func_name=node.name,
+                    params=_param_schema(node),
+                    doc=(ast.get_docstring(node) or "").strip().split("\n")[0],
+                    meta=meta.get(node.name),
+                ))
+        return specs
+
+    def names(self) -> list:
+        return sorted(self.scan())
+
+    def schemas(self) -> dict:
+        return {name: spec.schema() for name, spec in self.scan().items()}
+
+    def __contains__(self, name: str) -> bool:
+        return self._lookup(name) is not None
+
+    def get(self, name: str):
+        """
+        The plugin function for indicator `name`, importing its module on first use
+        and again after its file changed (None if unknown).
+        """
+        spec = self._lookup(name)
+        if spec is None:
+            return None
+        if spec.func is not None:
+            return spec.func
+
+        with self._lock:
+            module = self._modules.get(spec.path)
+            if module is None:
+                module_name = "indicator_plugins." + os.path.basename(spec.path)[:-3]
+                import_spec = importlib.util.spec_from_file_location(module_name, spec.path)
+                module = importlib.util.module_from_spec(import_spec)
+                import_spec.loader.exec_module(module)
+                self._modules[spec.path] = module
+                print(f"Loaded plugin module: {os.path.basename(spec.path)}")
+            spec.func = getattr(module, spec.func_name, None)
+        return spec.func
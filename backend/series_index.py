@@ -0,0 +1,242 @@
+import threading
+
+import numpy as np
+
+
+_NOISE = 64 * np.finfo('float64').eps
+
+
+class _Growable:
+    """Append-only float64 buffer with amortized O(1) appends (capacity doubles)."""
+
+    def __init__(self, values=None):
+        values = np.empty(0) if values is None else np.asarray(values, dtype='float64')
+        self._data = np.empty(max(16, len(values)))
+        self._data[:len(values)] = values
+        self.size = len(values)
+
+    def append(self, values: np.ndarray):
+        needed = self.size + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)))
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = values
+        self.size = needed
+
+    def truncate(self, size: int):
+        self.size = max(0, min(self.size, size))
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self.size]
+
+    def copy(self) -> '_Growable':
+        out = _Growable.__new__(_Growable)
+        out._data = self._data.copy()
+        out.size = self.size
+        return out
+
+
+class SeriesIndex:
+    """
+    Range-query index over one numeric column: prefix sums of the values and
+    their squares, and a sparse table of min/max (level k holds the extreme of
+    every 2**k-bar block). Any window sum, mean, variance or extreme is then
+    O(1): two prefix lookups, or two overlapping power-of-two blocks.
+
+    Maintained incrementally: append() adds O(new bars * log n) work, truncate()
+    drops a revised tail, drop_head() follows a sliding limit window (positions
+    stay relative to the current first bar). These mutate the index, so an index
+    others may be reading is copy()'d first (see BarStore). Positions are bar numbers, ranges
+    are [start, end). Non-finite bars make sums/means NaN and are skipped by
+    min/max, like kernels.sma and ta.highest.
+
+    Sums are taken relative to the first finite value, like kernels.sma, so the
+    prefix sums stay small for price-like series.
+    """
+
+    def __init__(self, values=None):
+        self._lock = threading.RLock()
+        self._reset()
+        if values is not None:
+            self.append(values)
+
+    def _reset(self):
+        self._base = 0
+        self._shift = None
+        self._raw = _Growable()
+        self._s1 = _Growable([0.0])
+        self._s2 = _Growable([0.0])
+        self._finite = _Growable([0.0])
+        self._max = []
+        self._min = []
+
+    def __len__(self) -> int:
+        return self._raw.size - self._base
+
+    def copy(self) -> 'SeriesIndex':
+        """An independent copy (a memory copy of the buffers, no recomputation)."""
+        with self._lock:
+            out = SeriesIndex()
+            out._base, out._shift = self._base, self._shift
+            out._raw, out._s1, out._s2, out._finite = (g.copy() for g in (self._raw, self._s1, self._s2, self._finite))
+            out._max = [level.copy() for level in self._max]
+            out._min = [level.copy() for level in self._min]
+            return out
+
+    # --- Maintenance ---
+
+    def append(self, values):
+        values = np.asarray(values, dtype='float64')
+        if len(values) == 0:
+            return
+        with self._lock:
+            finite = np.isfinite(values)
+            if self._shift is None and finite.any():
+                self._shift = float(values[finite][0])
+            shifted = np.where(finite, values - (self._shift or 0.0), 0.0)
+            self._s1.append(self._s1.values[-1] + np.cumsum(shifted))
+            self._s2.append(self._s2.values[-1] + np.cumsum(shifted * shifted))
+            self._finite.append(self._finite.values[-1] + np.cumsum(finite))
+            self._raw.append(values)
+            self._extend_table(self._max, np.where(finite, values, -np.inf), np.fmax)
+            self._extend_table(self._min, np.where(finite, values, np.inf), np.fmin)
+
+    def _extend_table(self, levels: list, level0: np.ndarray, op):
+        n = self._raw.size
+        if not levels:
+            levels.append(_Growable())
+        levels[0].append(level0)
+        k = 1
+        while (1 << k) <= n:
+            if len(levels) <= k:
+                levels.append(_Growable())
+            half = 1 << (k - 1)
+            below = levels[k - 1].values
+            start, stop = levels[k].size, n - (1 << k) + 1
+            levels[k].append(op(below[start:stop], below[start + half:stop + half]))
+            k += 1
+
+    def truncate(self, length: int):
+        """Keeps the first `length` bars (before appending a revised tail)."""
+        with self._lock:
+            n = self._base + max(0, length)
+            if n >= self._raw.size:
+                return
+            self._raw.truncate(n)
+            for prefix in (self._s1, self._s2, self._finite):
+                prefix.truncate(n + 1)
+            for levels in (self._max, self._min):
+                for k, level in enumerate(levels):
+                    level.truncate(n - (1 << k) + 1)
+
+    def drop_head(self, count: int):
+        """Forgets the first `count` bars; rebuilt compactly once most of the storage is dropped bars."""
+        with self._lock:
+            self._base = min(self._base + max(0, count), self._raw.size)
+            if self._base > len(self):
+                live = self._raw.values[self._base:].copy()
+                self._reset()
+                self.append(live)
+
+    # --- Queries (scalars or arrays of positions) ---
+
+    def _bounds(self, start, end):
+        start = np.asarray(start, dtype=np.int64)
+        end = np.asarray(end, dtype=np.int64)
+        n = len(self)
+        if np.any((start < 0) | (end > n) | (start >= end)):
+            raise IndexError(f"Range out of bounds for a series of {n} bars")
+        return start + self._base, end + self._base
+
+    @staticmethod
+    def _out(values):
+        return values.item() if np.ndim(values) == 0 else values
+
+    def _sums(self, start, end):
+        a, b = self._bounds(start, end)
+        s1, s2, fin = self._s1.values, self._s2.values, self._finite.values
+        count = b - a
+        complete = (fin[b] - fin[a]) == count
+        return s1[b] - s1[a], s2[b] - s2[a], count, complete, s2[b]
+
+    def count(self, start, end):
+        """Finite bars in each range."""
+        with self._lock:
+            a, b = self._bounds(start, end)
+            fin = self._finite.values
+            return self._out((fin[b] - fin[a]).astype(np.int64))
+
+    def sum(self, start, end):
+        with self._lock:
+            s1, _, count, complete, _ = self._sums(start, end)
+            return self._out(np.where(complete, s1 + count * (self._shift or 0.0), np.nan))
+
+    def mean(self, start, end):
+        with self._lock:
+            s1, _, count, complete, _ = self._sums(start, end)
+            return self._out(np.where(complete, s1 / count + (self._shift or 0.0), np.nan))
+
+    def var(self, start, end, ddof: int = 0):
+        with self._lock:
+            s1, s2, count, complete, scale = self._sums(start, end)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                spread = s2 - s1 * s1 / count
+                # Below the rounding error of the running square sums the spread is noise
+                spread = np.where(spread <= _NOISE * scale, 0.0, spread)
+                var = spread / (count - ddof)
+            return self._out(np.where(complete & (count > ddof), var, np.nan))
+
+    def std(self, start, end, ddof: int = 0):
+        return self._out(np.sqrt(np.asarray(self.var(start, end, ddof))))
+
+    def _extreme(self, levels: list, op, start, end):
+        with self._lock:
+            a, b = self._bounds(start, end)
+            a, b = np.atleast_1d(a), np.atleast_1d(b)
+            k = np.floor(np.log2(b - a)).astype(np.int64)
+            out = np.empty(len(a))
+            # One gather per distinct block size (at most log2(n) of them)
+            for level in np.unique(k):
+                rows = k == level
+                table = levels[level].values
+                out[rows] = op(table[a[rows]], table[b[rows] - (1 << level)])
+            out[np.isinf(out)] = np.nan
+            return out.item() if np.ndim(start) == 0 and np.ndim(end) == 0 else out
+
+    def max(self, start, end):
+        return self._extreme(self._max, np.fmax, start, end)
+
+    def min(self, start, end):
+        return self._extreme(self._min, np.fmin, start, end)
+
+    # --- Rolling windows over every bar ---
+
+    def _windows(self, length: int):
+        n = len(self)
+        end = np.arange(length, n + 1)
+        return end - length, end
+
+    def _rolling(self, query, length: int, *args) -> np.ndarray:
+        """query over the trailing `length` bars of every bar (NaN until a full window)."""
+        length = int(length)
+        if length < 1:
+            raise ValueError(f"Window length must be >= 1, got {length}")
+        out = np.full(len(self), np.nan)
+        if len(self) >= length:
+            start, end = self._windows(length)
+            out[length - 1:] = query(start, end, *args)
+        return out
+
+    def rolling_mean(self, length: int) -> np.ndarray:
+        return self._rolling(self.mean, length)
+
+    def rolling_std(self, length: int, ddof: int = 0) -> np.ndarray:
+        return self._rolling(self.std, length, ddof)
+
+    def rolling_max(self, length: int) -> np.ndarray:
+        return self._rolling(self.max, length)
+
+    def rolling_min(self, length: int) -> np.ndarray:
+        return self._rolling(self.min, length)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
@@ -9,6 +9,8 @@ from typing import List, Optional, Dict, Any
 
 from data_loader import DataLoader
 from indicators import Indicators
+from alignment import ALIGN_MODES, to_int64
+import wire
 
 app = FastAPI(title="AlgoResearch Lab API", description="Python Backend for React UI")
 
@@ -30,26 +32,117 @@ class DataRequest(BaseModel):
     timeframe: str
     source: str = 'auto'
 
+class DatasetRef(BaseModel):
+    # A dataset id returned by /api/v1/data, or the fetch itself
+    id: Optional[str] = None
+    ticker: Optional[str] = None
+    timeframe: Optional[str] = None
+    source: str = 'auto'
+    limit: int = 50000
+    to_timestamp: Optional[int] = None
+    align: str = 'inner'
+    # Bars to return (unix seconds, inclusive); the indicator still sees the history before them
+    range_from: Optional[int] = None
+    range_to: Optional[int] = None
+
 class IndicatorRequest(BaseModel):
-    data: List[Dict[str, Any]] # Passed as JSON records
+    data: List[Dict[str, Any]] = [] # Passed as JSON records (or see dataset)
+    # Computes on the server's cached bars instead of uploaded data
+    dataset: Optional[DatasetRef] = None
+    indicator: str
+    params: Dict[str, Any] = {}
+    # Output window (unix seconds, inclusive): only these bars are computed (plus warmup) and returned
+    window_from: Optional[int] = None
+    window_to: Optional[int] = None
+
+class SweepRequest(BaseModel):
+    data: List[Dict[str, Any]] = [] # Passed as JSON records (or see dataset)
+    dataset: Optional[DatasetRef] = None
     indicator: str
+    param: str = 'length'
+    values: List[Any]
     params: Dict[str, Any] = {}
 
+class IndicatorSpec(BaseModel):
+    indicator: str
+    params: Dict[str, Any] = {}
+
+class BatchIndicatorRequest(BaseModel):
+    data: List[Dict[str, Any]] = [] # Passed as JSON records (or see dataset)
+    dataset: Optional[DatasetRef] = None
+    indicators: List[IndicatorSpec]
+    parallel: bool = False
+
+def _negotiate(request: Request, fmt: Optional[str]) -> str:
+    """Response format from the `format` query parameter or the Accept header (see wire.py)."""
+    try:
+        return wire.negotiate(fmt, request.headers.get('accept'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _respond(fields: dict, data, fmt: str):
+    """fields plus data encoded as fmt: a JSON body, or a binary Response for typed arrays / Arrow."""
+    out = wire.encode(fields, data, fmt)
+    if isinstance(out, tuple):
+        body, media_type = out
+        return Response(content=body, media_type=media_type)
+    return out
+
+def _uploaded_frame(data: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Uploaded JSON records as a frame, OHLCV coerced to numbers."""
+    df = pd.DataFrame(data)
+    numeric_cols = ['open', 'high', 'low', 'close', 'volume']
+    for col in numeric_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def _dataset_frame(ref: DatasetRef) -> pd.DataFrame:
+    """The cached bars a dataset handle points at (404 when unknown or empty)."""
+    if ref.id:
+        params = loader.resolve_dataset(ref.id)
+        if params is None:
+            raise HTTPException(status_code=404, detail=f"Unknown dataset '{ref.id}', fetch it again from /api/v1/data")
+    elif ref.ticker and ref.timeframe:
+        if ref.align not in ALIGN_MODES:
+            raise HTTPException(status_code=400, detail=f"align must be one of {ALIGN_MODES}")
+        params = {'ticker': ref.ticker, 'timeframe': ref.timeframe, 'limit': ref.limit,
+                  'source': ref.source, 'to_timestamp': ref.to_timestamp, 'align': ref.align}
+    else:
+        raise HTTPException(status_code=400, detail="dataset needs an id or a ticker and timeframe")
+    df = loader.load_dataset(**params)
+    if df.empty:
+        raise HTTPException(status_code=404, detail="No data found")
+    return df
+
 @app.get("/")
 def health_check():
     return {"status": "ok", "service": "AlgoResearch Lab Backend"}
 
 @app.get("/api/v1/data")
-def get_data(ticker: str, timeframe: str, source: str = 'auto', limit: int = 50000, to_timestamp: Optional[int] = None):
+def get_data(request: Request, ticker: str, timeframe: str, source: str = 'auto', limit: int = 50000, to_timestamp: Optional[int] = None, align: str = 'inner',
+             fmt: Optional[str] = Query(None, alias='format')):
     """
     Fetch OHLC data for a ticker.
+    For synthetic formulas, `align` picks how components are joined:
+    'inner' (shared bars), 'ffill' (union, forward-filled) or 'asof' (first ticker's bars).
+    The response layout is negotiated (`format` or Accept, see wire.py): records
+    by default, or columns: JSON arrays, typed-array binary or Arrow IPC.
     """
+    if align not in ALIGN_MODES:
+        raise HTTPException(status_code=400, detail=f"align must be one of {ALIGN_MODES}")
+    fmt = _negotiate(request, fmt)
     try:
         print(f"Fetching data for {ticker} {timeframe} from {source} limit={limit} to={to_timestamp}")
-        df = loader.fetch_data(ticker, timeframe, source=source, limit=limit, to_timestamp=to_timestamp)
+        df = loader.fetch_data(ticker, timeframe, source=source, limit=limit, to_timestamp=to_timestamp, align=align)
         
         if df.empty:
             raise HTTPException(status_code=404, detail="No data found")
+
+        # Indicator requests can name this series by id instead of uploading it
+        dataset_id = loader.register_dataset(ticker, timeframe, limit=limit, source=source, to_timestamp=to_timestamp, align=align)
+        if fmt != wire.RECORDS:
+            return _respond({"ticker": ticker, "timeframe": timeframe, "dataset": dataset_id, "count": len(df)}, wire.frame_columns(df), fmt)
         
         # Reset index to make date/datetime a column
         df_reset = df.reset_index()
@@ -64,16 +157,40 @@ def get_data(ticker: str, timeframe: str, source: str = 'auto', limit: int = 500
         if not df_reset.empty and 'time' in df_reset.columns:
              # Check if it's already numeric or needs conversion
             if pd.api.types.is_datetime64_any_dtype(df_reset['time']):
-                df_reset['time'] = df_reset['time'].astype('int64') // 10**9
+                # to_int64 handles any datetime unit (pandas >= 2 may hold s/ms/us, not ns)
+                df_reset['time'] = to_int64(pd.DatetimeIndex(df_reset['time']), 's')
         
         # Convert to records
         data_json = df_reset.to_dict(orient='records')
-        return {"ticker": ticker, "timeframe": timeframe, "count": len(data_json), "data": data_json}
+        return {"ticker": ticker, "timeframe": timeframe, "dataset": dataset_id, "count": len(data_json), "data": data_json}
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/data/range")
+def get_range_stats(ticker: str, timeframe: str, range_from: Optional[int] = None, range_to: Optional[int] = None,
+                    columns: str = 'high,low,close', source: str = 'auto', limit: int = 50000, to_timestamp: Optional[int] = None):
+    """
+    min / max / mean / std / sum / count per column over the bars in
+    [range_from, range_to] (unix seconds, inclusive), e.g. for autoscaling the
+    visible range without shipping the bars. Served from the bar store's range indexes.
+    """
+    try:
+        stats = loader.range_stats(ticker, timeframe, range_from, range_to,
+                                   columns=[c.strip() for c in columns.split(',') if c.strip()],
+                                   limit=limit, source=source, to_timestamp=to_timestamp)
+        if stats is None:
+            raise HTTPException(status_code=404, detail="No data found")
+        return {"ticker": ticker, "timeframe": timeframe, **stats}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Range stats error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/v1/macro")
 def get_macro_data(ticker: str, limit: int = 5000):
     """
@@ -118,20 +235,31 @@ def get_macro_data(ticker: str, limit: int = 5000):
         print(f"Macro fetch error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/indicators")
+def list_indicators():
+    """
+    Available indicators with their parameter schemas.
+    Plugins are described from their source; none is imported to list them.
+    """
+    return {"indicators": list(indicator_engine.get_indicator_schemas().values())}
+
 @app.post("/api/v1/indicators")
-def calculate_indicator(req: IndicatorRequest):
+def calculate_indicator(req: IndicatorRequest, request: Request, fmt: Optional[str] = Query(None, alias='format')):
     """
-    Apply an indicator to the provided data.
+    Apply an indicator to the provided data, or to the server's cached bars
+    when `dataset` names them (an id from /api/v1/data, or ticker/timeframe).
+    The response layout is negotiated like /api/v1/data.
     """
+    fmt = _negotiate(request, fmt)
+    window_from, window_to = req.window_from, req.window_to
+    if req.dataset is not None:
+        df = _dataset_frame(req.dataset)
+        if window_from is None and window_to is None:
+            window_from, window_to = req.dataset.range_from, req.dataset.range_to
     try:
-        # Reconstruct DataFrame
-        df = pd.DataFrame(req.data)
-        
-        # Explicitly enforce numeric types to prevent calc errors
-        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+        if req.dataset is None:
+            # Reconstruct DataFrame, enforcing numeric types to prevent calc errors
+            df = _uploaded_frame(req.data)
         
         if 'time' in df.columns:
              # Use time as index if needed, or just keep it
@@ -171,7 +299,10 @@ def calculate_indicator(req: IndicatorRequest):
         # We need to know specific arguments for each indicator logic if they are positional, 
         # but apply_indicator usually takes **kwargs
         
-        df_result = indicator_engine.apply_indicator(df, req.indicator, **params)
+        if window_from is not None or window_to is not None:
+            df_result = indicator_engine.apply_window(df, req.indicator, window_from, window_to, **params)
+        else:
+            df_result = indicator_engine.apply_indicator(df, req.indicator, **params)
         
 
         
@@ -183,22 +314,20 @@ def calculate_indicator(req: IndicatorRequest):
             # Protocol 2.0 Structure
             if "meta" in df_result and "plots" in df_result:
                 print(f"Protocol 2.0 Response for {req.indicator}. Plots: {list(df_result['plots'].keys())}", flush=True)
-                return {
+                return _respond({
                      "indicator": req.indicator,
                      "protocol": "2.0",
                      "meta": df_result["meta"],
                      "plots": df_result["plots"],
-                     "data": df_result["data"]
-                }
+                }, df_result["data"], fmt)
             
             # Legacy Dict Fallback
-            return {
-                "indicator": req.indicator,
-                "data": df_result.get("data", [])
-            }
+            return _respond({"indicator": req.indicator}, df_result.get("data", []), fmt)
         
         # Legacy DataFrame Fallback (for non-migrated indicators)
         print(f"Legacy DataFrame Response for {req.indicator}", flush=True)
+        if fmt != wire.RECORDS:
+            return _respond({"indicator": req.indicator}, wire.frame_columns(df_result), fmt)
         
         # SANITIZE
         df_clean = df_result.astype(object)
@@ -225,6 +354,77 @@ def calculate_indicator(req: IndicatorRequest):
         
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/indicators/batch")
+def calculate_indicator_batch(req: BatchIndicatorRequest, request: Request, fmt: Optional[str] = Query(None, alias='format')):
+    """
+    Apply several indicators to one upload of data (or one dataset handle).
+    Shared primitives (EMAs, rolling means, RSI's diff/clip) are computed once.
+    Results are records or JSON columns (binary layouts fall back to JSON columns).
+    """
+    fmt = _negotiate(request, fmt)
+    if fmt not in (wire.RECORDS, wire.COLUMNS):
+        fmt = wire.COLUMNS
+    rows = None
+    if req.dataset is not None:
+        df = _dataset_frame(req.dataset)
+        if req.dataset.range_from is not None or req.dataset.range_to is not None:
+            # Computed over the whole history, only the range's rows are returned
+            times = df['time'].to_numpy()
+            first = int(np.searchsorted(times, req.dataset.range_from, side='left')) if req.dataset.range_from is not None else 0
+            last = int(np.searchsorted(times, req.dataset.range_to, side='right')) if req.dataset.range_to is not None else len(df)
+            rows = slice(first, last)
+    else:
+        df = _uploaded_frame(req.data)
+    if df.empty:
+        raise HTTPException(status_code=400, detail="Empty data provided")
+
+    try:
+        specs = [{"indicator": s.indicator, "params": s.params} for s in req.indicators]
+        results = indicator_engine.apply_batch(df, specs, max_workers=4 if req.parallel else None)
+    except Exception as e:
+        print(f"Batch indicator error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if rows is not None:
+        results = [indicator_engine.take_rows(res, rows) for res in results]
+
+    response = []
+    for spec, res in zip(req.indicators, results):
+        if isinstance(res, dict) and "error" in res:
+            response.append({"indicator": spec.indicator, "error": res["error"]})
+        elif isinstance(res, dict) and "meta" in res and "plots" in res:
+            response.append(wire.encode({
+                "indicator": spec.indicator,
+                "protocol": "2.0",
+                "meta": res["meta"],
+                "plots": res["plots"],
+            }, res["data"], fmt))
+        elif isinstance(res, dict):
+            response.append(wire.encode({"indicator": spec.indicator}, res.get("data", []), fmt))
+        elif fmt == wire.COLUMNS:
+            response.append(wire.encode({"indicator": spec.indicator}, wire.frame_columns(res), fmt))
+        else:
+            # Legacy DataFrame result
+            df_clean = res.astype(object).replace([float('inf'), float('-inf'), np.nan], None)
+            response.append({"indicator": spec.indicator, "data": df_clean.to_dict(orient='records')})
+    return {"results": response}
+
+@app.post("/api/v1/indicators/sweep")
+def calculate_indicator_sweep(req: SweepRequest, request: Request, fmt: Optional[str] = Query(None, alias='format')):
+    """
+    Parameter optimisation: one indicator for every value of `param`, returned as
+    one column per value. SMA/EMA/RSI length sweeps share their work across lengths.
+    """
+    fmt = _negotiate(request, fmt)
+    df = _dataset_frame(req.dataset) if req.dataset is not None else _uploaded_frame(req.data)
+    if df.empty:
+        raise HTTPException(status_code=400, detail="Empty data provided")
+    result = indicator_engine.apply_sweep(df, req.indicator, req.param, req.values, **req.params)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return _respond({"indicator": req.indicator, "protocol": "2.0", "meta": result["meta"], "plots": result["plots"]},
+                    result["data"], fmt)
+
 from backtester import Backtester
 
 # ... existing code ...
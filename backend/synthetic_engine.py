@@ -1,93 +1,168 @@
 import pandas as pd
 import re
 import numpy as np
+import threading
+from collections import OrderedDict
+
+from alignment import align_frames
+import tv
+
+
+def _window(n) -> int:
+    n = int(n)
+    if n < 1:
+        raise ValueError(f"Window length must be >= 1, got {n}")
+    return n
+
+
+def _rebase(x, base=100.0):
+    """Scales a series so its first valid value equals `base`."""
+    first = x.dropna()
+    if first.empty:
+        return x * np.nan
+    return x / first.iloc[0] * base
+
+
+def _zscore(x, n):
+    n = _window(n)
+    return (x - tv.SMA(x, n)) / x.rolling(window=n).std()
+
+
+# Functions callable inside synthetic formulas. Each works on whole aligned
+# Series (one call per OHLCV column), so e.g. "zscore(BTC/USDT / ETH/USDT, 50)"
+# is computed server-side and only the finished series is sent to the client.
+FORMULA_FUNCTIONS = {
+    # Elementwise
+    'log': np.log,
+    'log10': np.log10,
+    'exp': np.exp,
+    'sqrt': np.sqrt,
+    'abs': np.abs,
+    'sign': np.sign,
+    'min': np.minimum,
+    'max': np.maximum,
+    # Windowed
+    'sma': lambda x, n: tv.SMA(x, _window(n)),
+    'ema': lambda x, n: tv.EMA(x, _window(n)),
+    'std': lambda x, n: x.rolling(window=_window(n)).std(),
+    'zscore': _zscore,
+    'shift': lambda x, n=1: x.shift(int(n)),
+    'diff': lambda x, n=1: x.diff(int(n)),
+    'roc': lambda x, n=1: x.pct_change(int(n), fill_method=None) * 100,
+    'rebase': _rebase,
+    'cumsum': lambda x: x.cumsum(),
+}
+
+# Functions whose value at a bar depends on earlier bars
+WINDOW_FUNCTIONS = {'sma', 'ema', 'std', 'zscore', 'shift', 'diff', 'roc', 'rebase', 'cumsum'}
 
 class SyntheticEngine:
-    def __init__(self):
-        pass
+    def __init__(self, max_materialized: int = 64):
+        # Materialized results: (normalized formula, *context) -> {'stamps': {ticker: version}, 'result': df}
+        self._materialized = OrderedDict()
+        self._max_materialized = max_materialized
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_formula(formula: str) -> str:
+        """Collapses whitespace so cosmetic variants of a formula share one cache slot."""
+        return ' '.join(formula.split())
+
+    # Numbers (with exponents) are matched before tickers and must end at a
+    # separator, so 1e-5 stays whole while 1INCH/USDT is a ticker. A '/' joins
+    # pair parts (BTC/USDT) only between two parts; next to ')' or before a
+    # number it is division, as in (BTC/USDT+ETH/USDT)/2.
+    _TOKEN_RE = re.compile(
+        r'(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?(?![^\s+\-*/(),]))'
+        r'|(?P<ticker>[^\s+\-*/(),]+(?:/(?![\d.])[^\s+\-*/(),]+)*)'
+        r'|(?P<op>[+\-*/(),])'
+    )
+
+    def _tokenize(self, formula: str) -> list:
+        """
+        Splits a formula into (kind, text) tokens.
+        kind: 'ticker', 'func' (known function name followed by '('), 'number', 'op'.
+        """
+        raw = [(m.lastgroup, m.group()) for m in self._TOKEN_RE.finditer(formula)]
+        tokens = []
+        for i, (kind, t) in enumerate(raw):
+            if kind != 'ticker':
+                tokens.append((kind, t))
+                continue
+            next_tok = raw[i + 1][1] if i + 1 < len(raw) else None
+            if next_tok == '(' and t.lower() in FORMULA_FUNCTIONS:
+                tokens.append(('func', t.lower()))
+            else:
+                tokens.append(('ticker', t))
+        return tokens
 
     def extract_tickers(self, formula: str) -> list:
         """
         Extracts valid tickers from a formula string.
         Assumes tickers are alphanumeric strings, possibly with / for pairs.
         
-        Regex matches:
         - Words that start with a letter.
         - Can contain numbers (BTC2) or special chars like / (BTC/USDT).
-        - Excludes pure numbers and operators.
-        """
-        # Split by spaces and operators +, -, *, (, )
-        # Removed / from split to preserve pairs like BTC/USDT
-        tokens = re.split(r'[\s\+\-\*\(\)]+', formula)
-        tickers = []
-        for t in tokens:
-            t = t.strip()
-            if not t: continue
-            
-            # Skip pure operators or numbers
-            if t in ['/', '+', '-', '*', '(', ')']:
-                continue
-                
-            try:
-                float(t)
-                continue
-            except ValueError:
-                pass
-                
-            tickers.append(t)
-        
-        return list(set(tickers)) # Unique tickers
+        - Excludes pure numbers, operators and function names (log(...), sma(..., 20)).
+        """
+        tickers = [text for kind, text in self._tokenize(formula) if kind == 'ticker']
+        return list(dict.fromkeys(tickers)) # Unique tickers, in formula order (first one is the as-of base)
 
-    def align_data(self, data_map: dict) -> pd.DataFrame:
+    def uses_window_functions(self, formula: str) -> bool:
+        """True if the formula calls a function whose output depends on earlier bars."""
+        return any(kind == 'func' and text in WINDOW_FUNCTIONS for kind, text in self._tokenize(formula))
+
+    def _compile(self, formula: str, tickers: list):
         """
-        Aligns multiple DataFrames on their Index (datetime).
-        Uses inner join (intersection) to ensure validity of math operations.
-        Returns a single DataFrame with MultiIndex columns or suffixed columns?
-        
-        Approach: 
-        1. Create a master DataFrame with aligned index.
-        2. Renames columns to {ticker}_{col}.
-        
-        Actually, we need to perform vector math on specific columns (Open, High, Low, Close).
-        We will return a dict of aligned DataFrames or a big DF.
-        Let's return a dict of aligned DataFrames.
+        Rewrites tickers to safe variable names (token by token, so ETH never
+        clobbers ETHW) and compiles the expression once for all columns.
+        Returns (code, {ticker: var_name}).
+        """
+        var_names = {ticker: f"__VAR_{i}__" for i, ticker in enumerate(tickers)}
+        parts = []
+        for kind, text in self._tokenize(formula):
+            if kind == 'ticker':
+                if text not in var_names:
+                    raise ValueError(f"No data for '{text}'")
+                parts.append(var_names[text])
+            else:
+                parts.append(text)
+        return compile(' '.join(parts), '<formula>', 'eval'), var_names
+
+    def align_data(self, data_map: dict, how: str = 'inner') -> dict:
+        """
+        Aligns multiple DataFrames on their (datetime) index.
+        Returns a dict of aligned DataFrames sharing one index.
+
+        how:
+          'inner' - bars present in every component (safe default for same-calendar pairs).
+          'ffill' - union of all bars, each component forward-filled (crypto vs equities).
+          'asof'  - the first component's bars, others taken as-of backward (crypto vs macro).
+
+        Timestamps are merge-joined as sorted int64 arrays (see alignment.py),
+        duplicates keep their first occurrence.
         """
         if not data_map:
             return {}
 
-        # 1. Align indices
-        # pd.concat with join='inner' on axis=1 is the easiest way to align indices
-        # But we need to keep them separable.
-        
-        dfs = list(data_map.values())
-        keys = list(data_map.keys())
-        
-        if len(dfs) == 1:
+        if len(data_map) == 1 and how == 'inner':
             return data_map
-            
-        # Rename columns temporarily to avoid collision during concat alignment
-        aligned_df = pd.concat([df[~df.index.duplicated(keep='first')] for df in dfs], axis=1, join='inner', keys=keys)
-        
-        # Now split back
-        result = {}
-        for key in keys:
-            result[key] = aligned_df[key].copy()
-            
-        return result
 
-    def calculate(self, formula: str, data_map: dict) -> pd.DataFrame:
+        return align_frames(data_map, how=how)
+
+    def calculate(self, formula: str, data_map: dict, how: str = 'inner') -> pd.DataFrame:
         """
         Evaluates the formula for OHLCV columns.
         
         formula: "BTC/USDT / ETH/USDT"
-        data_map: { "BTC/USDT": df1, "ETH/USDT": df2 } (Must be aligned!)
+        data_map: { "BTC/USDT": df1, "ETH/USDT": df2 } (aligned here with `how`)
         """
         # 0. Validate Data
         if not data_map:
             return pd.DataFrame()
             
         # 1. Align Data (Crucial Step)
-        aligned_map = self.align_data(data_map)
+        aligned_map = self.align_data(data_map, how=how)
         
         if not aligned_map: # Intersection empty
             return pd.DataFrame()
@@ -100,74 +175,30 @@ class SyntheticEngine:
         result = pd.DataFrame(index=idx)
         
         # 4. Calculate for each column type
-        # Strategy: Reconstruct the formula replacing Ticker with "aligned_map['Ticker']['col']"
-        # and use pd.eval or eval() with specific locals.
+        # Tickers are rewritten to safe variable names once; the compiled expression is then
+        # evaluated per column on aligned Series, with only FORMULA_FUNCTIONS in scope.
+        try:
+            code, var_names = self._compile(formula, list(aligned_map.keys()))
+        except Exception as e:
+            print(f"Error parsing formula {formula}: {e}")
+            return pd.DataFrame()
         
         cols_to_calc = ['open', 'high', 'low', 'close', 'volume']
         
         for col in cols_to_calc:
-            # Prepare eval context
-            eval_context = {}
-            safe_formula = formula
-            
-            for ticker, df in aligned_map.items():
-                if col in df.columns:
-                    # Create a valid python variable name for this ticker data
-                    # e.g. "VAR_0", "VAR_1"
-                    # We map Ticker string in formula to this VAR name
-                    
-                    # We need a robust string replacement that doesn't replace substrings incorrectly
-                    # e.g. replacing "ETH" in "ETHBTC" if we aren't careful.
-                    # Use unique placeholders.
-                    pass
-            
-            # Better approach for eval parsing:
-            # 1. Sort tickers by length descending to avoid substring collision (e.g. ETHW vs ETH)
-            sorted_tickers = sorted(aligned_map.keys(), key=len, reverse=True)
-            
-            # 2. Create a mapping ticker -> series
-            # But we can't just pass dict to eval for complex keys like "BTC/USDT".
-            # We must replace keys in formula with safe variable names.
-            
-            var_map = {}
-            processed_formula = formula
-            
-            for i, ticker in enumerate(sorted_tickers):
+            var_map = dict(FORMULA_FUNCTIONS)
+            for ticker, var_name in var_names.items():
                 if col not in aligned_map[ticker].columns:
                     # Fill missing col with 0 or NaN?
                     # If volume missing, 0. If price, NaN?
                     val = 0 if col == 'volume' else np.nan
-                    series = pd.Series(val, index=idx)
+                    var_map[var_name] = pd.Series(val, index=idx)
                 else:
-                    series = aligned_map[ticker][col]
-                
-                var_name = f"__VAR_{i}__"
-                var_map[var_name] = series
-                
-                # Replace in formula
-                # Use regex to ensure we replace exact words if possible, 
-                # but tickers can contain symbols.
-                # Since we sorted by length, direct replace is generally safe 
-                # provided we escape regex chars in ticker if needed.
-                
-                escaped_ticker = re.escape(ticker)
-                # Ensure we don't replace inside other vars (vars use underscores, tickers might not)
-                # But we are replacing FROM the original formula string incrementally? No, that breaks.
-                # Must tokenize? 
-                
-                # Simpler: Use a tokenizer that respects the boundaries logic from extract_tickers
-                # Or just simple replace if we assume user spaces?
-                # Let's try simple replace for MVP, assuming standard formatting.
-                # Ideally, we tokenized earlier.
-                
-                processed_formula = processed_formula.replace(ticker, var_name)
+                    var_map[var_name] = aligned_map[ticker][col]
             
             try:
                 # 5. Evaluate
-                # We use pd.eval or native eval? 
-                # pd.eval is dangerous? native eval on Series works well for vector math.
-                # Limit globals to safe math functions if needed.
-                res_series = eval(processed_formula, {"__builtins__": None}, var_map)
+                res_series = eval(code, {"__builtins__": None}, var_map)
                 result[col] = res_series
             except Exception as e:
                 print(f"Error calculating {col} for {formula}: {e}")
@@ -177,3 +208,89 @@ class SyntheticEngine:
         # 5. Clean up
         result.dropna(how='all', inplace=True)
         return result
+
+    def calculate_materialized(self, formula: str, entries: dict, context: tuple = (), how: str = 'inner') -> pd.DataFrame:
+        """
+        Cached calculate().
+
+        entries: { "BTC/USDT": BarEntry, ... } as returned by the bar store.
+        The result is keyed by the normalized formula plus context and stamped with the
+        version of every component. It is reused while all stamps match; when components
+        only changed in their tail, just that tail is recomputed and spliced on.
+        """
+        key = (self.normalize_formula(formula), how) + tuple(context)
+        stamps = {ticker: entry.version for ticker, entry in entries.items()}
+        starts = {ticker: entry.df.index[0] for ticker, entry in entries.items()}
+
+        with self._lock:
+            cached = self._materialized.get(key)
+            if cached is not None:
+                self._materialized.move_to_end(key)
+
+        if cached is not None and cached['stamps'] == stamps:
+            return cached['result'].copy()
+
+        data_map = {ticker: entry.df for ticker, entry in entries.items()}
+        result = None
+        if cached is not None:
+            # Window functions (sma, ema, shift, ...) look back past the cut, so they always recompute
+            cut = None if self.uses_window_functions(formula) else self._tail_cut(cached['stamps'], entries)
+            # Outside inner joins, early rows depend on every component's head, so a moved head means a full recompute
+            if cut is not None and (how == 'inner' or cached['starts'] == starts):
+                result = self._extend_tail(formula, data_map, cached['result'], cut, how)
+
+        if result is None:
+            result = self.calculate(formula, data_map, how=how)
+
+        if not result.empty:
+            with self._lock:
+                self._materialized[key] = {'stamps': stamps, 'starts': starts, 'result': result}
+                self._materialized.move_to_end(key)
+                while len(self._materialized) > self._max_materialized:
+                    self._materialized.popitem(last=False)
+
+        return result.copy()
+
+    def _tail_cut(self, cached_stamps: dict, entries: dict):
+        """
+        Returns the earliest timestamp from which the cached result is stale, or None
+        if any component changed in a way that is not a tail update of the cached version.
+        """
+        if set(cached_stamps) != set(entries):
+            return None
+
+        cuts = []
+        for ticker, entry in entries.items():
+            cached_version = cached_stamps[ticker]
+            if entry.version == cached_version:
+                continue
+            if entry.prev_version == cached_version and entry.changed_from is not None:
+                cuts.append(entry.changed_from)
+            else:
+                return None
+        return min(cuts) if cuts else None
+
+    def _extend_tail(self, formula: str, data_map: dict, cached: pd.DataFrame, cut, how: str = 'inner') -> pd.DataFrame:
+        """
+        Recomputes the formula from `cut` onwards and splices it onto the cached head.
+        Valid because the formula is evaluated row by row on aligned bars; for the
+        forward-filling modes each component keeps its last bar before `cut`.
+        """
+        if how == 'inner':
+            start = max(df.index[0] for df in data_map.values())
+        else:
+            start = cached.index[0] if not cached.empty else cut
+        head = cached[(cached.index >= start) & (cached.index < cut)]
+
+        tail_map = {}
+        for ticker, df in data_map.items():
+            first = df.index.searchsorted(cut)
+            if how != 'inner':
+                first = max(first - 1, 0)
+            tail_map[ticker] = df.iloc[first:]
+
+        tail = self.calculate(formula, tail_map, how=how)
+        tail = tail[tail.index >= cut]
+        if tail.empty:
+            return head
+        return pd.concat([head, tail])
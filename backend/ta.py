@@ -0,0 +1,339 @@
+"""
+Pine Script `ta.*` built-ins, vectorized.
+
+Each function follows the semantics of its Pine namesake: the value on bar i only
+uses bars <= i, windows that are not full yet are NaN (Pine's na), and boolean
+results are False where an input is NaN. Nothing loops over bars in Python:
+recursive or "since last event" logic is expressed with cumulative maxima,
+rolling extrema with a sparse table built in log2(length) vectorized passes.
+
+Sources may be Series (results keep their index) or array-likes (results are
+ndarrays). verify_ta.py checks every function against per-bar references
+written straight from the Pine definitions.
+"""
+import numpy as np
+import pandas as pd
+
+import kernels
+
+
+def _wrap(values: np.ndarray, source) -> pd.Series:
+    """Puts a result back onto the source's index when the source is a Series."""
+    if isinstance(source, pd.Series):
+        return pd.Series(values, index=source.index, name=source.name)
+    return values
+
+
+def _pair(a, b):
+    """Two sources (either may be a scalar) as float64 arrays of the same length."""
+    a_arr = np.atleast_1d(kernels.as_array(a))
+    b_arr = np.atleast_1d(kernels.as_array(b))
+    a_arr, b_arr = np.broadcast_arrays(a_arr, b_arr)
+    return a_arr, b_arr, a if isinstance(a, pd.Series) else b
+
+
+def _shift(x: np.ndarray, periods: int) -> np.ndarray:
+    """x[periods] in Pine terms: the value `periods` bars back (NaN before the first bar)."""
+    out = np.full(len(x), np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+
+def _bool(x) -> np.ndarray:
+    """Pine conditions: NaN counts as false."""
+    x = np.asarray(x)
+    if x.dtype == bool:
+        return x
+    x = kernels.as_array(x)
+    return np.nan_to_num(x, nan=0.0) != 0
+
+
+# --- Rolling extrema (sparse table) ---
+
+def _sparse_level(x: np.ndarray, length: int, pick):
+    """
+    One level of a sparse table: table[i] = pick over x-positions [i, i + 2**k) with
+    2**k the largest power of two <= length, built by doubling in k vectorized passes.
+    pick(a, b) combines an earlier block a with the later block b.
+    """
+    table = x
+    span = 1
+    while span * 2 <= length:
+        table = np.concatenate([pick(table[:len(table) - span], table[span:]), table[len(table) - span:]])
+        span *= 2
+    return table, span
+
+
+def _rolling_extreme(x, length: int, op, fill: float) -> np.ndarray:
+    """op (np.fmax / np.fmin) over the last `length` bars; na bars are skipped, all-na windows are NaN."""
+    x = kernels.as_array(x)
+    length = kernels._window(length)
+    out = np.full(len(x), np.nan)
+    if len(x) < length:
+        return out
+    values = np.where(np.isnan(x), fill, x)
+    table, span = _sparse_level(values, length, op)
+    end = np.arange(length - 1, len(x))
+    # Two overlapping power-of-two blocks cover [end - length + 1, end]
+    out[length - 1:] = op(table[end - length + 1], table[end - span + 1])
+    out[out == fill] = np.nan
+    return out
+
+
+def _rolling_extreme_bars(x, length: int, better) -> np.ndarray:
+    """Offset (<= 0) to the extreme bar of the last `length` bars; the most recent one on ties."""
+    x = kernels.as_array(x)
+    length = kernels._window(length)
+    out = np.full(len(x), np.nan)
+    if len(x) < length:
+        return out
+    fill = -np.inf if better is np.greater else np.inf
+    values = np.where(np.isnan(x), fill, x)
+
+    def pick(a, b):
+        # the later block wins ties
+        return np.where(better(values[a], values[b]), a, b)
+
+    table, span = _sparse_level(np.arange(len(x)), length, pick)
+    end = np.arange(length - 1, len(x))
+    best = pick(table[end - length + 1], table[end - span + 1])
+    offsets = (best - end).astype('float64')
+    offsets[values[best] == fill] = np.nan
+    out[length - 1:] = offsets
+    return out
+
+
+def highest(source, length: int):
+    """ta.highest: highest value of the last `length` bars."""
+    return _wrap(_rolling_extreme(source, length, np.fmax, -np.inf), source)
+
+
+def lowest(source, length: int):
+    """ta.lowest: lowest value of the last `length` bars."""
+    return _wrap(_rolling_extreme(source, length, np.fmin, np.inf), source)
+
+
+def highestbars(source, length: int):
+    """ta.highestbars: offset to the highest bar of the last `length` bars (0 = current, negative = older)."""
+    return _wrap(_rolling_extreme_bars(source, length, np.greater), source)
+
+
+def lowestbars(source, length: int):
+    """ta.lowestbars: offset to the lowest bar of the last `length` bars."""
+    return _wrap(_rolling_extreme_bars(source, length, np.less), source)
+
+
+# --- Differences and sums ---
+
+def change(source, length: int = 1):
+    """ta.change: source - source[length]."""
+    x = kernels.as_array(source)
+    return _wrap(x - _shift(x, int(length)), source)
+
+
+def mom(source, length: int):
+    """ta.mom: momentum, the same as ta.change."""
+    return change(source, length)
+
+
+def roc(source, length: int):
+    """ta.roc: 100 * (source - source[length]) / source[length]."""
+    x = kernels.as_array(source)
+    prev = _shift(x, int(length))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _wrap(100 * (x - prev) / prev, source)
+
+
+def cum(source):
+    """ta.cum: running total (na bars add nothing)."""
+    return _wrap(np.nancumsum(kernels.as_array(source)), source)
+
+
+def rising(source, length: int):
+    """ta.rising: source is above each of its previous `length` values."""
+    x = kernels.as_array(source)
+    prior = _shift(_rolling_extreme(x, length, np.fmax, -np.inf), 1)
+    with np.errstate(invalid='ignore'):
+        return _wrap(x > prior, source)
+
+
+def falling(source, length: int):
+    """ta.falling: source is below each of its previous `length` values."""
+    x = kernels.as_array(source)
+    prior = _shift(_rolling_extreme(x, length, np.fmin, np.inf), 1)
+    with np.errstate(invalid='ignore'):
+        return _wrap(x < prior, source)
+
+
+# --- Moving averages and dispersion ---
+
+def sma(source, length: int):
+    """ta.sma"""
+    return _wrap(kernels.sma(source, length), source)
+
+
+def ema(source, length: int):
+    """ta.ema: alpha = 2 / (length + 1), seeded with the first value."""
+    return _wrap(kernels.ema(source, length), source)
+
+
+def rma(source, length: int):
+    """
+    ta.rma: alpha = 1 / length, seeded with the SMA of the first `length` values
+    (na before it), as Pine does (kernels.rma seeds with the first value instead).
+    """
+    x = kernels.as_array(source)
+    length = kernels._window(length)
+    out = np.full(len(x), np.nan)
+    seed = kernels.sma(x, length)
+    valid = np.flatnonzero(np.isfinite(seed))
+    if len(valid):
+        start = valid[0]
+        tail = x[start:].copy()
+        tail[0] = seed[start]
+        out[start:] = kernels.ema(tail, alpha=1 / length)
+    return _wrap(out, source)
+
+
+def wma(source, length: int):
+    """ta.wma: linearly weighted average, the current bar weighted `length`."""
+    x = kernels.as_array(source)
+    length = kernels._window(length)
+    out = np.full(len(x), np.nan)
+    if len(x) >= length:
+        weights = np.arange(1, length + 1, dtype='float64')
+        out[length - 1:] = np.convolve(x, weights[::-1], mode='valid') / weights.sum()
+    return _wrap(out, source)
+
+
+def _variance(source, length: int, biased: bool) -> np.ndarray:
+    x = kernels.as_array(source)
+    var = kernels.rolling_var(x, length, ddof=0 if biased else 1)
+    # The running sums leave ~1e-16 relative residue on flat windows; Pine's
+    # stdev snaps such near-zero deviations to exactly 0
+    mean = kernels.sma(x, length)
+    with np.errstate(invalid='ignore'):
+        return np.where(var <= 1e-14 * mean * mean, 0.0, var)
+
+
+def variance(source, length: int, biased: bool = True):
+    """ta.variance: population variance by default (biased=False divides by length - 1)."""
+    return _wrap(_variance(source, length, biased), source)
+
+
+def stdev(source, length: int, biased: bool = True):
+    """ta.stdev: population standard deviation by default."""
+    return _wrap(np.sqrt(_variance(source, length, biased)), source)
+
+
+def rsi(source, length: int):
+    """ta.rsi with Pine's RMA seeding; 100 when there were no losses, 0 when there were no gains."""
+    x = kernels.as_array(source)
+    delta = x - _shift(x, 1)
+    up = rma(np.maximum(delta, 0), length)
+    down = rma(np.maximum(-delta, 0), length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = 100 - 100 / (1 + up / down)
+    out = np.where(down == 0, 100.0, np.where(up == 0, 0.0, out))
+    out[np.isnan(up) | np.isnan(down)] = np.nan
+    return _wrap(out, source)
+
+
+def tr(high, low, close, handle_na: bool = False):
+    """
+    ta.tr: max(high - low, |high - close[1]|, |low - close[1]|). Where close[1] is
+    na the result is na, or high - low with handle_na.
+    """
+    h, l, c = kernels.as_array(high), kernels.as_array(low), kernels.as_array(close)
+    prev = _shift(c, 1)
+    out = np.maximum(h - l, np.maximum(np.abs(h - prev), np.abs(l - prev)))
+    if handle_na:
+        out = np.where(np.isnan(prev), h - l, out)
+    return _wrap(out, high)
+
+
+def atr(high, low, close, length: int):
+    """ta.atr: RMA of the true range (ta.tr(true))."""
+    return _wrap(kernels.as_array(rma(tr(high, low, close, handle_na=True), length)), high)
+
+
+# --- Crosses and events ---
+
+def crossover(a, b):
+    """ta.crossover: a is above b on this bar and was below it on the previous one."""
+    x, y, source = _pair(a, b)
+    with np.errstate(invalid='ignore'):
+        out = (x > y) & (_shift(x, 1) < _shift(y, 1))
+    return _wrap(out, source)
+
+
+def crossunder(a, b):
+    """ta.crossunder: a is below b on this bar and was above it on the previous one."""
+    x, y, source = _pair(a, b)
+    with np.errstate(invalid='ignore'):
+        out = (x < y) & (_shift(x, 1) > _shift(y, 1))
+    return _wrap(out, source)
+
+
+def cross(a, b):
+    """ta.cross: either of the above."""
+    x, y, source = _pair(a, b)
+    return _wrap(np.asarray(crossover(x, y)) | np.asarray(crossunder(x, y)), source)
+
+
+def barssince(condition):
+    """ta.barssince: bars since the condition was last true (0 on a true bar, NaN before the first)."""
+    cond = _bool(condition)
+    bars = np.arange(len(cond))
+    last = np.maximum.accumulate(np.where(cond, bars, -1)) if len(cond) else bars
+    out = (bars - last).astype('float64')
+    out[last < 0] = np.nan
+    return _wrap(out, condition)
+
+
+def valuewhen(condition, source, occurrence: int = 0):
+    """ta.valuewhen: source on the bar where the condition was true, `occurrence` trues back (0 = the latest)."""
+    cond = _bool(condition)
+    x = kernels.as_array(source)
+    hits = np.flatnonzero(cond)
+    k = np.cumsum(cond) - 1 - int(occurrence)
+    out = np.full(len(cond), np.nan)
+    ok = k >= 0
+    out[ok] = x[hits[k[ok]]]
+    return _wrap(out, source)
+
+
+def _pivot(source, left: int, right: int, op, fill: float, beats) -> np.ndarray:
+    """
+    Value of the pivot bar, reported `right` bars after it (when it is confirmed):
+    the bar beats each of the `left` bars before it strictly and is at least
+    level with each of the `right` bars after it.
+    """
+    x = kernels.as_array(source)
+    left, right = int(left), int(right)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n < left + right + 1:
+        return out
+    pivot = x[left:n - right]
+    ok = ~np.isnan(pivot)
+    with np.errstate(invalid='ignore'):
+        if left:
+            before = _rolling_extreme(x, left, op, fill)[left - 1:n - right - 1]
+            ok &= beats(pivot, before) | np.isnan(before)
+        if right:
+            after = _rolling_extreme(x, right, op, fill)[left + right:]
+            ok &= ~beats(after, pivot)
+    out[left + right:] = np.where(ok, pivot, np.nan)
+    return out
+
+
+def pivothigh(source, leftbars: int, rightbars: int):
+    """ta.pivothigh: the pivot high's value on the bar that confirms it, else NaN."""
+    return _wrap(_pivot(source, leftbars, rightbars, np.fmax, -np.inf, np.greater), source)
+
+
+def pivotlow(source, leftbars: int, rightbars: int):
+    """ta.pivotlow: the pivot low's value on the bar that confirms it, else NaN."""
+    return _wrap(_pivot(source, leftbars, rightbars, np.fmin, np.inf, np.less), source)
@@ -0,0 +1,177 @@
+"""
+Backend dispatch for indicator primitives.
+
+SMA, EMA, RSI, MACD, BBANDS and STDDEV run on the native kernels (kernels.py).
+TA-Lib's C kernels are opt-in: INDICATOR_BACKEND=talib (or auto: TA-Lib when
+installed) or set_backend('talib'). Installing TA-Lib alone changes nothing.
+
+TA-Lib seeds its EMA-family recursions (EMA, RSI, MACD) with an SMA of the
+first bars, where the native kernels start from the first value, so early
+bars differ until the seed has decayed; see verify_ta_backend.py for the
+per-function deviation. That is why it is not the default. With TA-Lib
+selected, inputs with gaps (NaN/inf) still use the native kernels, since
+TA-Lib propagates a NaN to every later bar; a warning says so the first time.
+"""
+import math
+import os
+
+import numpy as np
+
+import kernels
+
+try:
+    import talib
+except ImportError:
+    talib = None
+
+BACKEND_ENV = 'INDICATOR_BACKEND'
+BACKENDS = ('auto', 'native', 'talib')
+
+
+DEFAULT_BACKEND = 'native'
+
+
+def resolve_backend(name: str = None) -> str:
+    """
+    None -> $INDICATOR_BACKEND, else native. 'auto' -> TA-Lib when installed;
+    'talib' without TA-Lib falls back to native.
+    """
+    name = (name or os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown indicator backend '{name}'. Use one of {BACKENDS}.")
+    if name == 'auto':
+        return 'talib' if talib is not None else 'native'
+    if name == 'talib' and talib is None:
+        print("Warning: TA-Lib not found. Using native indicator kernels.")
+        return 'native'
+    return name
+
+
+_backend = resolve_backend()
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(name: str = None) -> str:
+    """Switches the backend at runtime (None re-reads the environment). Returns the active one."""
+    global _backend
+    _backend = resolve_backend(name)
+    return _backend
+
+
+_warned_gaps = False
+
+
+def _use_talib(x: np.ndarray) -> bool:
+    global _warned_gaps
+    if _backend != 'talib' or len(x) == 0:
+        return False
+    if np.isfinite(x).all():
+        return True
+    if not _warned_gaps:
+        _warned_gaps = True
+        print("Warning: input with gaps runs on the native kernels (TA-Lib would propagate the NaN)."
+              " Such results use native seeding.")
+    return False
+
+
+NATIVE = {
+    'SMA': kernels.sma,
+    'EMA': lambda x, n: kernels.ema(x, n),
+    'RSI': kernels.rsi,
+    'MACD': kernels.macd,
+    'BBANDS': kernels.bollinger,
+    'STDDEV': kernels.rolling_std,
+}
+
+
+# --- TA-Lib adapters (same signatures and outputs as the native ones) ---
+
+def _sample_scale(n: int) -> float:
+    # TA-Lib's deviation is the population one; rescale to the sample (ddof=1) deviation
+    return math.sqrt(n / (n - 1)) if n > 1 else float('nan')
+
+
+def _talib_bbands(x, n, mult):
+    upper, basis, lower = talib.BBANDS(x, timeperiod=n, nbdevup=mult * _sample_scale(n), nbdevdn=mult * _sample_scale(n), matype=0)
+    return upper, lower, basis
+
+
+TALIB = {
+    'SMA': lambda x, n: talib.SMA(x, timeperiod=n),
+    'EMA': lambda x, n: talib.EMA(x, timeperiod=n),
+    'RSI': lambda x, n: talib.RSI(x, timeperiod=n),
+    'MACD': lambda x, fast, slow, signal: talib.MACD(x, fastperiod=fast, slowperiod=slow, signalperiod=signal),
+    'BBANDS': _talib_bbands,
+    'STDDEV': lambda x, n: talib.STDDEV(x, timeperiod=n, nbdev=_sample_scale(n)),
+}
+
+
+def call(name: str, x, *args):
+    """Runs primitive `name` on the active backend (native for gapped input)."""
+    x = kernels.as_array(x)
+    if _use_talib(x):
+        return TALIB[name](x, *args)
+    return NATIVE[name](x, *args)
+
+
+def SMA(x, n: int) -> np.ndarray:
+    return call('SMA', x, int(n))
+
+
+def EMA(x, n: int) -> np.ndarray:
+    return call('EMA', x, int(n))
+
+
+def RSI(x, n: int) -> np.ndarray:
+    return call('RSI', x, int(n))
+
+
+def MACD(x, fast: int, slow: int, signal: int):
+    """Returns (macd, signal, hist)."""
+    return call('MACD', x, int(fast), int(slow), int(signal))
+
+
+def BBANDS(x, n: int, mult: float):
+    """Returns (upper, lower, basis)."""
+    return call('BBANDS', x, int(n), float(mult))
+
+
+def STDDEV(x, n: int) -> np.ndarray:
+    """Rolling sample standard deviation."""
+    return call('STDDEV', x, int(n))
+
+
+# --- Parameter sweeps: one row per length, shape (len(lengths), len(x)) ---
+
+NATIVE_SWEEPS = {
+    'SMA': kernels.sma_sweep,
+    'EMA': kernels.ema_sweep,
+    'RSI': kernels.rsi_sweep,
+}
+
+
+def sweep(name: str, x, lengths) -> np.ndarray:
+    """
+    Primitive `name` for every length. The native sweeps share the work common
+    to all lengths; TA-Lib has no sweep, so there each length is one C call.
+    """
+    x = kernels.as_array(x)
+    lengths = [int(n) for n in lengths]
+    if _use_talib(x) and lengths:
+        return np.vstack([TALIB[name](x, n) for n in lengths])
+    return NATIVE_SWEEPS[name](x, lengths)
+
+
+def SMA_sweep(x, lengths) -> np.ndarray:
+    return sweep('SMA', x, lengths)
+
+
+def EMA_sweep(x, lengths) -> np.ndarray:
+    return sweep('EMA', x, lengths)
+
+
+def RSI_sweep(x, lengths) -> np.ndarray:
+    return sweep('RSI', x, lengths)
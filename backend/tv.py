@@ -1,62 +1,335 @@
 import pandas as pd
 import numpy as np
 
+import kernels
+import ta_backend
+
+
+def _series(values: np.ndarray, source) -> pd.Series:
+    """Wraps a kernel result back onto the source's index."""
+    if isinstance(source, pd.Series):
+        return pd.Series(values, index=source.index, name=source.name)
+    return pd.Series(values)
+
 def SMA(source: pd.Series, length: int) -> pd.Series:
     """Simple Moving Average"""
-    return source.rolling(window=length).mean()
+    return _series(ta_backend.SMA(source, length), source)
 
 def EMA(source: pd.Series, length: int) -> pd.Series:
     """Exponential Moving Average"""
-    return source.ewm(span=length, adjust=False).mean()
+    return _series(ta_backend.EMA(source, length), source)
 
 def RMA(source: pd.Series, length: int) -> pd.Series:
     """
     Running Moving Average (Wilder's Smoothing).
     Used for RSI. Equivalent to EMA with alpha = 1 / length.
     """
-    return source.ewm(alpha=1/length, adjust=False).mean()
+    return _series(kernels.rma(source, length), source)
 
 def RSI(source: pd.Series, length: int) -> pd.Series:
     """Relative Strength Index"""
-    # 1. Change
-    delta = source.diff()
-    
-    # 2. Up/Down
-    up = delta.clip(lower=0)
-    down = -1 * delta.clip(upper=0)
-    
-    # 3. Smoothed Avg (Wilder's)
-    ma_up = RMA(up, length)
-    ma_down = RMA(down, length)
-    
-    # 4. RS & RSI
-    rs = ma_up / ma_down
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return _series(ta_backend.RSI(source, length), source)
 
 def MACD(source: pd.Series, fast: int, slow: int, signal: int) -> dict:
     """Moving Average Convergence Divergence"""
-    fast_ma = EMA(source, fast)
-    slow_ma = EMA(source, slow)
-    macd_line = fast_ma - slow_ma
-    signal_line = EMA(macd_line, signal)
-    hist = macd_line - signal_line
+    macd_line, signal_line, hist = ta_backend.MACD(source, fast, slow, signal)
     
     return {
-        "MACD": macd_line,
-        "Signal": signal_line,
-        "Hist": hist
+        "MACD": _series(macd_line, source),
+        "Signal": _series(signal_line, source),
+        "Hist": _series(hist, source)
     }
 
 def Bollinger(source: pd.Series, length: int, mult: float) -> dict:
     """Bollinger Bands"""
-    basis = SMA(source, length)
-    dev = source.rolling(window=length).std()
-    upper = basis + (mult * dev)
-    lower = basis - (mult * dev)
+    upper, lower, basis = ta_backend.BBANDS(source, length, mult)
     
     return {
-        "upper": upper,
-        "lower": lower,
-        "basis": basis
+        "upper": _series(upper, source),
+        "lower": _series(lower, source),
+        "basis": _series(basis, source)
     }
+
+
+# --- Parameter sweeps ---
+# One column per length (DataFrame indexed like the source); shared work such as
+# prefix sums or RSI's diff/clip is computed once for all lengths.
+
+def _sweep(values: np.ndarray, lengths, source) -> pd.DataFrame:
+    index = source.index if isinstance(source, pd.Series) else None
+    return pd.DataFrame(values.T, index=index, columns=[int(n) for n in lengths])
+
+def SMA_sweep(source: pd.Series, lengths) -> pd.DataFrame:
+    """SMA for every length in `lengths` (e.g. range(5, 400))"""
+    lengths = list(lengths)
+    return _sweep(ta_backend.SMA_sweep(source, lengths), lengths, source)
+
+def EMA_sweep(source: pd.Series, lengths) -> pd.DataFrame:
+    """EMA for every length in `lengths`"""
+    lengths = list(lengths)
+    return _sweep(ta_backend.EMA_sweep(source, lengths), lengths, source)
+
+def RSI_sweep(source: pd.Series, lengths) -> pd.DataFrame:
+    """RSI for every length in `lengths` (e.g. range(2, 51))"""
+    lengths = list(lengths)
+    return _sweep(ta_backend.RSI_sweep(source, lengths), lengths, source)
+
+
+# --- Streaming (incremental) counterparts ---
+#
+# Each state consumes one bar at a time in O(1) and reproduces the batch function
+# above bar for bar: the arithmetic mirrors the kernels (shifted prefix sums,
+# Welford moments, the ewm(adjust=False) recurrence), so a live chart can extend
+# a computed series without recomputing history.
+# They follow the native backend (ta_backend); with TA-Lib active, early bars of
+# the EMA family differ by its SMA seed. Known gap: without numba the rolling
+# deviation comes from pandas, whose 2-bar windows can differ in the last bits.
+#
+#   state = RSIState(14)
+#   state.update_many(history)
+#   rsi = state.update(new_bar)
+
+import math
+from collections import deque
+
+_NAN = float('nan')
+
+
+def _bar_value(bar, field: str = 'close') -> float:
+    """Accepts a number or a bar mapping (dict / pd.Series) and returns its value as float."""
+    if isinstance(bar, (int, float, np.floating, np.integer)):
+        return float(bar)
+    value = bar[field]
+    return _NAN if value is None else float(value)
+
+
+def _div(a: float, b: float) -> float:
+    """Float division with numpy semantics (x/0 -> +-inf, 0/0 -> NaN) instead of raising."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+
+class _StreamingState:
+    field = 'close'
+
+    def update_many(self, bars) -> list:
+        """Feeds several bars, returning the snapshot after each one."""
+        return [self.update(bar) for bar in bars]
+
+
+class SMAState(_StreamingState):
+    """Streaming SMA: running prefix sum plus a ring of the last `length` sums (kernels.sma)."""
+
+    def __init__(self, length: int):
+        self.length = int(length)
+        self._prefixes = deque([0.0])
+        self._finite = deque()
+        self._shift = None
+        self._cum = 0.0
+        self._finite_ct = 0
+        self.value = _NAN
+
+    def update(self, bar) -> float:
+        x = _bar_value(bar, self.field)
+        finite = math.isfinite(x)
+        if finite:
+            if self._shift is None:
+                self._shift = x
+            self._cum += x - self._shift
+        self._prefixes.append(self._cum)
+        self._finite.append(finite)
+        self._finite_ct += finite
+        if len(self._finite) > self.length:
+            self._finite_ct -= self._finite.popleft()
+            self._prefixes.popleft()
+
+        if self._finite_ct < self.length:
+            result = _NAN
+        else:
+            result = (self._cum - self._prefixes[0]) / self.length + self._shift
+        self.value = result
+        return result
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class StdevState(_StreamingState):
+    """Streaming sample standard deviation over a window (pandas rolling().std(), Welford)."""
+
+    def __init__(self, length: int, ddof: int = 1):
+        self.length = int(length)
+        self.ddof = ddof
+        self._window = deque()
+        self._nobs = 0
+        self._mean = 0.0
+        self._ssqdm = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._same_ct = 0
+        self._prev = _NAN
+        self.value = _NAN
+
+    def _add(self, x):
+        if x != x:
+            return
+        self._nobs += 1
+        if x == self._prev:
+            self._same_ct += 1
+        else:
+            self._same_ct = 1
+        self._prev = x
+        prev_mean = self._mean - self._comp_add
+        y = x - self._comp_add
+        t = y - self._mean
+        self._comp_add = t + self._mean - y
+        if self._nobs:
+            self._mean = self._mean + t / self._nobs
+        else:
+            self._mean = 0.0
+        self._ssqdm = self._ssqdm + (x - prev_mean) * (x - self._mean)
+
+    def _remove(self, x):
+        if x != x:
+            return
+        self._nobs -= 1
+        if self._nobs:
+            prev_mean = self._mean - self._comp_remove
+            y = x - self._comp_remove
+            t = y - self._mean
+            self._comp_remove = t + self._mean - y
+            self._mean = self._mean - t / self._nobs
+            self._ssqdm = self._ssqdm - (x - prev_mean) * (x - self._mean)
+        else:
+            self._mean = 0.0
+            self._ssqdm = 0.0
+
+    def update(self, bar) -> float:
+        x = _bar_value(bar, self.field)
+        if len(self._window) == self.length:
+            self._remove(self._window.popleft())
+        self._window.append(x)
+        self._add(x)
+
+        if self._nobs >= self.length and self._nobs > self.ddof:
+            if self._nobs == 1 or self._same_ct >= self._nobs:
+                var = 0.0
+            else:
+                var = self._ssqdm / (self._nobs - self.ddof)
+        else:
+            var = _NAN
+        self.value = math.sqrt(var) if var > 0 else (0.0 if var == var else _NAN)
+        return self.value
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class EMAState(_StreamingState):
+    """Streaming EMA (pandas ewm(adjust=False).mean() recurrence)."""
+
+    def __init__(self, length: int = None, alpha: float = None):
+        # pandas normalizes span/alpha to a center of mass first; follow it to the last bit
+        com = (int(length) - 1) / 2.0 if alpha is None else (1.0 - alpha) / alpha
+        self.alpha = 1.0 / (1.0 + com)
+        self._com = com
+        self._old_wt_factor = 1.0 - self.alpha
+        self._old_wt = 1.0
+        self._new_wt = self.alpha
+        self.value = _NAN
+
+    def update(self, bar) -> float:
+        x = _bar_value(bar, self.field)
+        if self.value == self.value:
+            self._old_wt *= self._old_wt_factor
+            if self._com == 1:
+                # pandas re-derives the new weight when com == 1 (alpha = 0.5)
+                self._new_wt = 1.0 - self._old_wt
+            if x == x:
+                # avoid numerical errors on constant series
+                if self.value != x:
+                    self.value = (self._old_wt * self.value + self._new_wt * x) / (self._old_wt + self._new_wt)
+                self._old_wt = 1.0
+        elif x == x:
+            self.value = x
+        return self.value
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class RMAState(EMAState):
+    """Streaming RMA (Wilder's smoothing, alpha = 1 / length)."""
+
+    def __init__(self, length: int):
+        super().__init__(alpha=1 / length)
+
+
+class RSIState(_StreamingState):
+    """Streaming RSI: last close plus Wilder-smoothed gain and loss."""
+
+    def __init__(self, length: int):
+        self.length = int(length)
+        self._prev_close = _NAN
+        self._up = RMAState(self.length)
+        self._down = RMAState(self.length)
+        self.value = _NAN
+
+    def update(self, bar) -> float:
+        x = _bar_value(bar, self.field)
+        delta = x - self._prev_close
+        self._prev_close = x
+        if delta == delta:
+            up = delta if delta > 0 else 0.0
+            down = -1 * (delta if delta < 0 else 0.0)
+        else:
+            up = down = _NAN
+        ma_up = self._up.update(up)
+        ma_down = self._down.update(down)
+        rs = _div(ma_up, ma_down)
+        self.value = 100 - _div(100, 1 + rs)
+        return self.value
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class MACDState(_StreamingState):
+    """Streaming MACD: fast/slow EMAs of the source plus the signal EMA of their spread."""
+
+    def __init__(self, fast: int, slow: int, signal: int):
+        self._fast = EMAState(fast)
+        self._slow = EMAState(slow)
+        self._signal = EMAState(signal)
+        self.macd = self.signal = self.hist = _NAN
+
+    def update(self, bar) -> dict:
+        x = _bar_value(bar, self.field)
+        self.macd = self._fast.update(x) - self._slow.update(x)
+        self.signal = self._signal.update(self.macd)
+        self.hist = self.macd - self.signal
+        return self.snapshot()
+
+    def snapshot(self) -> dict:
+        return {"MACD": self.macd, "Signal": self.signal, "Hist": self.hist}
+
+
+class BollingerState(_StreamingState):
+    """Streaming Bollinger Bands: SMA basis plus Welford rolling deviation."""
+
+    def __init__(self, length: int, mult: float):
+        self.mult = mult
+        self._basis = SMAState(length)
+        self._dev = StdevState(length)
+        self.upper = self.lower = self.basis = _NAN
+
+    def update(self, bar) -> dict:
+        x = _bar_value(bar, self.field)
+        self.basis = self._basis.update(x)
+        dev = self._dev.update(x)
+        self.upper = self.basis + (self.mult * dev)
+        self.lower = self.basis - (self.mult * dev)
+        return self.snapshot()
+
+    def snapshot(self) -> dict:
+        return {"upper": self.upper, "lower": self.lower, "basis": self.basis}
@@ -2,12 +2,23 @@ from tvDatafeed import TvDatafeed, Interval
 import pandas as pd
 import os
 import datetime
+import threading
+import time
+
+from macro_composite import GLOBAL_M2_COMPONENTS
 
 class TVLoader:
+    # Minimum spacing between live TradingView requests (cache hits are not throttled)
+    MIN_REQUEST_INTERVAL = 1.0
+
     def __init__(self, cache_dir='data'):
         # Use anonymous mode by default
         self.tv = TvDatafeed()
         self.cache_dir = cache_dir
+        self._throttle_lock = threading.Lock()
+        self._last_request = 0.0
+        # Shared FX matrix (set by DataLoader.fx_matrix); without it FX is fetched per call
+        self.fx_matrix = None
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir)
 
@@ -34,6 +45,14 @@ class TVLoader:
         except Exception as e:
             print(f"Cache write error {cache_path}: {e}")
 
+    def _throttle(self):
+        """Sleeps just long enough to keep live requests MIN_REQUEST_INTERVAL apart."""
+        with self._throttle_lock:
+            wait = self._last_request + self.MIN_REQUEST_INTERVAL - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.time()
+
     def fetch_tv_data(self, symbol, exchange, interval=Interval.in_daily, n_bars=2000, use_cache=True):
         """
         Fetches data from TradingView with Caching.
@@ -50,6 +69,8 @@ class TVLoader:
         # 2. Fetch from TV
         try:
             print(f"Fetching {exchange}:{symbol} from TV (n_bars={n_bars})...")
+            # Prevent rate limiting/socket issues
+            self._throttle()
             df = self.tv.get_hist(
                 symbol=symbol,
                 exchange=exchange,
@@ -110,31 +131,51 @@ class TVLoader:
         # Let's try Daily, TV usually maps it well.
         return self.fetch_tv_data(symbol, exchange, interval=Interval.in_daily, n_bars=n_bars)
 
+    def fetch_m2_series(self, m2_symbol, m2_exchange):
+        """Monthly money-supply (or balance-sheet) series in local currency."""
+        df_m2 = self.fetch_tv_data(m2_symbol, m2_exchange, interval=Interval.in_monthly, n_bars=500)
+        if df_m2 is None or df_m2.empty:
+            return None
+        return df_m2['close']
+
+    def fetch_fx_series(self, fx_symbol, fx_exchange):
+        """Daily FX rate series."""
+        df_fx = self.fetch_tv_data(fx_symbol, fx_exchange, interval=Interval.in_daily, n_bars=2000)
+        if df_fx is None or df_fx.empty:
+            return None
+        return df_fx['close']
+
     def fetch_composite_m2(self, m2_symbol, m2_exchange, fx_symbol, fx_exchange, operation='multiply'):
         """
         Fetches M2 and FX data, aligns them, and performs operation to get USD value.
         """
         try:
             # Fetch M2 (using cache logic inside fetch_tv_data)
-            df_m2 = self.fetch_tv_data(m2_symbol, m2_exchange, interval=Interval.in_monthly, n_bars=500)
-            if df_m2 is None or df_m2.empty:
+            m2_series = self.fetch_m2_series(m2_symbol, m2_exchange)
+            if m2_series is None:
                 return None
-            
-            m2_series = df_m2['close']
 
             if operation == 'none':
                 return m2_series.to_frame(name='close')
 
+            if self.fx_matrix is not None:
+                # Shared daily FX matrix: fetched once per TTL, rate as of each publication
+                key = self.fx_matrix.key(fx_symbol, fx_exchange)
+                self.fx_matrix.ensure_fresh([key])
+                result = self.fx_matrix.convert(m2_series, key, operation)
+                if result is None:
+                    print(f"Warning: FX data missing for {fx_symbol}. Returning M2 raw (fallback).")
+                    return m2_series.to_frame(name='close')
+                return result.to_frame(name='close')
+
             # Fetch FX (daily)
-            df_fx = self.fetch_tv_data(fx_symbol, fx_exchange, interval=Interval.in_daily, n_bars=2000)
-            if df_fx is None or df_fx.empty:
+            fx_series = self.fetch_fx_series(fx_symbol, fx_exchange)
+            if fx_series is None:
                 print(f"Warning: FX data missing for {fx_symbol}. Returning M2 raw (fallback).")
                 return m2_series.to_frame(name='close')
-
-            fx_series = df_fx['close']
             
             # Align
-            fx_aligned = fx_series.reindex(df_m2.index, method='nearest')
+            fx_aligned = fx_series.reindex(m2_series.index, method='nearest')
             
             result = None
             if operation == 'multiply':
@@ -154,24 +195,11 @@ class TVLoader:
         """
         Aggregates Global M2 from specific TradingView tickers.
         """
-        import time
         print("Fetching Global M2 from TradingView components...")
         
-        # Format: (Name, M2_Ticker, M2_Exch, FX_Ticker, FX_Exch, Op)
-        components = [
-            ('USD', 'USM2', 'ECONOMICS', None, None, 'none'),
-            ('EUR', 'EUM2', 'ECONOMICS', 'EURUSD', 'FX', 'multiply'),
-            ('CNY', 'CNM2', 'ECONOMICS', 'CNYUSD', 'FX_IDC', 'multiply'), 
-            ('JPY', 'JPM2', 'ECONOMICS', 'JPYUSD', 'FX_IDC', 'multiply'), 
-            ('GBP', 'GBM2', 'ECONOMICS', 'GBPUSD', 'FX', 'multiply'),
-            ('CAD', 'CAM2', 'ECONOMICS', 'CADUSD', 'FX_IDC', 'multiply'),
-            ('CHF', 'CHM2', 'ECONOMICS', 'CHFUSD', 'FX_IDC', 'multiply'),
-            ('RUB', 'RUM2', 'ECONOMICS', 'RUBUSD', 'FX_IDC', 'multiply'),
-        ]
-        
         series_list = []
         
-        for name, m2_sym, m2_exch, fx_sym, fx_exch, op in components:
+        for name, m2_sym, m2_exch, fx_sym, fx_exch, op in GLOBAL_M2_COMPONENTS:
             print(f"  - Fetching {name}...")
             s_df = self.fetch_composite_m2(m2_sym, m2_exch, fx_sym, fx_exch, op)
             if s_df is not None and not s_df.empty:
@@ -180,9 +208,6 @@ class TVLoader:
                 series_list.append(s)
             else:
                 print(f"    Failed to fetch {name}, skipping.")
-            
-            # Sleep to prevent rate limiting/socket issues
-            time.sleep(1.0)
 
         
         if not series_list:
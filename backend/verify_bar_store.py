@@ -0,0 +1,159 @@
+"""
+Checks of the bar cache (bar_store.py) and the range-query indexes it carries
+(series_index.py): which refetches bump the version and what changed_from they
+report, eviction by age, count and bytes, SeriesIndex append/truncate/drop_head
+against an index built from scratch, and the indexes a tail-only refetch
+advances against fresh ones (with the superseded entry's left untouched).
+Fails (exit 1) on any mismatch.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from bar_store import BarStore
+from series_index import SeriesIndex
+
+N_BARS = 500
+WINDOWS = [1, 5, 20, 64]
+
+
+def _bars(start: int, count: int, seed: int = 5) -> pd.DataFrame:
+    """Hourly bars start..start+count-1 (positions on a fixed random walk), indexed by timestamp."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, start + count)))[start:]
+    index = pd.DatetimeIndex(pd.to_datetime(1577836800 + 3600 * np.arange(start, start + count), unit='s'))
+    return pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                         'volume': 1.0}, index=index)
+
+
+def _same(a, b) -> bool:
+    a, b = np.asarray(a, dtype='float64'), np.asarray(b, dtype='float64')
+    return a.shape == b.shape and bool(np.allclose(a, b, rtol=1e-9, atol=1e-12, equal_nan=True))
+
+
+def check_diff() -> bool:
+    old = _bars(0, N_BARS)
+    revised = old.copy()
+    revised.iloc[-3:, revised.columns.get_loc('close')] *= 1.001
+    cases = [
+        # (name, new frame, expected changed, expected changed_from)
+        ('unchanged refetch', old.copy(), False, None),
+        ('appended bars', _bars(0, N_BARS + 4), True, old.index[-1] + pd.Timedelta(hours=1)),
+        ('revised tail', revised, True, old.index[-3]),
+        ('head slid forward', _bars(10, N_BARS), True, old.index[-1] + pd.Timedelta(hours=1)),
+        ('fewer bars at the tail', _bars(0, N_BARS - 5), True, None),
+        ('slid head, fewer tail bars', _bars(10, N_BARS - 20), True, None),
+        ('columns changed', old.drop(columns='volume'), True, None),
+    ]
+    ok = True
+    for name, new, changed, changed_from in cases:
+        got = BarStore._diff(old, new)
+        good = got == (changed, changed_from)
+        ok = ok and good
+        print(f"  {name:<28} -> {got}{'' if good else f'  FAIL (expected {(changed, changed_from)})'}")
+    print(f"_diff cases: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_versions() -> bool:
+    store = BarStore()
+    key = BarStore.make_key('BTCUSDT', '1h')
+    first = store.put(key, _bars(0, N_BARS))
+    same = store.put(key, _bars(0, N_BARS))
+    appended = store.put(key, _bars(0, N_BARS + 2))
+    shorter = store.put(key, _bars(0, N_BARS))
+    other = store.put(BarStore.make_key('ETHUSDT', '1h'), _bars(0, N_BARS, seed=6))
+    ok = (same.version == first.version
+          and appended.version > first.version and appended.prev_version == first.version
+          and appended.changed_from == _bars(0, N_BARS + 2).index[N_BARS]
+          and shorter.version > appended.version and shorter.changed_from is None
+          and other.version not in (first.version, appended.version, shorter.version))
+    print(f"version bumps (store-wide counter): {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_eviction() -> bool:
+    frame = _bars(0, N_BARS)
+    store = BarStore(max_entries=3)
+    for i in range(5):
+        store.put(('T%d' % i, '1h'), frame)
+    by_count = len(store) == 3 and store.get(('T0', '1h')) is None and store.get(('T4', '1h')) is not None
+
+    store = BarStore(max_bytes=int(2.5 * store.get(('T4', '1h')).nbytes))
+    for i in range(3):
+        store.put(('T%d' % i, '1h'), frame)
+    by_bytes = len(store) == 2 and store.nbytes <= store.max_bytes and store.get(('T0', '1h')) is None
+
+    store = BarStore(keep_seconds=0.05)
+    store.put(('old', '1h'), frame)
+    time.sleep(0.1)
+    store.put(('new', '1h'), frame)
+    by_age = len(store) == 1 and store.get(('new', '1h')) is not None
+
+    ok = by_count and by_bytes and by_age
+    print(f"eviction by count {by_count}, bytes {by_bytes}, age {by_age}: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def _same_index(index: SeriesIndex, values: np.ndarray) -> bool:
+    fresh = SeriesIndex(values)
+    if len(index) != len(fresh):
+        return False
+    return all(_same(getattr(index, q)(w), getattr(fresh, q)(w))
+               for q in ('rolling_mean', 'rolling_std', 'rolling_max', 'rolling_min') for w in WINDOWS)
+
+
+def check_series_index() -> bool:
+    values = _bars(0, N_BARS)['close'].to_numpy()
+    index = SeriesIndex(values[:300])
+    index.append(values[300:])
+    appended = _same_index(index, values)
+    index.truncate(400)
+    truncated = _same_index(index, values[:400])
+    index.drop_head(50)
+    dropped = _same_index(index, values[50:400])
+    copy = index.copy()
+    copy.append(values[400:])
+    independent = len(index) == 350 and _same_index(copy, values[50:])
+    ok = appended and truncated and dropped and independent
+    print(f"SeriesIndex append {appended}, truncate {truncated}, drop_head {dropped}, copy {independent}: "
+          f"{'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_advanced_indexes() -> bool:
+    store = BarStore()
+    key = BarStore.make_key('BTCUSDT', '1h')
+    old = _bars(0, N_BARS)
+    first = store.put(key, old)
+    before = first.series_index('close').rolling_mean(20).copy()
+
+    new = _bars(10, N_BARS + 5)
+    new.iloc[N_BARS - 20, new.columns.get_loc('close')] *= 1.01  # revise a bar inside the old tail too
+    second = store.put(key, new)
+    advanced = 'close' in second.indexes and _same_index(second.indexes['close'], new['close'].to_numpy())
+    untouched = (first.indexes['close'] is not second.indexes['close']
+                 and _same(first.series_index('close').rolling_mean(20), before))
+    ok = second.changed_from is not None and advanced and untouched
+    print(f"indexes advanced over a tail-only refetch {advanced}, previous untouched {untouched}: "
+          f"{'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def verify():
+    failures = [name for name, ok in [
+        ('_diff', check_diff()),
+        ('versions', check_versions()),
+        ('eviction', check_eviction()),
+        ('series index', check_series_index()),
+        ('advanced indexes', check_advanced_indexes()),
+    ] if not ok]
+    if failures:
+        print(f"FAILED: {failures}")
+        raise SystemExit(1)
+    print("Bar store checks passed.")
+
+
+if __name__ == "__main__":
+    verify()
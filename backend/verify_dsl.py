@@ -0,0 +1,154 @@
+"""
+Checks of the custom indicator language (dsl.py) end to end through the
+'Custom' indicator: the module docstring's example against the same arithmetic
+done with ta.*, if / else if / else merging, the history operator x[n], input
+overrides by title, and the line numbers reported for script errors.
+Fails (exit 1) on any mismatch.
+"""
+import numpy as np
+import pandas as pd
+
+import dsl
+import ta
+from indicators import Indicators
+
+N_BARS = 2000
+
+
+def _same(a, b) -> bool:
+    a, b = np.asarray(a, dtype='float64'), np.asarray(b, dtype='float64')
+    return a.shape == b.shape and bool(np.allclose(a, b, rtol=1e-12, atol=0, equal_nan=True))
+
+
+def _run(engine, df, source: str, **params) -> dict:
+    result = engine.apply_indicator(df, 'Custom', source=source, **params)
+    if not isinstance(result, dict) or 'error' in result:
+        raise AssertionError(result.get('error') if isinstance(result, dict) else 'no packaged result')
+    return result
+
+
+def _docstring_example() -> str:
+    lines = dsl.__doc__.split('\n')
+    start = next(i for i, line in enumerate(lines) if line.startswith('    indicator('))
+    example = []
+    for line in lines[start:]:
+        if not line.startswith('    '):
+            break
+        example.append(line[4:])
+    return '\n'.join(example)
+
+
+def check_docstring_example(engine, df) -> bool:
+    close = df['close'].to_numpy()
+    macd = np.asarray(ta.ema(close, 12)) - np.asarray(ta.ema(close, 26))
+    signal = np.asarray(ta.ema(macd, 9))
+    buy = np.asarray(ta.crossover(macd, signal), dtype='float64')
+
+    result = _run(engine, df, _docstring_example())
+    data = result['data']
+    ok = (list(data) == ['time', 'MACD', 'Signal', 'Buy']
+          and _same(data['MACD'], macd) and _same(data['Signal'], signal)
+          and _same(np.asarray(data['Buy'], dtype='float64'), buy)
+          and result['meta']['name'] == 'MACD cross' and result['meta']['type'] == 'oscillator'
+          and result['plots']['MACD']['color'] == dsl.COLORS['blue'])
+    print(f"docstring example vs ta.ema arithmetic: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_branches(engine, df) -> bool:
+    close, open_ = df['close'].to_numpy(), df['open'].to_numpy()
+    source = '\n'.join([
+        'x = 0.0',
+        'y = na',
+        'if close > open',
+        '    x := 1',
+        '    y := ta.sma(close, 5)',
+        'else if close < open',
+        '    x := -1',
+        'else',
+        '    x := 2',
+        'plot(x, "x")',
+        'plot(y, "y")',
+    ])
+    data = _run(engine, df, source)['data']
+    up = close > open_
+    expected_x = np.where(up, 1.0, np.where(close < open_, -1.0, 2.0))
+    # ta.sma inside the branch runs over every bar, not only the bars where the branch is taken
+    expected_y = np.where(up, np.asarray(ta.sma(close, 5)), np.nan)
+    ok = _same(data['x'], expected_x) and _same(data['y'], expected_y)
+    print(f"if / else if / else merging: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_history(engine, df) -> bool:
+    close = df['close'].to_numpy()
+    data = _run(engine, df, 'plot(close[3], "lag")\nplot(close - close[1], "diff")\nplot(close[0], "now")')['data']
+    lag = np.concatenate([np.full(3, np.nan), close[:-3]])
+    diff = np.concatenate([[np.nan], np.diff(close)])
+    ok = _same(data['lag'], lag) and _same(data['diff'], diff) and _same(data['now'], close)
+    print(f"history operator x[n]: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_inputs(engine, df) -> bool:
+    close = df['close'].to_numpy()
+    source = 'len = input.int(10, "len")\nplot(ta.sma(close, len), "s")'
+    default = _run(engine, df, source)
+    override = _run(engine, df, source, len=20)
+    ok = (_same(default['data']['s'], ta.sma(close, 10)) and _same(override['data']['s'], ta.sma(close, 20))
+          and default['meta']['inputs'] == [{'name': 'len', 'default': 10, 'type': 'int'}])
+    print(f"input overrides by title: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+ERROR_CASES = [
+    # (script, line the error must point at, text the message must contain)
+    ('a = close\n\nb = foo(a)\nplot(b)', 3, "unknown function 'foo'"),
+    ('x = close\nx = open\nplot(x)', 2, "already declared"),
+    ('y := close\nplot(y)', 1, "not declared"),
+    ('x = close\nplot(x[close])', 2, "history offset"),
+    ('x = close\nplot(x, color = x > open ? color.green : color.red)', 2, "'color' must be a constant"),
+    ('x = close\nif x > open\nplot(x)', 2, "indented block"),
+]
+
+
+def check_error_lines() -> bool:
+    ok = True
+    for source, line, text in ERROR_CASES:
+        try:
+            dsl.compile_plan(source)
+            error = None
+        except dsl.DSLError as e:
+            error = e
+        good = error is not None and error.line == line and text in str(error)
+        ok = ok and good
+        print(f"  {source.splitlines()[line - 1]!r:<60} -> {error}{'' if good else '  FAIL'}")
+    print(f"error line numbers: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def verify():
+    rng = np.random.default_rng(3)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.01, N_BARS)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    open_[::7] = close[::7]  # some doji bars for the else branch
+    df = pd.DataFrame({'time': 1577836800 + 3600 * np.arange(N_BARS), 'open': open_,
+                       'high': np.maximum(open_, close) * 1.001, 'low': np.minimum(open_, close) * 0.999,
+                       'close': close, 'volume': 1.0})
+    engine = Indicators()
+
+    failures = [name for name, ok in [
+        ('docstring example', check_docstring_example(engine, df)),
+        ('branches', check_branches(engine, df)),
+        ('history', check_history(engine, df)),
+        ('inputs', check_inputs(engine, df)),
+        ('error lines', check_error_lines()),
+    ] if not ok]
+    if failures:
+        print(f"FAILED: {failures}")
+        raise SystemExit(1)
+    print("DSL checks passed.")
+
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,97 @@
+"""
+Checks that the incrementally maintained macro composite (macro_composite.py)
+matches a full rebuild: a component that publishes a new value, revises a
+past one or loses its oldest values is applied from its first changed day
+only (one that extends the grid rebuilds it), and the daily frame and total
+must equal a composite built from scratch on the same series. An unchanged
+series must not bump the version.
+Fails (exit 1) on any mismatch.
+"""
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from macro_composite import MacroComposite
+
+COMPONENTS = [
+    ('A', 'AM2', 'ECONOMICS', None, None, 'none'),
+    ('B', 'BM2', 'ECONOMICS', None, None, 'none'),
+    ('C', 'CM2', 'ECONOMICS', None, None, 'none'),
+]
+WEIGHTS = {'C': -1.0}
+
+
+def _monthly(seed: int, start: str, periods: int, level: float) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=periods, freq='MS')
+    return pd.Series(level * np.exp(np.cumsum(rng.normal(0.003, 0.01, periods))), index=index)
+
+
+def _composite(cache_dir: str) -> MacroComposite:
+    return MacroComposite('verify', COMPONENTS, lambda component: None, cache_dir=cache_dir, weights=WEIGHTS)
+
+
+def _same_as_rebuilt(composite: MacroComposite, series: dict, cache_dir: str) -> bool:
+    fresh = _composite(cache_dir)
+    for name, values in series.items():
+        fresh.apply_component(name, values)
+    a, b = composite.frame(), fresh.frame()
+    return (a.index.equals(b.index) and list(a.columns) == list(b.columns)
+            and bool(np.allclose(a.to_numpy(), b.to_numpy(), rtol=1e-12, atol=0, equal_nan=True))
+            and composite.series().equals(fresh.series()))
+
+
+def verify():
+    cache_dir = tempfile.mkdtemp()
+    series = {
+        'A': _monthly(1, '2015-01-01', 100, 20e12),
+        'B': _monthly(2, '2016-06-01', 80, 15e12),
+        'C': _monthly(3, '2015-01-01', 100, 1e12),
+    }
+    composite = _composite(cache_dir)
+    for name, values in series.items():
+        composite.apply_component(name, values)
+
+    revised = series['B'].copy()
+    revised.iloc[-5] *= 1.02
+    published = pd.concat([series['A'], _monthly(4, '2023-05-01', 1, 21e12)])
+    extended = pd.concat([series['C'], _monthly(5, '2023-05-01', 3, 1e12)])
+    steps = [
+        # (what happened, component, new series, whether the grid must be rebuilt)
+        ('revised past value', 'B', revised, False),
+        ('publication extending the grid', 'C', extended, True),
+        ('new publication inside the grid', 'A', published, False),
+        ('history shortened at the head', 'B', revised.iloc[12:], False),
+    ]
+    rebuilds = []
+    rebuild = composite._rebuild
+    composite._rebuild = lambda: (rebuilds.append(1), rebuild())
+
+    failures = []
+    version = composite.version
+    unchanged = not composite.apply_component('A', series['A'].copy()) and composite.version == version
+    print(f"unchanged series keeps the version: {'ok' if unchanged else 'FAIL'}")
+    if not unchanged:
+        failures.append('unchanged')
+
+    for what, name, values, rebuilt in steps:
+        version = composite.version
+        rebuilds.clear()
+        applied = composite.apply_component(name, values)
+        series[name] = values
+        ok = (applied and composite.version == version + 1 and bool(rebuilds) == rebuilt
+              and _same_as_rebuilt(composite, series, cache_dir))
+        path = 'rebuilt' if rebuilds else 'from first changed day'
+        print(f"{what:<32} ({name}, {path}) matches a full rebuild: {'ok' if ok else 'FAIL'}")
+        if not ok:
+            failures.append(what)
+
+    if failures:
+        print(f"FAILED: {failures}")
+        raise SystemExit(1)
+    print("Incremental composite checks passed.")
+
+
+if __name__ == "__main__":
+    verify()
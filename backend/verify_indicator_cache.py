@@ -0,0 +1,155 @@
+"""
+Checks of the indicator result cache (indicator_cache.py) through
+Indicators.apply_indicator: a repeated call is a hit, a chart that gained bars
+extends the cached prefix to the same values as a full computation, served
+results can't corrupt the cache, and clear(), changed input bars and a backend
+switch all lead to a recomputation.
+Fails (exit 1) on any mismatch.
+"""
+import numpy as np
+import pandas as pd
+
+import kernels
+import ta_backend
+from indicators import Indicators
+
+N_BARS = 3000
+GAINED = 25
+CASES = [
+    ('SMA', {'length': 20}),
+    ('EMA', {'length': 21}),
+    ('RSI', {'length': 14}),
+    ('MACD', {}),
+    ('Bollinger', {'length': 20, 'mult': 2.0}),
+]
+# Relative deviation allowed between an extended result and a full computation: cached
+# states are warmed on a window, so EMA-style seeds differ by up to the kernels' tolerance
+TOLERANCE = kernels.CONVERGENCE_TOLERANCE
+
+
+def _frame(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.01, N_BARS + GAINED)))[:n]
+    return pd.DataFrame({'time': 1577836800 + 3600 * np.arange(n), 'open': close, 'high': close * 1.01,
+                         'low': close * 0.99, 'close': close, 'volume': 1.0})
+
+
+def _same_data(a: dict, b: dict) -> bool:
+    if list(a) != list(b):
+        return False
+    for key in a:
+        x, y = np.asarray(a[key], dtype='float64'), np.asarray(b[key], dtype='float64')
+        if x.shape != y.shape or not np.array_equal(np.isnan(x), np.isnan(y)):
+            return False
+        scale = max(np.nanmax(np.abs(y)) if np.isfinite(y).any() else 1.0, 1.0)
+        if not np.all(np.abs(x - y)[~np.isnan(y)] <= TOLERANCE * scale):
+            return False
+    return True
+
+
+def _stats(engine) -> tuple:
+    stats = engine.cache.stats()
+    return stats['hits'], stats['prefix_hits'], stats['misses']
+
+
+def check_hits(df) -> bool:
+    engine = Indicators()
+    ok = True
+    for name, params in CASES:
+        first = engine.apply_indicator(df, name, **params)
+        before = _stats(engine)
+        second = engine.apply_indicator(df.copy(), name, **params)
+        good = _stats(engine) == (before[0] + 1, before[1], before[2]) and _same_data(first['data'], second['data'])
+        ok = ok and good
+        print(f"  {name:<10} repeated call is a hit: {'ok' if good else 'FAIL'}")
+    print(f"cache hits: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_prefix_extend(df, longer) -> bool:
+    engine = Indicators()
+    ok = True
+    for name, params in CASES:
+        engine.apply_indicator(df, name, **params)
+        before = _stats(engine)
+        extended = engine.apply_indicator(longer, name, **params)
+        full = Indicators().apply_indicator(longer, name, **params)
+        good = _stats(engine)[1] == before[1] + 1 and _same_data(extended['data'], full['data'])
+        ok = ok and good
+        print(f"  {name:<10} +{GAINED} bars extended like a full computation: {'ok' if good else 'FAIL'}")
+    print(f"prefix extend: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_served_copies(df) -> bool:
+    engine = Indicators()
+    served = engine.apply_indicator(df, 'SMA', length=20)
+    served['meta']['name'] = 'changed'
+    try:
+        served['data']['sma'][-1] = 0.0
+        writable = True
+    except ValueError:
+        writable = False
+    again = engine.apply_indicator(df, 'SMA', length=20)
+    ok = not writable and again['meta']['name'] != 'changed' and again['data']['sma'][-1] != 0.0
+    print(f"served results are copies over read-only arrays: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_invalidation(df) -> bool:
+    engine = Indicators()
+    engine.apply_indicator(df, 'EMA', length=21)
+
+    engine.cache.clear()
+    before = _stats(engine)
+    engine.apply_indicator(df, 'EMA', length=21)
+    cleared = _stats(engine)[2] == before[2] + 1
+
+    revised = df.copy()
+    revised.loc[revised.index[100], 'close'] *= 1.01
+    before = _stats(engine)
+    result = engine.apply_indicator(revised, 'EMA', length=21)
+    recomputed = (_stats(engine)[2] == before[2] + 1
+                  and _same_data(result['data'], Indicators().apply_indicator(revised, 'EMA', length=21)['data']))
+
+    # A different backend is a different key; with only the native kernels the key is still checked
+    previous = ta_backend.get_backend()
+    engine.cache.clear()
+    engine.apply_indicator(df, 'EMA', length=21)
+    before = _stats(engine)
+    try:
+        ta_backend.set_backend('talib')
+        switched = ta_backend.get_backend() == 'talib'
+    except Exception:
+        switched = False
+    if switched:
+        engine.apply_indicator(df, 'EMA', length=21)
+        backend_key = _stats(engine)[2] == before[2] + 1
+    else:
+        entry_keys = list(engine.cache._entries)
+        backend_key = bool(entry_keys) and all(previous in key for key in entry_keys)
+    ta_backend.set_backend(previous)
+
+    ok = cleared and recomputed and backend_key
+    print(f"invalidation by clear {cleared}, revised bars {recomputed}, backend key {backend_key}: "
+          f"{'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def verify():
+    df, longer = _frame(N_BARS), _frame(N_BARS + GAINED)
+    print(f"Bars: {N_BARS} (+{GAINED}), backend: {ta_backend.get_backend()}")
+    failures = [name for name, ok in [
+        ('hits', check_hits(df)),
+        ('prefix extend', check_prefix_extend(df, longer)),
+        ('served copies', check_served_copies(df)),
+        ('invalidation', check_invalidation(df)),
+    ] if not ok]
+    if failures:
+        print(f"FAILED: {failures}")
+        raise SystemExit(1)
+    print("Indicator cache checks passed.")
+
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,104 @@
+"""
+Parity check of the parameter sweeps used for optimisation.
+
+Every row of kernels.sma_sweep/ema_sweep/rsi_sweep must match the single-length
+kernel for that length, the ta_backend sweep dispatch must match the active
+backend's single-length function, and Indicators.apply_sweep must return the
+same columns as one apply_indicator call per value (through the 2-D sweep for
+SMA/EMA/RSI lengths and through the per-value loop otherwise).
+Fails (exit 1) on any mismatch.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import kernels
+import ta_backend
+from indicators import Indicators
+
+N_BARS = 20000
+LENGTHS = list(range(2, 60))
+# Relative deviation allowed between a sweep row and the single-length kernel
+TOLERANCE = 1e-9
+
+KERNELS = [
+    ('SMA', kernels.sma_sweep, kernels.sma),
+    ('EMA', kernels.ema_sweep, kernels.ema),
+    ('RSI', kernels.rsi_sweep, kernels.rsi),
+]
+
+
+def _same(a, b) -> bool:
+    a, b = np.asarray(a, dtype='float64'), np.asarray(b, dtype='float64')
+    if a.shape != b.shape or not np.array_equal(np.isnan(a), np.isnan(b)):
+        return False
+    scale = np.nanmax(np.abs(b)) if np.isfinite(b).any() else 1.0
+    return bool(np.all(np.abs(a - b)[~np.isnan(b)] <= TOLERANCE * max(scale, 1.0)))
+
+
+def check_kernels(close) -> list:
+    failures = []
+    for name, sweep, single in KERNELS:
+        start = time.perf_counter()
+        matrix = sweep(close, np.array(LENGTHS))
+        sweep_t = time.perf_counter() - start
+        start = time.perf_counter()
+        rows = [single(close, n) for n in LENGTHS]
+        single_t = time.perf_counter() - start
+        bad = [n for n, row, expected in zip(LENGTHS, matrix, rows) if not _same(row, expected)]
+        if bad:
+            failures.append(f'kernels.{name.lower()}_sweep {bad[:5]}')
+        print(f"{name:<4} sweep {sweep_t * 1e3:>8.1f} ms  vs {len(LENGTHS)} single calls {single_t * 1e3:>8.1f} ms"
+              f"  {'ok' if not bad else 'FAIL'}")
+
+        dispatched = ta_backend.sweep(name, close, LENGTHS)
+        bad = [n for n, row in zip(LENGTHS, dispatched) if not _same(row, getattr(ta_backend, name)(close, n))]
+        if bad:
+            failures.append(f'ta_backend.sweep {name} {bad[:5]}')
+    return failures
+
+
+def check_apply_sweep(df) -> list:
+    engine = Indicators()
+    failures = []
+    cases = [
+        ('SMA', 'length', [5, 20, 50], {}),
+        ('EMA', 'length', [9, 21], {}),
+        ('RSI', 'length', [7, 14], {}),
+        ('Bollinger', 'mult', [1.5, 2.0], {'length': 20}),
+    ]
+    for name, param, values, params in cases:
+        result = engine.apply_sweep(df, name, param, values, **params)
+        if 'error' in result:
+            failures.append(f'apply_sweep {name}: {result["error"]}')
+            continue
+        ok = list(result['data']) == ['time'] + [str(v) for v in values]
+        for value in values:
+            single = engine.apply_indicator(df, name, **{**params, param: value})['data']
+            output = next(k for k in single if k != 'time')
+            ok = ok and _same(result['data'][str(value)], single[output])
+        if not ok:
+            failures.append(f'apply_sweep {name} {param}')
+        print(f"apply_sweep {name} {param}={values}: {'ok' if ok else 'FAIL'}")
+    return failures
+
+
+def verify():
+    rng = np.random.default_rng(7)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.01, N_BARS)))
+    # Laid out like the frames the server builds: unix-seconds 'time' column, positional rows
+    time_s = 1577836800 + 3600 * np.arange(N_BARS)
+    df = pd.DataFrame({'time': time_s, 'open': close, 'high': close * 1.01, 'low': close * 0.99,
+                       'close': close, 'volume': 1.0})
+    print(f"Bars: {N_BARS}, lengths: {LENGTHS[0]}..{LENGTHS[-1]}, backend: {ta_backend.get_backend()}")
+
+    failures = check_kernels(close) + check_apply_sweep(df)
+    if failures:
+        print(f"FAILED: {failures}")
+        raise SystemExit(1)
+    print("Sweep parity checks passed.")
+
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,239 @@
+"""
+Golden check of the vectorized Pine `ta` library.
+
+Every function runs on small hand-worked series with known outputs and on
+random series (with na gaps, ties and plateaus) against per-bar references
+written straight from the Pine definitions; any mismatch fails the run.
+"""
+import math
+import time
+
+import numpy as np
+
+import ta
+
+N_BARS = 3000
+SEEDS = range(5)
+
+
+def _na(v) -> bool:
+    return v is None or (isinstance(v, float) and math.isnan(v))
+
+
+# --- Per-bar references (Pine semantics, one bar at a time) ---
+
+def ref_highest(x, n, better=lambda a, b: a > b):
+    out = []
+    for i in range(len(x)):
+        if i < n - 1:
+            out.append(np.nan)
+            continue
+        vals = [v for v in x[i - n + 1:i + 1] if not _na(v)]
+        best = vals[0] if vals else np.nan
+        for v in vals:
+            if better(v, best):
+                best = v
+        out.append(best)
+    return out
+
+
+def ref_highestbars(x, n, better=lambda a, b: a > b):
+    out = []
+    for i in range(len(x)):
+        if i < n - 1:
+            out.append(np.nan)
+            continue
+        best, offset = None, np.nan
+        for k in range(n):  # newest first; only a strictly better older bar replaces
+            v = x[i - k]
+            if _na(v):
+                continue
+            if best is None or better(v, best):
+                best, offset = v, -k
+        out.append(offset)
+    return out
+
+
+def ref_crossover(a, b):
+    return [i > 0 and a[i] > b[i] and a[i - 1] < b[i - 1] for i in range(len(a))]
+
+
+def ref_crossunder(a, b):
+    return [i > 0 and a[i] < b[i] and a[i - 1] > b[i - 1] for i in range(len(a))]
+
+
+def ref_barssince(cond):
+    out, last = [], None
+    for i, c in enumerate(cond):
+        if c:
+            last = i
+        out.append(np.nan if last is None else i - last)
+    return out
+
+
+def ref_valuewhen(cond, x, occurrence):
+    out, hits = [], []
+    for i, c in enumerate(cond):
+        if c:
+            hits.append(x[i])
+        out.append(hits[-1 - occurrence] if len(hits) > occurrence else np.nan)
+    return out
+
+
+def ref_pivot(x, left, right, better):
+    out = [np.nan] * len(x)
+    for i in range(left + right, len(x)):
+        p = i - right
+        v = x[p]
+        if _na(v):
+            continue
+        ok = all(_na(x[p - k]) or better(v, x[p - k]) for k in range(1, left + 1))
+        ok = ok and all(_na(x[p + k]) or not better(x[p + k], v) for k in range(1, right + 1))
+        if ok:
+            out[i] = v
+    return out
+
+
+def ref_rma(x, n):
+    out, prev = [], np.nan
+    for i in range(len(x)):
+        if math.isnan(prev):
+            window = x[max(0, i - n + 1):i + 1]
+            prev = sum(window) / n if i >= n - 1 and not any(_na(v) for v in window) else np.nan
+        else:
+            prev = x[i] / n + (1 - 1 / n) * prev
+        out.append(prev)
+    return out
+
+
+def ref_rsi(x, n):
+    up = [np.nan] + [max(x[i] - x[i - 1], 0) for i in range(1, len(x))]
+    down = [np.nan] + [max(x[i - 1] - x[i], 0) for i in range(1, len(x))]
+    ru, rd = ref_rma(up, n), ref_rma(down, n)
+    out = []
+    for u, d in zip(ru, rd):
+        if _na(u) or _na(d):
+            out.append(np.nan)
+        else:
+            out.append(100.0 if d == 0 else 0.0 if u == 0 else 100 - 100 / (1 + u / d))
+    return out
+
+
+def ref_wma(x, n):
+    out = []
+    for i in range(len(x)):
+        if i < n - 1:
+            out.append(np.nan)
+            continue
+        out.append(sum(x[i - k] * (n - k) for k in range(n)) / (n * (n + 1) / 2))
+    return out
+
+
+def ref_stdev(x, n):
+    out = []
+    for i in range(len(x)):
+        if i < n - 1:
+            out.append(np.nan)
+            continue
+        w = x[i - n + 1:i + 1]
+        m = sum(w) / n
+        out.append(math.sqrt(sum((v - m) ** 2 for v in w) / n))
+    return out
+
+
+def ref_rising(x, n):
+    return [i >= n and all(x[i] > x[i - k] for k in range(1, n + 1)) for i in range(len(x))]
+
+
+# --- Checks ---
+
+FAILURES = []
+
+
+def check(name, got, expected, tol=1e-9):
+    got = np.asarray(got, dtype='float64')
+    expected = np.asarray(expected, dtype='float64')
+    same_na = np.isnan(got) == np.isnan(expected)
+    both = ~np.isnan(got) & ~np.isnan(expected)
+    close = np.abs(got[both] - expected[both]) <= tol * np.maximum(1, np.abs(expected[both]))
+    if len(got) != len(expected) or not same_na.all() or not close.all():
+        bad = np.flatnonzero(~same_na)
+        first = int(bad[0]) if len(bad) else int(np.flatnonzero(both)[~close][0])
+        FAILURES.append(name)
+        print(f"  FAIL {name}: bar {first} got {got[first]} expected {expected[first]}")
+
+
+def golden():
+    """Small series worked out by hand."""
+    x = [1, 3, 2, 5, 5, 4, 1, 2]
+    check('highest(3)', ta.highest(x, 3), [np.nan, np.nan, 3, 5, 5, 5, 5, 4])
+    check('lowest(3)', ta.lowest(x, 3), [np.nan, np.nan, 1, 2, 2, 4, 1, 1])
+    check('highestbars(3)', ta.highestbars(x, 3), [np.nan, np.nan, -1, 0, 0, -1, -2, -2])
+    check('change', ta.change(x), [np.nan, 2, -1, 3, 0, -1, -3, 1])
+    check('crossover(x, 2.5)', ta.crossover(x, 2.5), [0, 1, 0, 1, 0, 0, 0, 0])
+    check('crossunder(x, 2.5)', ta.crossunder(x, 2.5), [0, 0, 1, 0, 0, 0, 1, 0])
+    cond = [0, 1, 0, 0, 1, 0, 0, 0]
+    check('barssince', ta.barssince(cond), [np.nan, 0, 1, 2, 0, 1, 2, 3])
+    check('valuewhen(0)', ta.valuewhen(cond, x, 0), [np.nan, 3, 3, 3, 5, 5, 5, 5])
+    check('valuewhen(1)', ta.valuewhen(cond, x, 1), [np.nan, np.nan, np.nan, np.nan, 3, 3, 3, 3])
+    check('pivothigh(1, 1)', ta.pivothigh(x, 1, 1), [np.nan, np.nan, 3, np.nan, 5, np.nan, np.nan, np.nan])
+    check('pivotlow(1, 1)', ta.pivotlow(x, 1, 1), [np.nan, np.nan, np.nan, 2, np.nan, np.nan, np.nan, 1])
+    check('rma(3)', ta.rma([3, 6, 9, 12], 3), [np.nan, np.nan, 6, 8])
+    check('wma(3)', ta.wma([1, 2, 3, 4], 3), [np.nan, np.nan, 14 / 6, 20 / 6])
+
+
+def randomized(seed: int):
+    rng = np.random.default_rng(seed)
+    x = np.round(100 + np.cumsum(rng.normal(0, 1, N_BARS)), 1)  # rounding makes ties and plateaus
+    x_na = x.copy()
+    x_na[rng.random(N_BARS) < 0.02] = np.nan
+    y = np.round(100 + np.cumsum(rng.normal(0, 1, N_BARS)), 1)
+    cond = rng.random(N_BARS) < 0.05
+    xs, xs_na, ys = list(x), list(x_na), list(y)
+
+    for n in (1, 2, 5, 14, 33):
+        check(f'highest({n})', ta.highest(x_na, n), ref_highest(xs_na, n))
+        check(f'lowest({n})', ta.lowest(x_na, n), ref_highest(xs_na, n, lambda a, b: a < b))
+        check(f'highestbars({n})', ta.highestbars(x_na, n), ref_highestbars(xs_na, n))
+        check(f'lowestbars({n})', ta.lowestbars(x_na, n), ref_highestbars(xs_na, n, lambda a, b: a < b))
+        check(f'rma({n})', ta.rma(x, n), ref_rma(xs, n), tol=1e-9)
+        check(f'rsi({n})', ta.rsi(x, n), ref_rsi(xs, n), tol=1e-7)
+        check(f'wma({n})', ta.wma(x, n), ref_wma(xs, n))
+        check(f'stdev({n})', ta.stdev(x, n), ref_stdev(xs, n), tol=1e-7)
+        check(f'rising({n})', ta.rising(x, n), ref_rising(xs, n))
+    check('crossover', ta.crossover(x, y), ref_crossover(xs, ys))
+    check('crossunder', ta.crossunder(x, y), ref_crossunder(xs, ys))
+    check('barssince', ta.barssince(cond), ref_barssince(cond))
+    for occurrence in (0, 1, 3):
+        check(f'valuewhen({occurrence})', ta.valuewhen(cond, x, occurrence), ref_valuewhen(cond, xs, occurrence))
+    for left, right in ((1, 1), (2, 3), (5, 0), (0, 4), (10, 10)):
+        check(f'pivothigh({left}, {right})', ta.pivothigh(x_na, left, right), ref_pivot(xs_na, left, right, lambda a, b: a > b))
+        check(f'pivotlow({left}, {right})', ta.pivotlow(x_na, left, right), ref_pivot(xs_na, left, right, lambda a, b: a < b))
+
+
+def verify():
+    print("Golden cases...")
+    golden()
+    for seed in SEEDS:
+        print(f"Random series, seed {seed} ({N_BARS} bars)...")
+        randomized(seed)
+
+    # Speed on a chart-sized series
+    x = 40000 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 50000)))
+    for name, fn in (('highest(200)', lambda: ta.highest(x, 200)),
+                     ('highestbars(200)', lambda: ta.highestbars(x, 200)),
+                     ('pivothigh(10, 10)', lambda: ta.pivothigh(x, 10, 10)),
+                     ('barssince', lambda: ta.barssince(ta.crossover(x, ta.sma(x, 50)))),
+                     ('rsi(14)', lambda: ta.rsi(x, 14))):
+        start = time.perf_counter()
+        fn()
+        print(f"  {name:<18} {(time.perf_counter() - start) * 1e3:7.2f} ms on 50k bars")
+
+    if FAILURES:
+        print(f"FAILED: {len(FAILURES)} checks")
+        raise SystemExit(1)
+    print("All ta checks passed.")
+
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,138 @@
+"""
+Parity and speed check of the indicator backends.
+
+Runs every ta_backend primitive on a synthetic 50k-bar random walk through the
+native kernels and, when installed, TA-Lib, and reports per function:
+timings, speedup and the max absolute deviation (all bars and after warmup,
+where TA-Lib's SMA-seeded recursions have converged). Fails (exit 1) when a
+deviation after warmup exceeds TOLERANCE relative to the output's scale; the
+check is skipped when TA-Lib is not installed.
+
+Also checks that the native kernels are the default (TA-Lib only when asked
+for) and that the indicator result cache does not serve a result computed on
+one backend after switching to the other.
+"""
+import time
+
+import numpy as np
+
+import pandas as pd
+
+import kernels
+import ta_backend
+
+N_BARS = 50000
+REPEAT = 20
+# Relative deviation allowed after warmup
+TOLERANCE = kernels.CONVERGENCE_TOLERANCE
+
+CASES = [
+    ('SMA', (20,), 20),
+    ('EMA', (20,), 400),
+    ('RSI', (14,), 400),
+    ('MACD', (12, 26, 9), 800),
+    ('BBANDS', (20, 2.0), 20),
+    ('STDDEV', (20,), 20),
+]
+
+
+def _timed(fn, *args):
+    fn(*args)  # warm up (JIT compile)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        out = fn(*args)
+    return out, (time.perf_counter() - start) / REPEAT
+
+
+def _outputs(out):
+    return out if isinstance(out, tuple) else (out,)
+
+
+def _max_dev(a, b, skip=0):
+    a, b = a[skip:], b[skip:]
+    both = ~(np.isnan(a) | np.isnan(b))
+    if not both.any():
+        return float('nan')
+    return float(np.max(np.abs(a[both] - b[both])))
+
+
+def _scale(out) -> float:
+    return max(float(np.nanmax(np.abs(o))) for o in _outputs(out) if np.isfinite(o).any())
+
+
+def check_cache_backend(close) -> bool:
+    """A cached native result must not be served once the backend is switched."""
+    from indicators import Indicators
+    df = pd.DataFrame({'time': 1700000000 + 60 * np.arange(len(close)), 'close': close})
+    engine = Indicators()
+    active = ta_backend.get_backend()
+    try:
+        ta_backend.set_backend('native')
+        native = engine.apply_indicator(df, 'RSI', length=14)
+        ta_backend.set_backend('talib')
+        talib_res = engine.apply_indicator(df, 'RSI', length=14)
+    finally:
+        ta_backend.set_backend(active)
+    direct = np.asarray(ta_backend.TALIB['RSI'](close, 14), dtype='float64')
+    served = np.asarray(talib_res['data']['rsi'], dtype='float64')
+    ok = talib_res is not native and np.array_equal(np.isnan(served), np.isnan(direct)) \
+        and np.allclose(served, direct, equal_nan=True)
+    print(f"Cache after set_backend('talib') serves TA-Lib values: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_backend_selection() -> bool:
+    """Native unless TA-Lib is asked for explicitly; asking without TA-Lib falls back to native."""
+    import os
+    saved = os.environ.pop(ta_backend.BACKEND_ENV, None)
+    try:
+        has_talib = ta_backend.talib is not None
+        ok = (ta_backend.resolve_backend() == 'native'
+              and ta_backend.resolve_backend('auto') == ('talib' if has_talib else 'native')
+              and ta_backend.resolve_backend('talib') == ('talib' if has_talib else 'native'))
+    finally:
+        if saved is not None:
+            os.environ[ta_backend.BACKEND_ENV] = saved
+    print(f"Default backend is native, TA-Lib only on request: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def verify():
+    rng = np.random.default_rng(42)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.01, N_BARS)))
+
+    has_talib = ta_backend.talib is not None
+    print(f"Bars: {N_BARS}, TA-Lib installed: {has_talib}, active backend: {ta_backend.get_backend()}")
+    if not has_talib:
+        print("TA-Lib not installed; reporting native timings only (parity check skipped).")
+        print(f"{'function':<8} {'native ms':>10}")
+    else:
+        print(f"{'function':<8} {'native ms':>10} {'talib ms':>10} {'speedup':>8} {'max dev':>12} {'dev after warmup':>17}")
+    failures = []
+    for name, args, warmup in CASES:
+        native_out, native_t = _timed(ta_backend.NATIVE[name], close, *args)
+        if not has_talib:
+            print(f"{name:<8} {native_t * 1e3:>10.3f}")
+            continue
+
+        talib_out, talib_t = _timed(ta_backend.TALIB[name], close, *args)
+        dev = max(_max_dev(a, b) for a, b in zip(_outputs(native_out), _outputs(talib_out)))
+        dev_warm = max(_max_dev(a, b, warmup) for a, b in zip(_outputs(native_out), _outputs(talib_out)))
+        ok = dev_warm <= TOLERANCE * _scale(native_out)
+        if not ok:
+            failures.append(name)
+        print(f"{name:<8} {native_t * 1e3:>10.3f} {talib_t * 1e3:>10.3f} {native_t / talib_t:>7.1f}x {dev:>12.3e} {dev_warm:>17.3e}"
+              f"{'' if ok else '  FAIL'}")
+
+    if not check_backend_selection():
+        failures.append('backend selection')
+    if has_talib and not check_cache_backend(close):
+        failures.append('cache backend key')
+    if failures:
+        print(f"FAILED: {failures}")
+        raise SystemExit(1)
+    print("Backend parity checks passed." if has_talib else "Backend selection ok; no parity to compare without TA-Lib.")
+
+
+if __name__ == "__main__":
+    verify()
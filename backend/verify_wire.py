@@ -0,0 +1,105 @@
+"""
+Round-trip checks of the response encodings (wire.py): a payload encoded with
+encode_binary and read back with decode_binary must give the same fields and
+columns (float64 with NaN, int64, bools as uint8, datetimes as unix seconds,
+strings inline as JSON), every buffer must be 8-byte aligned, and the JSON
+column encoding must give the same numbers. Indicator results and bar frames
+are both checked, including an empty one.
+Fails (exit 1) on any mismatch.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+import wire
+from indicators import Indicators
+
+N_BARS = 1000
+
+
+def _same_column(decoded: np.ndarray, original) -> bool:
+    original = np.asarray(original)
+    if original.dtype.kind == 'M':
+        original = original.astype('datetime64[s]').astype('int64')
+    if original.dtype.kind == 'O':
+        return decoded.dtype.kind == 'O' and list(decoded) == wire.json_column(original, len(original))
+    return decoded.shape == original.shape and bool(np.array_equal(decoded, original.astype(decoded.dtype),
+                                                                   equal_nan=decoded.dtype.kind == 'f'))
+
+
+def _round_trip(label: str, fields: dict, data) -> bool:
+    payload = wire.encode_binary(fields, data)
+    header, columns = wire.decode_binary(payload)
+    original = wire.as_columns(data)
+    (size,) = np.frombuffer(payload, dtype='<u4', count=1, offset=4)
+    layout = json.loads(payload[8:8 + int(size)])['columns']
+
+    same_fields = header == json.loads(json.dumps(fields, default=wire._json_default))
+    same_columns = list(columns) == list(original) and all(
+        _same_column(columns[key], original[key]) for key in original)
+    aligned = all(entry['offset'] % 8 == 0 for entry in layout if 'offset' in entry)
+    # bools and datetimes are typed differently in JSON (true/false, as given), compare the numbers
+    numeric = [key for key in original if np.asarray(original[key]).dtype.kind in 'fiu']
+    as_json = wire.to_json_columns(data)
+    json_agrees = all(as_json[key] == wire.json_column(columns[key], len(columns[key])) for key in numeric)
+    ok = same_fields and same_columns and aligned and json_agrees
+    print(f"  {label:<34} {len(payload):>8} bytes  fields {same_fields}, columns {same_columns}, "
+          f"aligned {aligned}, json {json_agrees}{'' if ok else '  FAIL'}")
+    return ok
+
+
+def check_binary(df) -> bool:
+    engine = Indicators()
+    bollinger = engine.apply_indicator(df, 'Bollinger', length=20, mult=2.0)
+    fields = {k: v for k, v in bollinger.items() if k != 'data'}
+    mixed = {
+        'time': df['time'].to_numpy(),
+        'value': np.where(np.arange(N_BARS) % 9 == 0, np.nan, df['close'].to_numpy()),
+        'signal': df['close'].to_numpy() > df['open'].to_numpy(),
+        'stamp': pd.to_datetime(df['time'], unit='s').to_numpy(),
+        'label': np.array(['up' if i % 2 else None for i in range(N_BARS)], dtype=object),
+    }
+    records = wire.to_records({'time': df['time'].to_numpy(), 'close': df['close'].to_numpy()})
+    ok = all([
+        _round_trip('indicator result (Bollinger)', fields, bollinger['data']),
+        _round_trip('bar frame', {'ticker': 'BTCUSDT', 'timeframe': '1h'}, wire.frame_columns(df)),
+        _round_trip('mixed dtypes', {'note': 'mixed'}, mixed),
+        _round_trip('legacy records', {}, records),
+        _round_trip('empty', {'ticker': 'none'}, {'time': np.array([], dtype='int64'), 'close': np.array([])}),
+    ])
+    print(f"binary round trip: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_records(df) -> bool:
+    data = wire.frame_columns(df.head(50))
+    data['close'] = data['close'].copy()
+    data['close'][3] = np.nan
+    records = wire.to_records(data)
+    back = wire.as_columns(records)
+    ok = (records[3]['close'] is None and list(back) == list(data)
+          and all(np.array_equal(back[key], np.asarray(data[key], dtype='float64'), equal_nan=True) for key in data))
+    print(f"records round trip: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def verify():
+    rng = np.random.default_rng(13)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.01, N_BARS)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    df = pd.DataFrame({'time': 1577836800 + 3600 * np.arange(N_BARS), 'open': open_,
+                       'high': np.maximum(open_, close) * 1.001, 'low': np.minimum(open_, close) * 0.999,
+                       'close': close, 'volume': rng.integers(1, 1000, N_BARS)})
+    failures = [name for name, ok in [
+        ('binary', check_binary(df)),
+        ('records', check_records(df)),
+    ] if not ok]
+    if failures:
+        print(f"FAILED: {failures}")
+        raise SystemExit(1)
+    print("Wire encoding checks passed.")
+
+
+if __name__ == "__main__":
+    verify()
@@ -0,0 +1,284 @@
+"""
+Response encodings for bar and indicator payloads.
+
+Payloads are kept as columns ({name: numpy array}, 'time' in unix seconds) and
+only encoded on the way out, in the format the client negotiated:
+
+    records : [{time, open, ...}, ...]           legacy JSON, the default
+    columns : {time: [...], open: [...], ...}    JSON parallel arrays
+    binary  : typed arrays (see encode_binary), application/x-columnar
+    arrow   : Arrow IPC stream, application/vnd.apache.arrow.stream
+
+Arrow needs pyarrow; without it an Arrow request gets JSON columns.
+"""
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+RECORDS, COLUMNS, BINARY, ARROW = 'records', 'columns', 'binary', 'arrow'
+FORMATS = (RECORDS, COLUMNS, BINARY, ARROW)
+
+MEDIA_TYPES = {
+    ARROW: 'application/vnd.apache.arrow.stream',
+    BINARY: 'application/x-columnar',
+}
+BINARY_MAGIC = b'COL1'
+
+
+# --- Negotiation ---
+
+def negotiate(fmt: str = None, accept: str = None) -> str:
+    """
+    Picks the response format: an explicit `format` parameter wins, else the
+    Accept header (highest q first; 'application/json; layout=columns' asks
+    for JSON columns). Anything unrecognized gets records.
+    Raises ValueError for an unknown explicit format.
+    """
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}")
+        return _available(fmt)
+
+    ranked = []
+    for position, part in enumerate((accept or '').split(',')):
+        media, *params = [p.strip().lower() for p in part.split(';')]
+        options = dict(p.split('=', 1) for p in params if '=' in p)
+        try:
+            q = float(options.get('q', 1))
+        except ValueError:
+            q = 0.0
+        if media in (MEDIA_TYPES[ARROW], 'application/vnd.apache.arrow.file'):
+            candidate = ARROW
+        elif media == MEDIA_TYPES[BINARY]:
+            candidate = BINARY
+        elif media == 'application/json' and options.get('layout') == COLUMNS:
+            candidate = COLUMNS
+        else:
+            continue
+        if q > 0:
+            # An Arrow preference pyarrow cannot serve ranks after the formats that can be
+            ranked.append((candidate == ARROW and pa is None, -q, position, candidate))
+    if not ranked:
+        return RECORDS
+    return _available(min(ranked)[3])
+
+
+def _available(fmt: str) -> str:
+    return COLUMNS if fmt == ARROW and pa is None else fmt
+
+
+# --- Columns ---
+
+def json_column(values, length: int) -> list:
+    """One output column as a list of JSON-safe Python scalars (NaN/inf -> None)."""
+    if np.isscalar(values):
+        values = np.full(length, values)
+    arr = np.asarray(values)
+    if len(arr) != length:
+        raise ValueError(f"Length of values ({len(arr)}) does not match length of index ({length})")
+    if arr.dtype.kind == 'f':
+        out = arr.astype(object)
+        out[~np.isfinite(arr)] = None
+        return out.tolist()
+    if arr.dtype.kind in 'iub':
+        return arr.tolist()
+    return pd.Series(values, dtype=object if arr.dtype.kind == 'O' else None).replace([float('inf'), float('-inf'), np.nan], None).tolist()
+
+
+def record_column(records: list, key: str) -> np.ndarray:
+    """One column of records as an array (float when numeric, None -> NaN)."""
+    values = [r.get(key) for r in records]
+    if all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in values):
+        return np.array(values, dtype='float64')
+    return np.array(values, dtype=object)
+
+
+def as_columns(data) -> dict:
+    """Columns from a payload's data: columns pass through, records (plugins, legacy) are split up."""
+    if isinstance(data, dict):
+        return data
+    if isinstance(data, pd.DataFrame):
+        return frame_columns(data)
+    data = data or []
+    keys = list(data[0]) if data else []
+    return {key: record_column(data, key) for key in keys}
+
+
+def frame_columns(df: pd.DataFrame) -> dict:
+    """A bar frame as columns, 'time' (unix seconds) first from a DatetimeIndex or a time column."""
+    columns = {}
+    if 'time' not in df.columns and pd.api.types.is_datetime64_any_dtype(df.index):
+        index = df.index.tz_localize(None) if getattr(df.index, 'tz', None) is not None else df.index
+        columns['time'] = index.as_unit('s').asi8
+    for col in df.columns:
+        columns[str(col)] = df[col].to_numpy()
+    return columns
+
+
+def take_rows(data, rows: slice):
+    """Row slice of a payload's data (columns or records)."""
+    if isinstance(data, dict):
+        return {key: values[rows] for key, values in data.items()}
+    return data[rows]
+
+
+def concat_rows(head, tail):
+    """head's rows followed by tail's (both columns with the same keys, or both records)."""
+    if isinstance(head, dict):
+        return {key: np.concatenate([np.asarray(values), np.asarray(tail[key])]) for key, values in head.items()}
+    return head + tail
+
+
+def row_count(data) -> int:
+    if isinstance(data, dict):
+        return len(next(iter(data.values()))) if data else 0
+    return len(data or [])
+
+
+# --- Encoders ---
+
+def to_records(data) -> list:
+    """Legacy per-bar dicts (NaN/inf -> None)."""
+    if not isinstance(data, dict):
+        return data
+    n = row_count(data)
+    keys = list(data)
+    values = [json_column(data[k], n) for k in keys]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def to_json_columns(data) -> dict:
+    """Parallel JSON arrays (NaN/inf -> None)."""
+    columns = as_columns(data)
+    n = row_count(columns)
+    return {key: json_column(values, n) for key, values in columns.items()}
+
+
+def _typed(values) -> np.ndarray:
+    """Column as a little-endian float64/int64/uint8 array, or None when it is not numeric."""
+    arr = np.asarray(values)
+    if arr.dtype.kind == 'b':
+        return arr.astype(np.uint8)
+    if arr.dtype.kind in 'iu':
+        return arr.astype('<i8')
+    if arr.dtype.kind == 'f':
+        return arr.astype('<f8')
+    if arr.dtype.kind == 'M':
+        return arr.astype('datetime64[s]').astype('<i8')
+    return None
+
+
+def encode_binary(fields: dict, data) -> bytes:
+    """
+    Typed-array payload:
+
+        b'COL1' | uint32 LE header length | header JSON (UTF-8) | padding | buffers
+
+    The header carries `fields` plus 'rows' and 'columns': [{name, dtype,
+    offset, length}], offsets in bytes from the start of the payload, each
+    8-byte aligned so a client can view them directly (new Float64Array(buf,
+    offset, rows)). dtype is float64 (NaN = no value), int64 or uint8 (bools);
+    non-numeric columns have dtype 'json' and their values inline instead.
+    """
+    columns = as_columns(data)
+    n = row_count(columns)
+    layout, buffers = [], []
+    for name, values in columns.items():
+        arr = _typed(values)
+        if arr is None:
+            layout.append({'name': name, 'dtype': 'json', 'values': json_column(values, n)})
+        else:
+            layout.append({'name': name, 'dtype': {'f': 'float64', 'i': 'int64', 'u': 'uint8'}[arr.dtype.kind],
+                           'length': arr.nbytes})
+            buffers.append((layout[-1], arr))
+
+    # Offsets depend on the header size, which depends on the offsets' digits: grow until it fits
+    prefix = len(BINARY_MAGIC) + 4
+    header_size = 0
+    while True:
+        offset = _align(prefix + header_size)
+        for entry, arr in buffers:
+            entry['offset'] = offset
+            offset = _align(offset + arr.nbytes)
+        header = json.dumps({**fields, 'rows': n, 'columns': layout}, default=_json_default).encode('utf-8')
+        if len(header) <= header_size:
+            header += b' ' * (header_size - len(header))
+            break
+        header_size = _align(prefix + len(header)) - prefix
+
+    out = bytearray(BINARY_MAGIC + struct.pack('<I', len(header)) + header)
+    for entry, arr in buffers:
+        out.extend(b'\0' * (entry['offset'] - len(out)))
+        out.extend(arr.tobytes())
+    return bytes(out)
+
+
+def decode_binary(payload: bytes):
+    """(fields, columns) back from encode_binary (used by clients and checks)."""
+    if payload[:4] != BINARY_MAGIC:
+        raise ValueError("Not a columnar payload")
+    (size,) = struct.unpack_from('<I', payload, 4)
+    header = json.loads(payload[8:8 + size])
+    n = header.pop('rows')
+    columns = {}
+    for entry in header.pop('columns'):
+        if entry['dtype'] == 'json':
+            columns[entry['name']] = np.array(entry['values'], dtype=object)
+        else:
+            dtype = {'float64': '<f8', 'int64': '<i8', 'uint8': 'u1'}[entry['dtype']]
+            columns[entry['name']] = np.frombuffer(payload, dtype=dtype, count=n, offset=entry['offset'])
+    return header, columns
+
+
+def encode_arrow(fields: dict, data) -> bytes:
+    """Arrow IPC stream of the columns; `fields` go into the schema metadata as JSON."""
+    columns = as_columns(data)
+    arrays, names = [], []
+    for name, values in columns.items():
+        arr = _typed(values)
+        if arr is None:
+            arrays.append(pa.array(json_column(values, row_count(columns))))
+        else:
+            arrays.append(pa.array(arr.astype(bool) if arr.dtype == np.uint8 else arr,
+                                   from_pandas=arr.dtype.kind == 'f'))
+        names.append(name)
+    table = pa.Table.from_arrays(arrays, names=names)
+    table = table.replace_schema_metadata({'fields': json.dumps(fields, default=_json_default)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(fields: dict, data, fmt: str):
+    """
+    The payload in `fmt`: a JSON-ready dict (fields plus 'data', and 'format'
+    for columns) or, for the binary formats, (bytes, media type).
+    """
+    if fmt == RECORDS:
+        return {**fields, 'data': to_records(data)}
+    if fmt == BINARY:
+        return encode_binary(fields, data), MEDIA_TYPES[BINARY]
+    if fmt == ARROW and pa is not None:
+        return encode_arrow(fields, data), MEDIA_TYPES[ARROW]
+    return {**fields, 'format': COLUMNS, 'data': to_json_columns(data)}
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
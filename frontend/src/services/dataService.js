@@ -68,11 +68,16 @@ function alignData(seriesMap) {
     // But division of High/High might not be the true High of the ratio.
     // Standard approach: Apply op to Close. Set others to Close.
 
+    // Index each series by time once instead of scanning it per point (was O(n^2))
+    const byTime = {}
+    keys.forEach(k => {
+        byTime[k] = new Map(seriesMap[k].map(d => [d.time, d]))
+    })
+
     return sortedTimes.map(time => {
         const point = { time }
         keys.forEach(k => {
-            const p = seriesMap[k].find(d => d.time === time)
-            point[k] = p
+            point[k] = byTime[k].get(time)
         })
         return point
     })
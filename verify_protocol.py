@@ -23,7 +23,7 @@ if isinstance(res, dict):
         print("Protocol 2.0 Confirmed!")
         print("Meta:", res['meta'])
         print("Plots:", res['plots'])
-        print("Data sample:", res['data'][0] if res['data'] else "Empty")
+        print("Data sample:", {k: v[0] for k, v in res['data'].items()} if len(res['data'].get('time', [])) else "Empty")
     else:
         print("Dictionary returned but missing 2.0 keys.")
 else: